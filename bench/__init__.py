@@ -0,0 +1 @@
+"""성능 점검/벤치마크 스크립트"""
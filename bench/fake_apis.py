@@ -0,0 +1,260 @@
+"""
+로컬 가짜 Gemini / Google Cloud TTS (오프라인 파이프라인 벤치마크용)
+
+FakeGemini: genai.Client 대용 (client.models.generate_content만 구현)
+  프롬프트의 "# 에피소드 k" 블록마다 그 상황 조건으로 만든 스크립트를 JSON으로 반환 (k번째는 variant=k)
+  배치 요청이면 {"scripts": [...]}, 단건 요청이면 스크립트 1개
+FakeTTS: text:synthesize REST 엔드포인트를 흉내내는 로컬 HTTP 서버
+  글자 수 / speakingRate로 실제와 비슷한 길이를 정하고,
+  화자(voice)별 고정 주파수 사인파 MP3(24kHz mono)를 돌려줌 → 같은 입력이면 항상 같은 오디오
+  음성마다 기본 음량이 다르고(실제 Neural2처럼) audioConfig.volumeGainDb를 반영
+  같은 (voice, 길이, 게인) 오디오는 한 번만 인코딩 (서버 쪽 ffmpeg은 파이프라인 계측에 포함되지 않음)
+  input.ssml이면 <break>/<prosody rate>/<mark>로 길이를 계산하고 <mark> 타임포인트를 함께 반환
+  GET /v1/voices는 config의 음성(나레이터 + TTS_VOICE_POOL) 목록을 반환 (check_tts용)
+
+사용법:
+  gemini._client = FakeGemini()
+  server = FakeTTS().start()
+  tts.TTS_ENDPOINT = server.endpoint
+  tts.TTS_VOICES_ENDPOINT = server.voices_endpoint
+  ...
+  server.stop()
+"""
+import re
+import json
+import time
+import base64
+import zlib
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+# 일본어 낭독 속도 (초/글자, speakingRate 1.0 기준)
+SEC_PER_CHAR = 0.15
+MIN_DURATION = 0.4
+
+_DIALOGUE = [
+    ("田中", "お忙しいところ恐れ入ります。先日ご提案いただいた件でお電話いたしました。"),
+    ("佐藤", "いつもお世話になっております。ご検討いただきありがとうございます。"),
+    ("田中", "社内で検討した結果、前向きに進めたいという結論になりました。"),
+    ("佐藤", "それは何よりです。つきましては、納期について改めてご相談させてください。"),
+    ("田中", "承知いたしました。来月末までの納品は可能でしょうか。"),
+    ("佐藤", "確認いたしますので、少々お時間をいただけますでしょうか。"),
+    ("田中", "もちろんです。本日中にご連絡いただけますと幸いです。"),
+    ("佐藤", "かしこまりました。改めてご連絡差し上げます。"),
+]
+
+
+def canned_script(situation: dict = None, variant: int = 0) -> dict:
+    """
+    검증(validate_script)을 통과하는 고정 스크립트
+    variant: 제목/대사에 번호를 붙여 에피소드마다 다른 내용으로 (산출물 저장소 재사용 방지)
+    """
+    situation = situation or {
+        "type": "B2B", "situation": "取引先との納期調整", "channel": "電話", "difficulty": "N2",
+    }
+    suffix = f"（その{variant + 1}）" if variant else ""
+    return {
+        "episode_title": f"納期調整の電話{suffix}",
+        "situation": situation,
+        "intro_narration": "今日は取引先との電話で、納期を調整する場面を学びましょう。",
+        "intro_narration_ko": "오늘은 거래처와의 전화로 납기를 조정하는 장면을 배워봅시다.",
+        "dialogue": [
+            {"speaker": speaker, "role": "client" if speaker == "田中" else "vendor",
+             "text_jp": text + suffix, "text_ko": f"(번역) {text}{suffix}",
+             "audio_note": "slow" if i == 4 else "normal"}
+            for i, (speaker, text) in enumerate(_DIALOGUE)
+        ],
+        "grammar_explanation": [
+            {"form": "〜ところ", "meaning_ko": "~하시는 중에", "example_jp": "お忙しいところ",
+             "example_ko": "바쁘신 중에", "usage_note": "전화 첫머리의 관용 표현"},
+        ],
+        "used_grammar": [
+            {"form": "〜ところ", "meaning_ko": "~하시는 중에", "example_jp": "お忙しいところ",
+             "example_ko": "바쁘신 중에"},
+        ],
+        "used_vocab": [
+            {"word": "納期", "reading": "のうき", "meaning_ko": "납기"},
+            {"word": "検討", "reading": "けんとう", "meaning_ko": "검토"},
+        ],
+        "summary": "거래처에 전화해 납기를 조정하는 비즈니스 표현을 익힙니다.",
+    }
+
+
+def _block_situation(block: str) -> dict:
+    """배치 프롬프트의 에피소드 블록에서 상황 조건 추출 (응답이 에피소드와 대응되도록)"""
+    def field(name):
+        m = re.search(rf"^- {name}: (.+)$", block, flags=re.MULTILINE)
+        return m[1].strip() if m else ""
+    return {
+        "type": field("타입").split(" ")[0],
+        "situation": field("상황"),
+        "channel": field("채널"),
+        "difficulty": field("난이도").replace("JLPT ", ""),
+    }
+
+
+class FakeGemini:
+    """genai.Client 대용 (latency: 호출당 지연 초)"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def generate_content(self, model: str, contents: str, config=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        blocks = re.split(r"^# 에피소드 \d+", contents, flags=re.MULTILINE)[1:]
+        if blocks:
+            body = {"scripts": [canned_script(_block_situation(b), variant=i)
+                                for i, b in enumerate(blocks)]}
+        else:
+            body = canned_script()
+        return SimpleNamespace(text=json.dumps(body, ensure_ascii=False))
+
+
+def speech_duration(text: str, rate: float = 1.0) -> float:
+    """텍스트 낭독 길이 추정 (0.05초 단위로 반올림 → 오디오 캐시 적중)"""
+    seconds = max(MIN_DURATION, len(text) * SEC_PER_CHAR / (rate or 1.0))
+    return round(seconds * 20) / 20
+
+
+_SSML_TOKEN_RE = re.compile(
+    r'<break time="(\d+)ms"/>|<mark name="([^"]+)"/>|<prosody rate="(\d+)%">(.*?)</prosody>|([^<]+)'
+)
+
+
+def ssml_timeline(ssml: str) -> tuple[float, list[dict]]:
+    """SSML 낭독 길이와 <mark> 타임포인트 (speech_duration 기준)"""
+    t = 0.0
+    timepoints = []
+    for brk, mark, rate, prosody_text, text in _SSML_TOKEN_RE.findall(ssml.replace("<speak>", "").replace("</speak>", "")):
+        if brk:
+            t += int(brk) / 1000
+        elif mark:
+            timepoints.append({"markName": mark, "timeSeconds": round(t, 3)})
+        elif prosody_text:
+            t += speech_duration(prosody_text, int(rate) / 100)
+        elif text.strip():
+            t += speech_duration(text)
+    return round(t * 20) / 20, timepoints
+
+
+class FakeTTS:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.stats = {"requests": 0, "encoded": 0, "audio_seconds": 0.0}
+        self._audio = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/text:synthesize"
+
+    @property
+    def voices_endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/voices"
+
+    @property
+    def beta_endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta1/text:synthesize"
+
+    def start(self) -> "FakeTTS":
+        owner = self
+
+        class Handler(_TTSHandler):
+            fake = owner
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def audio(self, voice: str, duration: float, gain_db: float = 0.0) -> bytes:
+        key = (voice, duration, gain_db)
+        with self._lock:
+            if key not in self._audio:
+                self._audio[key] = _encode_tone(_voice_frequency(voice), duration,
+                                                _voice_level_db(voice) + gain_db)
+                self.stats["encoded"] += 1
+            self.stats["requests"] += 1
+            self.stats["audio_seconds"] += duration
+            return self._audio[key]
+
+
+def _voice_frequency(voice: str) -> int:
+    return 180 + zlib.crc32(voice.encode("utf-8")) % 200
+
+
+def _voice_level_db(voice: str) -> float:
+    """음성별 기본 음량 차이 (+6 ~ -3 dB → 약 -16 ~ -25 LUFS)"""
+    return 6.0 - zlib.crc32(voice.encode("utf-8")) % 10
+
+
+def _encode_tone(frequency: int, duration: float, level_db: float = 0.0) -> bytes:
+    cmd = [
+        "ffmpeg", "-v", "error", "-f", "lavfi",
+        "-i", f"sine=frequency={frequency}:sample_rate=24000:duration={duration}",
+        "-af", f"volume={level_db}dB", "-ac", "1", "-b:a", "32k", "-f", "mp3", "pipe:1",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"가짜 TTS 오디오 생성 실패: {result.stderr.decode(errors='replace')[-300:]}")
+    return result.stdout
+
+
+class _TTSHandler(BaseHTTPRequestHandler):
+    fake: FakeTTS = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        from config import TTS_VOICE_NARRATOR, TTS_VOICE_POOL
+
+        names = dict.fromkeys([TTS_VOICE_NARRATOR, *(v for pool in TTS_VOICE_POOL.values() for v in pool)])
+        self._reply(200, {"voices": [{"name": n, "languageCodes": ["ja-JP"]} for n in names]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+            ssml = req["input"].get("ssml")
+            text = ssml or req["input"]["text"]
+            voice = req["voice"]["name"]
+            rate = float(req.get("audioConfig", {}).get("speakingRate", 1.0))
+            gain = float(req.get("audioConfig", {}).get("volumeGainDb", 0.0))
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": {"code": 400, "message": f"bad request: {e}"}})
+            return
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        if ssml:
+            duration, timepoints = ssml_timeline(ssml)
+        else:
+            duration, timepoints = speech_duration(text, rate), []
+        audio = self.fake.audio(voice, duration, gain)
+        body = {"audioContent": base64.b64encode(audio).decode("ascii")}
+        if ssml and "SSML_MARK" in req.get("enableTimePointing", []):
+            body["timepoints"] = timepoints
+        self._reply(200, body)
@@ -0,0 +1,181 @@
+"""
+로컬 가짜 YouTube resumable 업로드 서버 (업로드 재시도/재개 점검용)
+
+YouTube resumable 프로토콜 중 업로드에 필요한 부분만 구현
+  POST /upload/youtube/v3/videos?uploadType=resumable → 200 + Location(세션 URI)
+  PUT  {세션 URI}  Content-Range: bytes a-b/N         → 308 + Range (진행 중) / 200 + 영상 JSON (완료)
+  PUT  {세션 URI}  Content-Range: bytes */N           → 현재 수신 위치 조회
+
+장애 주입
+  fail_every=k: k번째 청크마다 503 응답 (수신 데이터 버림)
+  drop_every=k: k번째 청크마다 응답 없이 연결 끊기 (소켓 오류)
+
+사용법:
+  server = FakeYouTube(fail_every=3).start()
+  youtube = fake_client(server.base_url)
+  upload_video(path, script, youtube=youtube)
+  server.stop()
+"""
+import json
+import hashlib
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeYouTube:
+    def __init__(self, fail_every: int = 0, drop_every: int = 0):
+        self.fail_every = fail_every
+        self.drop_every = drop_every
+        self.sessions = {}
+        self.stats = {
+            "sessions_created": 0, "chunk_puts": 0, "status_queries": 0,
+            "injected_503": 0, "injected_drop": 0, "bytes_received": 0,
+        }
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeYouTube":
+        owner = self
+
+        class Handler(_Handler):
+            fake = owner
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def received(self, session_id: str = None) -> int:
+        """세션이 받은 바이트 수 (기본: 가장 최근 세션)"""
+        with self._lock:
+            if not self.sessions:
+                return 0
+            sid = session_id or max(self.sessions)
+            return len(self.sessions[sid]["data"])
+
+    def uploaded_sha256(self, video_id: str) -> str | None:
+        with self._lock:
+            for sid, s in self.sessions.items():
+                if f"fake{sid}" == video_id and s["done"]:
+                    return hashlib.sha256(s["data"]).hexdigest()
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeYouTube = None
+    protocol_version = "HTTP/1.1"
+    # 본문이 선언한 길이만큼 오지 않으면 연결 종료 (httplib2가 소비된 스트림으로 재요청하는 경우)
+    timeout = 1
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, status: int, headers: dict = None, body: bytes = b""):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _progress_reply(self, sid: str):
+        session = self.fake.sessions[sid]
+        received = len(session["data"])
+        if received >= session["size"]:
+            session["done"] = True
+            body = json.dumps({"id": f"fake{sid}", "kind": "youtube#video",
+                               "snippet": session["meta"].get("snippet", {})}).encode()
+            self._reply(200, {"Content-Type": "application/json"}, body)
+        elif received:
+            self._reply(308, {"Range": f"bytes=0-{received - 1}"})
+        else:
+            self._reply(308)
+
+    def do_POST(self):
+        path = urllib.parse.urlparse(self.path).path
+        meta = self._read_body()
+        if not path.startswith("/upload/youtube/v3/videos"):
+            self._reply(404)
+            return
+        fake = self.fake
+        with fake._lock:
+            sid = f"{len(fake.sessions) + 1:04d}"
+            fake.sessions[sid] = {
+                "size": int(self.headers.get("X-Upload-Content-Length", 0)),
+                "data": bytearray(), "meta": json.loads(meta or b"{}"), "done": False,
+            }
+            fake.stats["sessions_created"] += 1
+        self._reply(200, {"Location": f"{fake.base_url}/upload/session/{sid}"})
+
+    def do_PUT(self):
+        fake = self.fake
+        sid = urllib.parse.urlparse(self.path).path.rsplit("/", 1)[-1]
+        body = self._read_body()
+        content_range = self.headers.get("Content-Range", "")
+        with fake._lock:
+            if sid not in fake.sessions:
+                self._reply(404)
+                return
+            session = fake.sessions[sid]
+            fake.stats["bytes_received"] += len(body)
+
+            if content_range.startswith("bytes */"):
+                fake.stats["status_queries"] += 1
+                self._progress_reply(sid)
+                return
+
+            fake.stats["chunk_puts"] += 1
+            n = fake.stats["chunk_puts"]
+            if fake.drop_every and n % fake.drop_every == 0:
+                fake.stats["injected_drop"] += 1
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+            if fake.fail_every and n % fake.fail_every == 0:
+                fake.stats["injected_503"] += 1
+                self._reply(503, {"Content-Type": "application/json"},
+                            b'{"error": {"code": 503, "message": "backendError"}}')
+                return
+
+            start = int(content_range.split(" ")[1].split("-")[0]) if content_range else 0
+            if start == len(session["data"]):
+                session["data"] += body
+            # 시작 위치가 어긋나면 저장하지 않고 현재 위치를 알려줌 (클라이언트가 맞춰서 재전송)
+            self._progress_reply(sid)
+
+
+def fake_client(base_url: str):
+    """
+    가짜 서버로 요청을 보내는 YouTube API 클라이언트
+    (정적 discovery 문서 사용, 모든 요청의 scheme/host를 base_url로 교체)
+    """
+    import httplib2
+    from googleapiclient.discovery import build
+
+    target = urllib.parse.urlparse(base_url)
+
+    class _LocalHttp(httplib2.Http):
+        def request(self, uri, *args, **kwargs):
+            parsed = urllib.parse.urlparse(uri)
+            uri = urllib.parse.urlunparse(parsed._replace(scheme=target.scheme, netloc=target.netloc))
+            return super().request(uri, *args, **kwargs)
+
+    http = _LocalHttp()
+    http.redirect_codes = set(http.redirect_codes) - {308}  # 308 = resumable 진행 중 (googleapiclient build_http와 동일)
+    return build("youtube", "v3", http=http, developerKey="fake",
+                 static_discovery=True, cache_discovery=False)
@@ -0,0 +1,95 @@
+"""
+import 시간 예산 점검 (python -X importtime)
+
+main / scheduler / worker 모듈 import 시
+  - 누적 import 시간이 예산(ms) 이내인지
+  - 무거운 SDK(google.genai, googleapiclient, pdfplumber, PIL 등)가 로드되지 않는지
+  - data/ 디렉토리를 만들지 않는지 (import 부작용 없음)
+를 확인합니다. 실패 시 종료 코드 1.
+
+사용법:
+  python -m bench.import_budget
+  python -m bench.import_budget --budget-ms 300
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# 모듈별 누적 import 시간 예산 (ms)
+DEFAULT_BUDGET_MS = 400
+
+# 기동 시 import 되면 안 되는 모듈 (실제 사용 시점에 지연 import)
+FORBIDDEN_MODULES = (
+    "google.genai",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "pdfplumber",
+    "PIL",
+    "requests",
+    "apscheduler",
+)
+
+TARGETS = ("main", "scheduler", "worker")
+
+
+def measure(module: str) -> tuple[float, set]:
+    """
+    -X importtime 출력 파싱
+    반환: (대상 모듈 누적 import 시간 ms, import 된 모듈 이름 집합)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} 실패:\n{result.stderr[-1000:]}")
+
+    cumulative_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2].strip()
+        try:
+            cum = int(parts[1].strip())
+        except ValueError:
+            continue  # 헤더 라인
+        imported.add(name)
+        if name == module:
+            cumulative_us = cum
+    return cumulative_us / 1000.0, imported
+
+
+def check(budget_ms: float = DEFAULT_BUDGET_MS) -> bool:
+    data_dir = BASE_DIR / "data"
+    data_existed = data_dir.exists()
+    ok = True
+
+    for module in TARGETS:
+        elapsed_ms, imported = measure(module)
+        heavy = sorted(
+            m for m in imported
+            if any(m == f or m.startswith(f + ".") for f in FORBIDDEN_MODULES)
+        )
+        status = "OK" if elapsed_ms <= budget_ms and not heavy else "FAIL"
+        print(f"[{status}] import {module}: {elapsed_ms:.1f} ms (예산 {budget_ms:.0f} ms)")
+        if heavy:
+            print(f"       기동 시 로드된 무거운 모듈: {', '.join(heavy)}")
+        ok = ok and status == "OK"
+
+    if not data_existed and data_dir.exists():
+        print("[FAIL] import 시 data/ 디렉토리가 생성되었습니다")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="import 시간 예산 점검")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+    sys.exit(0 if check(args.budget_ms) else 1)
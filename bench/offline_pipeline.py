@@ -0,0 +1,237 @@
+"""
+오프라인 파이프라인 벤치마크 (Gemini / TTS / YouTube를 로컬 가짜로 교체)
+
+main.run과 같은 순서로 N편을 끝까지 처리합니다.
+  스크립트 일괄 생성 → 에피소드별 TTS 합성 / 영상 렌더링 → 동시 업로드 (쿼터 장부 포함)
+가짜 서비스: bench/fake_apis.py (Gemini, TTS), bench/fake_youtube.py (resumable 업로드)
+
+보고 항목 (pipeline.instrument span 기준)
+  - 단계별 지연 (stage.scripts / stage.tts / stage.render / stage.upload): 합계, 편당 평균, 최대
+  - 처리량: 편/시간 (전체 경과 시간 기준)
+  - 단계별 ffmpeg / ffprobe 프로세스 수, TTS 요청 수 (tts.call)
+데이터는 임시 디렉토리에 쓰므로 실제 data/ (이력, 쿼터 장부, 캐시)에 영향이 없습니다.
+폰트(data/fonts)와 인코더 프로필은 실제 data/의 것을 공유합니다 (매번 다시 받거나 측정하지 않도록).
+
+필요: ffmpeg / ffprobe (PATH), requirements.txt 패키지. API 키와 네트워크는 필요 없음 (폰트 최초 다운로드 제외)
+
+사용법:
+  python -m bench.offline_pipeline
+  python -m bench.offline_pipeline --episodes 6 --json bench_result.json
+  python -m bench.offline_pipeline --latency-ms 300   # 가짜 API에 왕복 지연 추가
+  python -m bench.offline_pipeline --ssml             # SSML 모드 (TTS 요청 수 비교)
+  python -m bench.offline_pipeline --runs 2           # 같은 입력으로 2회 (2회차: 산출물 저장소 재사용)
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+
+# 임시 디렉토리로 옮기지 않고 실제 data/의 것을 쓰는 경로 (호스트별 인코더 측정 결과)
+SHARED_PATHS = ("ENCODER_PROFILE_FILE",)
+
+STAGES = ("stage.scripts", "stage.tts", "stage.render", "stage.upload")
+EPISODE_TYPES = ("B2B", "B2C")
+
+
+def _isolate_data_dir(workdir: Path) -> Path:
+    """
+    config의 data/ 하위 경로를 모두 workdir 아래로 교체 (pipeline 모듈 import 전에 호출)
+    Returns:
+        원래 data/ 경로
+    """
+    real = config.DATA_DIR
+    for name, value in list(vars(config).items()):
+        if name in SHARED_PATHS:
+            continue
+        if isinstance(value, Path) and (value == real or real in value.parents):
+            setattr(config, name, workdir / value.relative_to(real))
+    return real
+
+
+def synthetic_knowledge(size: int = 30) -> dict:
+    """PDF 추출 없이 쓰는 지식베이스 (형식은 load_or_extract_all 결과와 동일)"""
+    def grammar(level):
+        return [{
+            "form": f"〜{level}文型{i:02d}", "meaning_ko": f"{level} 문형 {i}",
+            "example_jp": f"予約の変更{i}につきましては、担当者からご連絡いたします。",
+            "example_ko": f"예약 변경 {i}에 대해서는 담당자가 연락드리겠습니다.",
+        } for i in range(size)]
+
+    kanji = "予約契約交渉確認手配団体料金変更担当連絡調整提案検討納期"
+    return {
+        "n1": {"grammar": grammar("N1")},
+        "n2": {"grammar": grammar("N2")},
+        "kanji": [{"kanji": ch, "reading": "", "meaning_ko": f"한자 {ch}",
+                   "example_word": f"{ch}定"} for ch in kanji],
+    }
+
+
+def bench_situations(episodes: int) -> list:
+    """기본 상황 풀에서 B2B/B2C를 번갈아 결정적으로 선택"""
+    from pipeline.generate_situation import B2B_SITUATIONS, B2C_SITUATIONS
+
+    pools = {"B2B": B2B_SITUATIONS, "B2C": B2C_SITUATIONS}
+    situations = []
+    for i in range(episodes):
+        ep_type = EPISODE_TYPES[i % len(EPISODE_TYPES)]
+        pool = pools[ep_type]
+        situations.append({**pool[(i // len(EPISODE_TYPES)) % len(pool)], "type": ep_type})
+    return situations
+
+
+def run_offline(episodes: int, latency: float = 0.0) -> dict:
+    """
+    가짜 서비스로 main.run과 같은 단계를 실행
+    Returns:
+        {"episodes", "uploaded", "elapsed_sec", "records": span 기록}
+    """
+    from bench.fake_apis import FakeGemini, FakeTTS
+    from bench.fake_youtube import FakeYouTube, fake_client
+    from pipeline import gemini, instrument, make_video, tts, youtube_upload
+    from pipeline.generate_script import generate_scripts
+    from pipeline.instrument import span
+    from pipeline.locks import atomic_write_json
+    from pipeline.merge_audio import export_episode
+    from pipeline.upload_manager import UploadManager
+
+    gemini._client = FakeGemini(latency=latency)
+    gemini.set_cache_enabled(False)  # 매번 스크립트 생성 경로를 측정
+    tts_server = FakeTTS(latency=latency).start()
+    tts.TTS_ENDPOINT = tts_server.endpoint
+    tts.TTS_VOICES_ENDPOINT = tts_server.voices_endpoint
+    tts.TTS_BETA_ENDPOINT = tts_server.beta_endpoint
+    youtube_server = FakeYouTube().start()
+    youtube_upload.get_youtube_client = lambda: fake_client(youtube_server.base_url)
+
+    knowledge = synthetic_knowledge()
+    situations = bench_situations(episodes)
+    instrument.reset()
+    try:
+        started = time.perf_counter()
+        with span("stage.scripts", count=len(situations)):
+            scripts = generate_scripts(situations, knowledge)
+
+        pending_uploads = []
+        for i, (situation, script) in enumerate(zip(situations, scripts)):
+            ep_id = f"bench{i:03d}_{situation['type']}"
+            if script is None:
+                print(f"  [{ep_id}] 스크립트 생성 실패, 건너뜀")
+                continue
+            atomic_write_json(config.SCRIPTS_DIR / f"{ep_id}.json", script, indent=2)
+            with span("stage.tts", ep_id=ep_id):
+                mp3_path, timings = export_episode(script, str(config.AUDIO_DIR / f"{ep_id}.mp3"))
+            with span("stage.render", ep_id=ep_id):
+                video_path = make_video.build_video(script, mp3_path, str(config.VIDEO_DIR),
+                                                    timings=timings)
+            pending_uploads.append({"ep_id": ep_id, "video_path": video_path,
+                                    "script": script, "privacy": "private"})
+
+        with span("stage.upload", count=len(pending_uploads)):
+            results = UploadManager().run(pending_uploads)
+        elapsed = time.perf_counter() - started
+    finally:
+        tts_server.stop()
+        youtube_server.stop()
+
+    return {
+        "episodes": episodes,
+        "uploaded": sum(1 for r in results if "url" in r),
+        "elapsed_sec": elapsed,
+        "records": instrument.records(),
+    }
+
+
+def _stage_of(record: dict, by_id: dict) -> str | None:
+    """부모를 따라 올라가 속한 stage.* span 이름을 찾음"""
+    while record is not None:
+        if record["name"].startswith("stage."):
+            return record["name"]
+        record = by_id.get(record["parent"])
+    return None
+
+
+def build_report(result: dict) -> dict:
+    records = result["records"]
+    by_id = {r["id"]: r for r in records}
+    stages = {}
+    for name in STAGES:
+        walls = [r["wall_ms"] for r in records if r["name"] == name]
+        stages[name] = {
+            "count": len(walls),
+            "total_ms": round(sum(walls), 1),
+            "mean_ms": round(sum(walls) / len(walls), 1) if walls else 0.0,
+            "max_ms": round(max(walls), 1) if walls else 0.0,
+            "ffmpeg": 0, "ffprobe": 0, "tts.call": 0,
+        }
+    for r in records:
+        if r["name"] in ("ffmpeg", "ffprobe", "tts.call"):
+            stage = _stage_of(r, by_id)
+            if stage in stages:
+                stages[stage][r["name"]] += 1
+
+    elapsed = result["elapsed_sec"]
+    return {
+        "episodes": result["episodes"],
+        "uploaded": result["uploaded"],
+        "elapsed_sec": round(elapsed, 2),
+        "episodes_per_hour": round(result["uploaded"] / elapsed * 3600, 1) if elapsed else 0.0,
+        "stages": stages,
+        "ffmpeg_processes": sum(s["ffmpeg"] for s in stages.values()),
+        "ffprobe_processes": sum(s["ffprobe"] for s in stages.values()),
+        "tts_calls": sum(s["tts.call"] for s in stages.values()),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n에피소드 {report['uploaded']}/{report['episodes']}편, "
+          f"{report['elapsed_sec']:.2f}초 → {report['episodes_per_hour']:.1f}편/시간")
+    header = (f"{'단계':<14} {'횟수':>4} {'합계(s)':>8} {'평균(ms)':>9} {'최대(ms)':>9} "
+              f"{'ffmpeg':>7} {'ffprobe':>8} {'TTS':>5}")
+    print(header)
+    print("-" * len(header))
+    for name, s in report["stages"].items():
+        print(f"{name:<14} {s['count']:>4} {s['total_ms'] / 1000:>8.2f} {s['mean_ms']:>9.1f} "
+              f"{s['max_ms']:>9.1f} {s['ffmpeg']:>7} {s['ffprobe']:>8} {s['tts.call']:>5}")
+    print(f"ffmpeg 프로세스 {report['ffmpeg_processes']}개, "
+          f"ffprobe 프로세스 {report['ffprobe_processes']}개, "
+          f"TTS 요청 {report['tts_calls']}회")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오프라인 파이프라인 벤치마크 (가짜 API)")
+    parser.add_argument("--episodes", type=int, default=2, help="처리할 에피소드 수")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="가짜 Gemini/TTS 호출마다 추가할 지연 (ms)")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="같은 에피소드를 반복 실행 (2회차부터 산출물 저장소 재사용 경로 측정)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장 (회귀 비교용, 마지막 실행)")
+    parser.add_argument("--spans", help="span 원본 기록을 JSONL로 저장")
+    parser.add_argument("--ssml", action="store_true",
+                        help="SSML 모드 (같은 음성 연속 대사를 한 요청으로 합성)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        real_data_dir = _isolate_data_dir(Path(tmp))
+        config.ensure_dirs()
+        from pipeline import instrument, make_video, merge_audio
+        make_video.FONT_DIR = real_data_dir / "fonts"
+        instrument.configure(args.spans)
+        merge_audio.set_ssml_enabled(args.ssml)
+
+        for run in range(1, args.runs + 1):
+            if args.runs > 1:
+                print(f"\n── 실행 {run}/{args.runs} ──")
+            result = run_offline(args.episodes, latency=args.latency_ms / 1000)
+            report = build_report(result)
+            print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+    sys.exit(0 if report["uploaded"] == report["episodes"] else 1)
@@ -0,0 +1,225 @@
+"""
+make_video 렌더링 벤치마크 (폰트 로드 / 줄바꿈 / 썸네일·대사 프레임 그리기)
+
+data/scripts의 실제 스크립트를 대사 글자 수로 short / medium / long 구간으로 나누어
+함수별로 다음을 보고합니다.
+  - 호출 시간 (평균 / 최대 ms)
+  - 할당량: tracemalloc peak (Python 객체 할당만 집계, Pillow 이미지 버퍼 등 C 할당은 제외)
+  - 출력 크기 (이미지 파일 바이트)
+시간 측정과 할당 측정은 따로 실행합니다 (tracemalloc이 켜져 있으면 실행이 느려지므로).
+스크립트가 없으면 bench/fake_apis.canned_script로 길이별 합성 스크립트를 사용합니다.
+
+사용법:
+  python -m bench.render_bench
+  python -m bench.render_bench --repeat 5 --json render_result.json
+  python -m bench.render_bench --scripts path/to/scripts
+
+pytest-benchmark 방식 (bench_* 함수가 benchmark, tmp_path 픽스처를 받음):
+  pytest bench/render_bench.py -o python_files=render_bench.py -o python_functions="bench_*"
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import SCRIPTS_DIR
+from pipeline import make_video
+
+# 대사(text_jp + text_ko) 글자 수 기준 구간 상한
+LENGTH_BUCKETS = (("short", 400), ("medium", 800), ("long", float("inf")))
+
+TARGETS = ("_get_font", "_wrap_text", "make_thumbnail", "make_dialogue_frame")
+
+
+def script_length(script: dict) -> int:
+    return sum(len(d.get("text_jp", "")) + len(d.get("text_ko", ""))
+               for d in script.get("dialogue", []))
+
+
+def length_bucket(script: dict) -> str:
+    n = script_length(script)
+    return next(name for name, limit in LENGTH_BUCKETS if n < limit)
+
+
+def synthetic_corpus() -> list:
+    """대사 수를 바꾼 합성 스크립트 (short / medium / long 각 1편)"""
+    from bench.fake_apis import canned_script
+
+    corpus = []
+    for lines in (4, 8, 16):
+        script = canned_script()
+        dialogue = script["dialogue"]
+        script["dialogue"] = [dict(dialogue[i % len(dialogue)]) for i in range(lines)]
+        corpus.append(script)
+    return corpus
+
+
+def load_corpus(scripts_dir=SCRIPTS_DIR) -> list:
+    """scripts_dir의 스크립트 JSON (대사가 있는 것만), 없으면 합성 스크립트"""
+    corpus = []
+    for path in sorted(Path(scripts_dir).glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                script = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(script, dict) and script.get("dialogue"):
+            corpus.append(script)
+    return corpus or synthetic_corpus()
+
+
+def target_calls(target: str, script: dict, workdir: str) -> list:
+    """
+    스크립트 1편을 그릴 때 target 함수가 받는 호출 목록
+    Returns:
+        [(함수, 인자 tuple, 출력 경로 또는 None)]
+    """
+    from PIL import Image, ImageDraw
+    from pipeline.voice_registry import assign_voices
+
+    dialogue = script.get("dialogue", [])
+    if target == "_get_font":
+        # make_dialogue_frame 1회가 로드하는 폰트 구성
+        return [(make_video._get_font, (size, lang), None)
+                for size, lang in ((32, "JP"), (52, "JP"), (30, "KR"), (44, "JP"), (36, "KR"))]
+    if target == "_wrap_text":
+        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        font_jp = make_video._get_font(44, "JP")
+        font_ko = make_video._get_font(36, "KR")
+        max_w = make_video.W - 100
+        return [(make_video._wrap_text, (draw, text, font, max_w), None)
+                for d in dialogue
+                for text, font in ((d.get("text_jp", ""), font_jp), (d.get("text_ko", ""), font_ko))]
+    if target == "make_thumbnail":
+        path = os.path.join(workdir, "thumb.jpg")
+        return [(make_video.make_thumbnail, (script, path), path)]
+    if target == "make_dialogue_frame":
+        calls = []
+        voice_map = assign_voices(script)
+        for i, line in enumerate(dialogue):
+            path = os.path.join(workdir, f"frame_{i:03d}.jpg")
+            calls.append((make_video.make_dialogue_frame, (line, voice_map, script, path), path))
+        return calls
+    raise ValueError(f"알 수 없는 대상: {target}")
+
+
+def _run_calls(calls: list):
+    for fn, args, _ in calls:
+        fn(*args)
+
+
+def measure(calls: list, repeat: int = 3) -> list[dict]:
+    """호출별 {"ms": 최소 시간, "alloc_kb": tracemalloc peak, "out_bytes"}"""
+    results = []
+    for fn, args, output in calls:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(*args)
+            best = min(best, (time.perf_counter() - t0) * 1000)
+
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            fn(*args)
+            peak = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            tracemalloc.stop()
+
+        results.append({
+            "ms": best,
+            "alloc_kb": peak / 1024,
+            "out_bytes": os.path.getsize(output) if output and os.path.exists(output) else 0,
+        })
+    return results
+
+
+def run(corpus: list, repeat: int = 3) -> dict:
+    """대상 함수 × 길이 구간별 집계"""
+    # 첫 호출의 폰트 다운로드/파일 캐시 영향을 빼기 위해 한 번 미리 로드
+    make_video._get_font(32, "JP")
+    make_video._get_font(32, "KR")
+
+    report = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for target in TARGETS:
+            for script in corpus:
+                bucket = length_bucket(script)
+                row = report.setdefault(target, {}).setdefault(bucket, {
+                    "scripts": 0, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "alloc_kb_max": 0.0, "out_bytes": 0,
+                })
+                samples = measure(target_calls(target, script, workdir), repeat)
+                row["scripts"] += 1
+                row["calls"] += len(samples)
+                row["total_ms"] += sum(s["ms"] for s in samples)
+                row["max_ms"] = max([row["max_ms"]] + [s["ms"] for s in samples])
+                row["alloc_kb_max"] = max([row["alloc_kb_max"]] + [s["alloc_kb"] for s in samples])
+                row["out_bytes"] += sum(s["out_bytes"] for s in samples)
+    for buckets in report.values():
+        for row in buckets.values():
+            row["mean_ms"] = row["total_ms"] / row["calls"] if row["calls"] else 0.0
+    return report
+
+
+def print_report(report: dict, corpus_size: int):
+    print(f"스크립트 {corpus_size}편")
+    header = (f"{'함수':<20} {'구간':<7} {'편':>3} {'호출':>5} {'평균(ms)':>9} {'최대(ms)':>9} "
+              f"{'할당 peak(KB)':>13} {'출력/편(KB)':>11}")
+    print(header)
+    print("-" * len(header))
+    for target, buckets in report.items():
+        for bucket, _ in LENGTH_BUCKETS:
+            row = buckets.get(bucket)
+            if not row:
+                continue
+            print(f"{target:<20} {bucket:<7} {row['scripts']:>3} {row['calls']:>5} "
+                  f"{row['mean_ms']:>9.2f} {row['max_ms']:>9.2f} {row['alloc_kb_max']:>13.1f} "
+                  f"{row['out_bytes'] / row['scripts'] / 1024:>11.1f}")
+
+
+# ── pytest-benchmark 방식 진입점 ──────────────────────────
+# 가장 긴 스크립트 1편에 대한 target 호출 전체를 1라운드로 측정
+
+def _bench(target: str, benchmark, tmp_path):
+    script = max(load_corpus(), key=script_length)
+    calls = target_calls(target, script, str(tmp_path))
+    benchmark(_run_calls, calls)
+
+
+def bench_get_font(benchmark, tmp_path):
+    _bench("_get_font", benchmark, tmp_path)
+
+
+def bench_wrap_text(benchmark, tmp_path):
+    _bench("_wrap_text", benchmark, tmp_path)
+
+
+def bench_make_thumbnail(benchmark, tmp_path):
+    _bench("make_thumbnail", benchmark, tmp_path)
+
+
+def bench_make_dialogue_frame(benchmark, tmp_path):
+    _bench("make_dialogue_frame", benchmark, tmp_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="make_video 렌더링 벤치마크")
+    parser.add_argument("--scripts", default=str(SCRIPTS_DIR), help="스크립트 JSON 디렉토리")
+    parser.add_argument("--repeat", type=int, default=3, help="호출별 반복 횟수 (최소 시간 사용)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.scripts)
+    report = run(corpus, repeat=args.repeat)
+    print_report(report, len(corpus))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
@@ -0,0 +1,115 @@
+"""
+resumable 업로드 재시도/재개 점검 (로컬 가짜 서버: bench/fake_youtube.py)
+
+시나리오
+  1. 일시 오류: 청크마다 503 / 연결 끊김을 섞어 넣어도 업로드가 끝까지 완료되는지
+  2. 프로세스 중단 후 재개: 업로드 도중 프로세스를 죽인 뒤 다시 실행하면
+     저장된 세션 URI로 이어서 전송하는지 (새 세션 없이, 재전송량이 작게)
+두 경우 모두 서버가 받은 데이터의 해시가 원본과 같아야 합니다. 실패 시 종료 코드 1.
+
+사용법:
+  python -m bench.upload_resume
+  python -m bench.upload_resume --size-mb 20 --chunk-kb 1024
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.fake_youtube import FakeYouTube, fake_client
+from pipeline import youtube_upload
+
+SCRIPT = {
+    "situation": {"type": "B2B", "situation": "テスト", "difficulty": "N2"},
+    "episode_title": "アップロード確認",
+}
+
+
+def _configure(chunk_kb: int):
+    # 벤치마크 전용: 작은 청크 + 짧은 재시도 대기
+    youtube_upload.UPLOAD_CHUNK_SIZE = chunk_kb * 1024
+    youtube_upload.UPLOAD_RETRY_BASE_SEC = 0.01
+    youtube_upload.UPLOAD_RETRY_MAX_SEC = 0.1
+
+
+def _make_video(path: Path, size_mb: int) -> str:
+    data = os.urandom(size_mb * 1024 * 1024)
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _upload(path: Path, base_url: str) -> str:
+    url = youtube_upload.upload_video(str(path), SCRIPT, privacy="private",
+                                      youtube=fake_client(base_url))
+    return url.rsplit("/", 1)[-1]
+
+
+def _child_upload(path: str, base_url: str, chunk_kb: int):
+    _configure(chunk_kb)
+    _upload(Path(path), base_url)
+
+
+def transient_errors(workdir: Path, size_mb: int, chunk_kb: int) -> bool:
+    video = workdir / "transient.mp4"
+    digest = _make_video(video, size_mb)
+    server = FakeYouTube(fail_every=3, drop_every=7).start()
+    try:
+        started = time.perf_counter()
+        video_id = _upload(video, server.base_url)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+    ok = server.uploaded_sha256(video_id) == digest and server.stats["sessions_created"] == 1
+    print(f"[{'OK' if ok else 'FAIL'}] 일시 오류 재시도: {elapsed:.2f}초, {server.stats}")
+    return ok
+
+
+def crash_and_resume(workdir: Path, size_mb: int, chunk_kb: int) -> bool:
+    video = workdir / "resume.mp4"
+    digest = _make_video(video, size_mb)
+    size = video.stat().st_size
+    server = FakeYouTube().start()
+    try:
+        child = multiprocessing.Process(
+            target=_child_upload, args=(str(video), server.base_url, chunk_kb),
+        )
+        child.start()
+        while child.is_alive() and server.received() < size // 2:
+            time.sleep(0.01)
+        child.kill()
+        child.join()
+        before = server.received()
+        session_saved = youtube_upload._session_path(str(video)).exists()
+
+        video_id = _upload(video, server.base_url)
+    finally:
+        server.stop()
+
+    resent = server.stats["bytes_received"] - size
+    ok = (server.uploaded_sha256(video_id) == digest
+          and server.stats["sessions_created"] == 1
+          and session_saved
+          and not youtube_upload._session_path(str(video)).exists())
+    print(f"[{'OK' if ok else 'FAIL'}] 중단 후 재개: 중단 시점 {before / size:.0%}, "
+          f"세션 저장 {session_saved}, 재전송 {max(resent, 0) // 1024} KB, {server.stats}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="resumable 업로드 재시도/재개 점검")
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--chunk-kb", type=int, default=256, help="청크 크기 (256KB 배수)")
+    args = parser.parse_args()
+
+    _configure(args.chunk_kb)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        ok = transient_errors(workdir, args.size_mb, args.chunk_kb)
+        ok = crash_and_resume(workdir, args.size_mb, args.chunk_kb) and ok
+    sys.exit(0 if ok else 1)
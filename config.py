@@ -16,6 +16,8 @@ SCRIPTS_DIR = DATA_DIR / "scripts"
 AUDIO_DIR = DATA_DIR / "audio"
 VIDEO_DIR = DATA_DIR / "video"
 LOG_DIR = DATA_DIR / "logs"
+LOCK_DIR = DATA_DIR / "locks"
+STORE_DIR = DATA_DIR / "store"     # 내용 주소 기반 산출물 저장소 (pipeline/artifact_store.py)
 
 # ── PDF 경로 ───────────────────────────────────────────────
 PDF_N1 = BASE_DIR / "grammar n1.pdf"
@@ -26,7 +28,12 @@ PDF_KANJI = BASE_DIR / "word2136.pdf"
 CACHE_N1 = CACHE_DIR / "knowledge_n1.json"
 CACHE_N2 = CACHE_DIR / "knowledge_n2.json"
 CACHE_KANJI = CACHE_DIR / "kanji.json"
-HISTORY_FILE = HISTORY_DIR / "situation_history.json"
+RELEVANCE_INDEX_FILE = CACHE_DIR / "relevance_index.json"
+SITUATION_POOL_FILE = CACHE_DIR / "situations.json"
+HISTORY_FILE = HISTORY_DIR / "situation_history.json"  # 구버전 (SQLite로 자동 이관)
+HISTORY_DB = HISTORY_DIR / "situation_history.sqlite3"
+SITUATION_REUSE_DAYS = 30  # 최근 N일 내 사용한 상황은 재사용하지 않음
+KNOWLEDGE_USAGE_FILE = HISTORY_DIR / "knowledge_usage.json"
 
 # ── API 키 ─────────────────────────────────────────────────
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
@@ -35,15 +42,84 @@ YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY", "")
 
 # ── Gemini 모델 ────────────────────────────────────────────
 GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_REPAIR_MODEL = "gemini-2.5-flash-lite"  # 손상 필드 보정용 (저비용)
+
+# ── Gemini 응답 캐시 ───────────────────────────────────────
+GEMINI_CACHE_DIR = CACHE_DIR / "gemini"
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "1") != "0"
+GEMINI_CACHE_TTL = 7 * 24 * 3600            # 초 (7일)
+GEMINI_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200MB 초과 시 오래된 항목부터 삭제
 
 # ── TTS 설정 ───────────────────────────────────────────────
 TTS_VOICE_MALE = "ja-JP-Neural2-C"    # 남성 일본어
 TTS_VOICE_FEMALE = "ja-JP-Neural2-B"  # 여성 일본어
 TTS_VOICE_NARRATOR = "ja-JP-Neural2-D" # 나레이터(남)
 
+# 대사 화자 음성 풀 (voice_registry가 에피소드마다 화자별로 서로 다른 음성을 앞에서부터 배정)
+# 나레이터 음성은 넣지 않음 (대사 화자와 나레이션이 같은 목소리가 되지 않도록)
+TTS_VOICE_POOL = {
+    "male": [TTS_VOICE_MALE, "ja-JP-Wavenet-C", "ja-JP-Wavenet-D"],
+    "female": [TTS_VOICE_FEMALE, "ja-JP-Wavenet-A", "ja-JP-Wavenet-B"],
+}
+
+# SSML 모드: 같은 음성이 이어지는 대사를 <break>/<mark> SSML 한 요청으로 합성 (main.py --ssml)
+TTS_SSML_MODE = os.getenv("TTS_SSML_MODE", "0") == "1"
+TTS_SSML_MAX_BYTES = 4500   # 요청당 SSML 크기 상한 (API 제한 5000바이트)
+
+# TTS 준비 확인 (voices 목록 조회, 성공 결과를 TTL 동안 재사용 → 실행/작업마다 API를 부르지 않음)
+TTS_HEALTH_FILE = CACHE_DIR / "tts_health.json"
+TTS_HEALTH_TTL = 600   # 초
+
+# 음량 정규화 (음성·속도별 라운드니스를 한 번 측정 → TTS volumeGainDb로 보정)
+LOUDNESS_PROFILE_FILE = CACHE_DIR / "loudness_profile.json"
+LOUDNESS_NORMALIZE = os.getenv("LOUDNESS_NORMALIZE", "1") != "0"
+LOUDNESS_TARGET_LUFS = -16.0   # 음성 콘텐츠 목표 (EBU R128 integrated)
+
+# ── 작업 큐 (scheduler.py → worker.py) ─────────────────────
+JOB_DB = DATA_DIR / "jobs.sqlite3"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 워커 프로세스 수
+JOB_LEASE_SEC = 600       # 작업 임대 시간 (워커가 주기적으로 연장)
+JOB_MAX_ATTEMPTS = 3      # 단계별 최대 시도 횟수
+JOB_RETRY_BASE_SEC = 60   # 재시도 대기 (60s, 120s, 240s...)
+JOB_POLL_SEC = 5          # 대기 작업이 없을 때 폴링 간격
+
+# ── 게시 예약 (YouTube publishAt) ──────────────────────────
+PUBLISH_TZ = "Asia/Seoul"
+PUBLISH_HOUR = 7            # 게시 시각 (PUBLISH_TZ 기준)
+PRODUCE_AHEAD_DAYS = 2      # 오늘부터 N일 뒤 게시분까지 미리 제작 (비공개 예약 업로드)
+PRODUCE_INTERVAL_MIN = 60   # 스케줄러가 미리 제작할 작업을 채우는 주기 (분)
+
+# ── YouTube 업로드 (resumable) ─────────────────────────────
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024  # 256KB 배수
+UPLOAD_MAX_RETRIES = 8            # 연속 실패 허용 횟수 (5xx / 네트워크 오류)
+UPLOAD_RETRY_BASE_SEC = 1.0       # 재시도 대기 1s, 2s, 4s ... (지터 포함)
+UPLOAD_RETRY_MAX_SEC = 64
+UPLOAD_SESSION_MAX_AGE = 6 * 24 * 3600  # 저장한 세션 URI 재사용 기한 (YouTube 세션 유효 약 1주)
+
+# ── YouTube API 쿼터 ───────────────────────────────────────
+QUOTA_DB = HISTORY_DIR / "youtube_quota.sqlite3"
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))  # 프로젝트 일일 쿼터 (units)
+UPLOAD_QUOTA_COST = 1600           # videos.insert 1회 비용 (units)
+QUOTA_TZ = "America/Los_Angeles"   # 쿼터는 태평양 시간 자정에 초기화
+UPLOAD_CONCURRENCY = 2             # 동시 업로드 수 (모든 프로세스 합계)
+
+# ── 산출물 저장소 / 디스크 예산 ────────────────────────────
+STORE_DB = STORE_DIR / "artifacts.sqlite3"
+ARTIFACT_BUDGET_BYTES = int(float(os.getenv("ARTIFACT_BUDGET_GB", "20")) * 1024 ** 3)
+ARTIFACT_GC_GRACE_SEC = 3600   # 최근 사용한 산출물은 GC 대상에서 제외 (다른 프로세스가 사용 중일 수 있음)
+ARTIFACT_REF_MAX_AGE_DAYS = 14  # 이보다 오래된 참조는 GC 때 해제 (실패/중단으로 업로드되지 않은 에피소드)
+
 # ── 영상 설정 ──────────────────────────────────────────────
 THUMBNAIL_SIZE = (1080, 1920)
 
-# 디렉토리 자동 생성
-for d in [CACHE_DIR, HISTORY_DIR, SCRIPTS_DIR, AUDIO_DIR, VIDEO_DIR, LOG_DIR]:
-    d.mkdir(parents=True, exist_ok=True)
+# 영상 인코더 (python -m pipeline.encoder --calibrate: 호스트별 측정 결과를 프로필로 저장)
+ENCODER_PROFILE_FILE = CACHE_DIR / "encoder_profile.json"
+ENCODER_AUTO_CALIBRATE = os.getenv("ENCODER_AUTO_CALIBRATE", "0") == "1"  # 1이면 프로필이 없을 때 첫 렌더링 전에 측정 (기본: libx264)
+ENCODER_MIN_SSIM = 0.98       # 기준 프레임 대비 최소 화질 (이 값 미만인 설정은 제외)
+ENCODER_MAX_SIZE_RATIO = 1.5  # 기본 설정(libx264-medium) 크기 대비 최대 파일 크기 (초과하는 설정은 제외)
+ENCODER_CALIBRATION_SEC = 4   # 측정용 클립 길이 (초)
+
+# 디렉토리 생성 (import 시점이 아닌 실제 쓰기 직전에 호출)
+def ensure_dirs():
+    for d in [CACHE_DIR, GEMINI_CACHE_DIR, HISTORY_DIR, SCRIPTS_DIR, AUDIO_DIR, VIDEO_DIR, LOG_DIR, LOCK_DIR, STORE_DIR]:
+        d.mkdir(parents=True, exist_ok=True)
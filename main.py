@@ -6,29 +6,48 @@
   python main.py --dry-run        # 업로드 없이 테스트
   python main.py --skip-cache     # 캐시 무시하고 PDF 재추출
   python main.py --privacy private  # 비공개로 업로드
+  python main.py --no-llm-cache   # Gemini 응답 캐시 사용 안 함 (항상 새로 생성)
+  python main.py --publish-at "2026-01-05 07:00"  # 비공개 업로드 후 해당 시각(KST)에 자동 공개
+  python main.py --ssml           # 같은 음성이 이어지는 대사를 SSML 한 요청으로 합성
 """
 import argparse
-import json
 import os
 import sys
+import time
 import logging
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 from config import (
-    SCRIPTS_DIR, AUDIO_DIR, VIDEO_DIR, LOG_DIR,
-    PDF_N1, PDF_N2, PDF_KANJI,
+    VIDEO_DIR, LOG_DIR,
+    PDF_N1, PDF_N2, PDF_KANJI, PUBLISH_TZ, JOB_RETRY_BASE_SEC, ensure_dirs,
 )
 from pipeline.extract_knowledge import load_or_extract_all
 from pipeline.generate_situation import generate_situations, save_history
-from pipeline.generate_script import generate_script
-from pipeline.merge_audio import export_episode
+from pipeline.generate_script import generate_scripts, get_repair_metrics
+from pipeline.gemini import set_cache_enabled
+from pipeline.knowledge_sampler import get_sampler
+from pipeline.merge_audio import export_episode, set_ssml_enabled
 from pipeline.tts import check_tts
 from pipeline.make_video import build_video
-from pipeline.youtube_upload import upload_video
+from pipeline.upload_manager import UploadManager
+from pipeline.job_queue import JobQueue, STAGES
+from pipeline.episode_stages import episode_id, episode_paths, publish_date
+from pipeline.locks import run_lock, episode_lock, atomic_write_json, LockBusy
+from pipeline import instrument
+from pipeline.instrument import span
+from pipeline.ffmpeg_runner import format_episode_summary
+from pipeline.artifact_store import episode_holder, get_store
+
+EPISODE_TYPES = ("B2B", "B2C")
 
 # ── 로깅 설정 ──────────────────────────────────────────────
 def setup_logging():
+    ensure_dirs()
     log_file = LOG_DIR / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    instrument.configure(log_file.with_suffix(".spans.jsonl"))
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
@@ -40,83 +59,195 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
+def _job_payload(privacy: str, publish_at, dry_run: bool = False, **extra) -> dict:
+    """워커 작업과 같은 형식의 payload"""
+    return {**extra, "privacy": privacy, "dry_run": dry_run,
+            "publish_at": publish_at.isoformat() if publish_at else None}
+
+
+def _defer_upload(result: dict, privacy: str, publish_at, logger):
+    """
+    못 올린 에피소드 → 작업 큐에 upload 작업으로 등록 (워커가 재시도)
+      쿼터 초과: 다음 쿼터 창 시작 이후
+      업로드 실패: JOB_RETRY_BASE_SEC 뒤 (이후 실패는 작업 큐의 백오프/최대 시도 횟수를 따름)
+    """
+    if "deferred_until" in result:
+        retry_at, reason, log = result["deferred_until"], "쿼터 초과", logger.warning
+    else:
+        retry_at, reason, log = (time.time() + JOB_RETRY_BASE_SEC,
+                                 f"업로드 실패: {result['error']}", logger.error)
+    with JobQueue() as queue:
+        queue.enqueue(result["ep_id"], "upload", _job_payload(privacy, publish_at),
+                      available_at=retry_at)
+    log(f"  [{result['ep_id']}] {reason} - "
+        f"{datetime.fromtimestamp(retry_at):%m-%d %H:%M} 이후 워커가 업로드")
+
+
+def _check_tts_stage() -> bool:
+    with span("stage.check_tts"):
+        return check_tts()
+
+
 def run(dry_run: bool = False, skip_cache: bool = False,
-        privacy: str = "public"):
+        privacy: str = "public", no_llm_cache: bool = False, publish_at=None,
+        ssml: bool = False):
     logger = setup_logging()
     logger.info("=" * 60)
     logger.info(f"비즈니스 일본어 YouTube 자동 업로드 시작")
     logger.info(f"실행 시각: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"dry_run={dry_run}, privacy={privacy}")
+    logger.info(f"dry_run={dry_run}, privacy={privacy}, no_llm_cache={no_llm_cache}, "
+                f"publish_at={publish_at}, ssml={ssml}")
     logger.info("=" * 60)
 
-    # ── 0. TTS 연결 확인 ───────────────────────────────────
+    if no_llm_cache:
+        set_cache_enabled(False)
+    if ssml:
+        set_ssml_enabled(True)
+
+    # ── 0. TTS 준비 확인 (voices 목록, 지식베이스 로드와 동시에 실행) ──
+    instrument.reset()
     logger.info("TTS 연결 확인 중...")
-    if not check_tts():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        tts_check = pool.submit(_check_tts_stage)
+
+        # ── 1. 캐시 무시 옵션 ──────────────────────────────────
+        if skip_cache:
+            from config import CACHE_N1, CACHE_N2, CACHE_KANJI
+            for cache in [CACHE_N1, CACHE_N2, CACHE_KANJI]:
+                if cache.exists():
+                    cache.unlink()
+                    logger.info(f"캐시 삭제: {cache}")
+
+        # ── 2. 지식베이스 로드 (캐시 우선) ────────────────────
+        logger.info("\n[1단계] 지식베이스 로드...")
+        with span("stage.knowledge"):
+            knowledge = load_or_extract_all()
+
+        tts_ok = tts_check.result()
+    if not tts_ok:
         logger.error("Google Cloud TTS 연결 실패. GOOGLE_TTS_API_KEY를 확인하세요.")
         sys.exit(1)
     logger.info("TTS OK")
 
-    # ── 1. 캐시 무시 옵션 ──────────────────────────────────
-    if skip_cache:
-        from config import CACHE_N1, CACHE_N2, CACHE_KANJI
-        for cache in [CACHE_N1, CACHE_N2, CACHE_KANJI]:
-            if cache.exists():
-                cache.unlink()
-                logger.info(f"캐시 삭제: {cache}")
-
-    # ── 2. 지식베이스 로드 (캐시 우선) ────────────────────
-    logger.info("\n[1단계] 지식베이스 로드...")
-    knowledge = load_or_extract_all()
-
-    # ── 3. 오늘 상황 생성 ──────────────────────────────────
-    logger.info("\n[2단계] 오늘의 상황 생성...")
-    situations = generate_situations()
-    save_history(situations)
-    for s in situations:
-        logger.info(f"  [{s['type']}] {s['situation']} / {s['channel']} / {s['difficulty']}")
-
-    # ── 4. 에피소드 생성 루프 ──────────────────────────────
-    uploaded_urls = []
-    today = datetime.now().strftime("%Y%m%d")
-
-    for situation in situations:
-        ep_type = situation["type"]
-        ep_id = f"{today}_{ep_type}"
-        logger.info(f"\n{'='*50}")
-        logger.info(f"[3단계] {ep_id} 에피소드 생성 중...")
-
-        # 스크립트 생성
-        logger.info("  스크립트 생성 (Gemini API)...")
-        script = generate_script(situation, knowledge)
-
-        script_path = SCRIPTS_DIR / f"{ep_id}.json"
-        with open(script_path, "w", encoding="utf-8") as f:
-            json.dump(script, f, ensure_ascii=False, indent=2)
-        logger.info(f"  스크립트 저장: {script_path}")
-
-        # 오디오 합성 (timings 정보 수집)
-        logger.info("  오디오 합성 (TTS)...")
-        mp3_path_base = str(AUDIO_DIR / f"{ep_id}.mp3")
-        mp3_path, timings = export_episode(script, mp3_path_base)
-
-        # 영상 제작
-        logger.info("  영상 제작 (ffmpeg)...")
-        video_path = build_video(script, mp3_path, str(VIDEO_DIR), timings=timings)
-
-        # YouTube 업로드
-        if dry_run:
-            logger.info(f"  [DRY-RUN] 업로드 스킵: {video_path}")
-            uploaded_urls.append({"ep_id": ep_id, "url": f"[dry-run] {video_path}"})
-        else:
-            logger.info("  YouTube 업로드...")
-            url = upload_video(video_path, script, privacy=privacy)
-            uploaded_urls.append({"ep_id": ep_id, "url": url})
-
-    # ── 5. 결과 요약 ───────────────────────────────────────
+    # ── 에피소드 잠금 (다른 프로세스가 같은 ep_id를 처리 중이면 건너뜀) ──
+    # ep_id는 워커와 같은 기준 (PUBLISH_TZ 게시 날짜, --publish-at이면 그 날짜)
+    day = publish_date(publish_at)
+    with ExitStack() as held_locks:
+        locked_types = []
+        for ep_type in EPISODE_TYPES:
+            try:
+                held_locks.enter_context(episode_lock(episode_id(day, ep_type)))
+                locked_types.append(ep_type)
+            except LockBusy:
+                logger.warning(f"  [{episode_id(day, ep_type)}] 다른 프로세스에서 처리 중 - 건너뜀")
+
+        # ── 3. 오늘 상황 생성 ──────────────────────────────────
+        # 상황 선택 + 히스토리 기록 + 작업 큐 등록은 run_lock 안에서
+        # (워커 enqueue_episodes와 ep_id가 같으므로, 큐에 이미 있는 에피소드는 워커에 맡기고
+        #  여기서 만드는 에피소드는 큐에 등록 → 워커가 같은 ep_id를 새로 만들지 않음.
+        #  이 실행이 중간에 실패하면 워커가 남은 단계를 이어서 처리)
+        logger.info("\n[2단계] 오늘의 상황 생성...")
+        with span("stage.situations"), run_lock(), JobQueue() as queue:
+            queued_types = [t for t in locked_types if queue.has_episode(episode_id(day, t))]
+            for ep_type in queued_types:
+                logger.warning(f"  [{episode_id(day, ep_type)}] 작업 큐에 등록된 에피소드 - 워커가 처리, 건너뜀")
+            situations = [s for s in generate_situations()
+                          if s["type"] in locked_types and s["type"] not in queued_types]
+            save_history(situations, [episode_id(day, s["type"]) for s in situations])
+            for s in situations:
+                queue.enqueue(episode_id(day, s["type"]), "script",
+                              _job_payload(privacy, publish_at, dry_run, situation=s))
+        for s in situations:
+            logger.info(f"  [{s['type']}] {s['situation']} / {s['channel']} / {s['difficulty']}")
+
+        # ── 4. 스크립트 일괄 생성 (Gemini 배치 요청 1회) ──────
+        logger.info("\n[3단계] 스크립트 생성 (Gemini API, 배치)...")
+        with span("stage.scripts", count=len(situations)):
+            scripts = generate_scripts(situations, knowledge)
+
+        # ── 5. 에피소드 생성 루프 ──────────────────────────────
+        uploaded_urls = []
+        pending_uploads = []
+
+        for situation, script in zip(situations, scripts):
+            ep_type = situation["type"]
+            ep_id = episode_id(day, ep_type)
+            logger.info(f"\n{'='*50}")
+            logger.info(f"[4단계] {ep_id} 에피소드 생성 중...")
+
+            if script is None:
+                # 불완전한 스크립트는 TTS/렌더/업로드 하지 않음
+                logger.error(f"  [{ep_id}] 스크립트 생성 실패, 에피소드 건너뜀")
+                continue
+
+            paths = episode_paths(ep_id)
+            script_path = paths["script"]
+            atomic_write_json(script_path, script, indent=2)
+            logger.info(f"  스크립트 저장: {script_path}")
+
+            # 오디오 합성 (timings 정보 수집, 워커 tts 단계와 같이 timings.json도 저장)
+            logger.info("  오디오 합성 (TTS)...")
+            with span("stage.tts", ep_id=ep_id):
+                mp3_path, timings = export_episode(script, str(paths["audio"]))
+                atomic_write_json(paths["timings"], timings)
+
+            # 영상 제작
+            logger.info("  영상 제작 (ffmpeg)...")
+            with span("stage.render", ep_id=ep_id):
+                video_path = build_video(script, mp3_path, str(VIDEO_DIR), timings=timings)
+            logger.info(format_episode_summary(ep_id))
+
+            # YouTube 업로드 (렌더링이 끝난 뒤 일괄 동시 업로드)
+            job_payload = _job_payload(privacy, publish_at, dry_run, situation=situation,
+                                       script_path=str(script_path), audio_path=mp3_path,
+                                       video_path=video_path)
+            if dry_run:
+                logger.info(f"  [DRY-RUN] 업로드 스킵: {video_path}")
+                url = f"[dry-run] {video_path}"
+                uploaded_urls.append({"ep_id": ep_id, "url": url})
+                get_store().release(episode_holder(video_path))  # 업로드하지 않으므로 참조 해제
+                with JobQueue() as queue:
+                    queue.mark_done(ep_id, STAGES, {**job_payload, "url": url}, worker="main")
+            else:
+                with JobQueue() as queue:
+                    queue.mark_done(ep_id, STAGES[:-1], job_payload, worker="main")
+                pending_uploads.append({
+                    "ep_id": ep_id, "video_path": video_path, "script": script,
+                    "privacy": privacy, "publish_at": publish_at,
+                })
+
+        # ── 6. YouTube 업로드 (동시 업로드 + 쿼터 확인) ────────
+        if pending_uploads:
+            logger.info(f"\n[5단계] YouTube 업로드 {len(pending_uploads)}건...")
+            with span("stage.upload", count=len(pending_uploads)):
+                results = UploadManager().run(pending_uploads)
+            for result in results:
+                if "url" in result:
+                    uploaded_urls.append(result)
+                    # 워커 upload 단계와 같은 완료 기록 (같은 ep_id 재업로드 방지)
+                    atomic_write_json(episode_paths(result["ep_id"])["uploaded"], {"url": result["url"]})
+                    with JobQueue() as queue:
+                        queue.mark_done(result["ep_id"], ["upload"],
+                                        _job_payload(privacy, publish_at, url=result["url"]),
+                                        worker="main")
+                else:
+                    # 쿼터 초과 / 업로드 실패 모두 upload 작업으로 등록 (렌더링한 에피소드가 버려지지 않도록)
+                    _defer_upload(result, privacy, publish_at, logger)
+
+    # ── 7. 결과 요약 ───────────────────────────────────────
     logger.info(f"\n{'='*60}")
     logger.info(f"완료! {len(uploaded_urls)}개 에피소드 처리됨")
     for item in uploaded_urls:
         logger.info(f"  [{item['ep_id']}] {item['url']}")
+    logger.info(f"스크립트 보정 지표: {get_repair_metrics()}")
+    logger.info("단계별 계측 (span):\n" + instrument.format_summary())
+    coverage = get_sampler(knowledge).coverage()
+    logger.info("지식 커버리지: " + ", ".join(
+        f"{lv} {c['used']}/{c['total']}" for lv, c in coverage.items()
+    ))
+    gc = get_store().gc()
+    logger.info(f"산출물 저장소: {gc['after'] / 1024 ** 2:.0f} MB "
+                f"(GC {len(gc['evicted'])}개, {gc['freed'] / 1024 ** 2:.0f} MB 정리)")
 
     return uploaded_urls
 
@@ -129,10 +260,23 @@ if __name__ == "__main__":
                         help="PDF 캐시 무시하고 재추출")
     parser.add_argument("--privacy", choices=["public", "unlisted", "private"],
                         default="public", help="YouTube 공개 설정 (기본: public)")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Gemini 응답 캐시를 우회하고 항상 새로 생성")
+    parser.add_argument("--publish-at", metavar="YYYY-MM-DD HH:MM",
+                        help=f"게시 예약 시각 ({PUBLISH_TZ} 기준). 비공개로 올린 뒤 해당 시각에 공개")
+    parser.add_argument("--ssml", action="store_true",
+                        help="같은 음성이 이어지는 대사를 SSML(<break>/<mark>) 한 요청으로 합성 (TTS_SSML_MODE=1과 같음)")
     args = parser.parse_args()
 
+    publish_at = None
+    if args.publish_at:
+        publish_at = datetime.fromisoformat(args.publish_at).replace(tzinfo=ZoneInfo(PUBLISH_TZ))
+
     run(
         dry_run=args.dry_run,
         skip_cache=args.skip_cache,
         privacy=args.privacy,
+        no_llm_cache=args.no_llm_cache,
+        publish_at=publish_at,
+        ssml=args.ssml,
     )
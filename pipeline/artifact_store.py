@@ -0,0 +1,324 @@
+"""
+내용 주소 기반 산출물 저장소 (입력 해시 → 산출물) + 참조 카운트 + 디스크 예산 GC
+
+- get_or_build(kind, inputs, build): 같은 입력이면 이전 실행의 산출물을 그대로 재사용
+  (TTS 세그먼트, 무음, 정지 화면 클립 등 중간 산출물 → data/store/objects/)
+- register_file(path, kind, holder): 에피소드 산출물(data/audio, data/video)을 GC 대상으로 등록
+- 참조: holder(예: "ep:20260105_B2B")가 사용 중인 산출물 → 업로드 완료 / dry-run 완료 시 release
+  ARTIFACT_REF_MAX_AGE_DAYS보다 오래된 참조는 GC 때 해제 (실패해 끝나지 않은 에피소드가 계속 붙잡지 않도록)
+- publish(video_path, holder): 게시한 영상은 고정(pinned) → GC에서 삭제하지 않음
+
+GC 순서 (예산 이하가 될 때까지, 최근 ARTIFACT_GC_GRACE_SEC 내 사용분 제외)
+  1. 참조 없는 중간 산출물 (오래 사용하지 않은 순)
+  2. 참조 없는 에피소드 산출물
+  3. 참조 중인 중간 산출물 (다시 만들 수 있으므로)
+  참조 중인 에피소드 산출물(업로드 전)과 게시한 영상은 삭제하지 않음
+
+사용법:
+  python -m pipeline.artifact_store            # 사용량 출력
+  python -m pipeline.artifact_store --gc       # 예산(ARTIFACT_BUDGET_GB)까지 정리
+  python -m pipeline.artifact_store --gc --budget-gb 5 --dry-run
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import (
+    STORE_DIR, STORE_DB, AUDIO_DIR, VIDEO_DIR,
+    ARTIFACT_BUDGET_BYTES, ARTIFACT_GC_GRACE_SEC, ARTIFACT_REF_MAX_AGE_DAYS, ensure_dirs,
+)
+from pipeline.locks import file_lock
+
+STORE_VERSION = 1
+
+# 다시 만들 수 있는 중간 산출물 (먼저 삭제)
+INTERMEDIATE_KINDS = ("tts", "silence", "clip")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key        TEXT PRIMARY KEY,   -- 입력 해시 (에피소드 산출물은 "file:<경로>")
+    kind       TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    meta       TEXT,               -- JSON (예: 오디오 길이)
+    pinned     INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    holder   TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    added_at REAL,                -- 마지막으로 참조한 시각 (오래된 참조는 GC 때 해제)
+    PRIMARY KEY (holder, key)
+);
+CREATE INDEX IF NOT EXISTS idx_refs_key ON refs (key);
+"""
+
+
+def content_key(kind: str, inputs: dict) -> str:
+    raw = json.dumps({"v": STORE_VERSION, "kind": kind, "inputs": inputs},
+                     ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_key(path) -> str:
+    return f"file:{Path(path).resolve()}"
+
+
+def episode_holder(path) -> str:
+    """산출물 파일명(ep_id.확장자)으로 참조 holder 결정"""
+    return f"ep:{Path(path).stem}"
+
+
+class ArtifactStore:
+    def __init__(self, path=STORE_DB):
+        ensure_dirs()
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """added_at 없는 이전 refs 테이블 → 컬럼 추가 (기존 참조는 지금 시각 기준으로 나이 계산)"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(refs)")}
+        if "added_at" not in columns:
+            self.conn.execute("ALTER TABLE refs ADD COLUMN added_at REAL")
+            self.conn.execute("UPDATE refs SET added_at = ? WHERE added_at IS NULL", (time.time(),))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── 조회 / 생성 ────────────────────────────────────────
+
+    def lookup(self, key: str) -> dict | None:
+        """저장된 산출물 {"key", "path", "meta"} (파일이 사라졌으면 기록 삭제 후 None)"""
+        row = self.conn.execute(
+            "SELECT path, meta FROM artifacts WHERE key = ?", (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        if not os.path.exists(row[0]):
+            self._forget(key)
+            return None
+        self.conn.execute("UPDATE artifacts SET last_used = ? WHERE key = ?", (time.time(), key))
+        return {"key": key, "path": row[0], "meta": json.loads(row[1] or "{}")}
+
+    def get_or_build(self, kind: str, inputs: dict, build, ext: str = "",
+                     holder: str = None) -> dict:
+        """
+        입력이 같은 산출물이 있으면 재사용, 없으면 build(임시 경로)로 생성 후 저장
+        Returns:
+            {"key", "path", "meta", "hit"}
+        """
+        key = content_key(kind, inputs)
+        found = self.lookup(key)
+        if found is None:
+            path = STORE_DIR / "objects" / key[:2] / f"{key}{ext}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{key}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+            try:
+                build(str(tmp))
+                os.replace(tmp, path)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            self._record(key, kind, path)
+            found = {"key": key, "path": str(path), "meta": {}, "hit": False}
+        else:
+            found["hit"] = True
+        if holder:
+            self.add_ref(holder, key)
+        return found
+
+    def set_meta(self, key: str, **meta):
+        row = self.conn.execute("SELECT meta FROM artifacts WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            merged = {**json.loads(row[0] or "{}"), **meta}
+            self.conn.execute("UPDATE artifacts SET meta = ? WHERE key = ?",
+                              (json.dumps(merged, ensure_ascii=False), key))
+
+    def register_file(self, path, kind: str, holder: str = None, pinned: bool = False) -> str:
+        """저장소 밖 파일(에피소드 산출물)을 등록 → GC 대상 / 참조 관리"""
+        key = _file_key(path)
+        self._record(key, kind, Path(path), pinned)
+        if holder:
+            self.add_ref(holder, key)
+        return key
+
+    def _record(self, key: str, kind: str, path: Path, pinned: bool = False):
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO artifacts (key, kind, path, size, pinned, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET path = excluded.path, size = excluded.size, "
+            "pinned = MAX(pinned, excluded.pinned), last_used = excluded.last_used",
+            (key, kind, str(path), path.stat().st_size, int(pinned), now, now),
+        )
+
+    def _forget(self, key: str):
+        self.conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+        self.conn.execute("DELETE FROM refs WHERE key = ?", (key,))
+
+    # ── 참조 ───────────────────────────────────────────────
+
+    def add_ref(self, holder: str, key: str):
+        self.conn.execute(
+            "INSERT INTO refs (holder, key, added_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (holder, key) DO UPDATE SET added_at = excluded.added_at",
+            (holder, key, time.time()),
+        )
+
+    def release(self, holder: str) -> int:
+        """holder의 참조 모두 해제 → 해제한 개수"""
+        return self.conn.execute("DELETE FROM refs WHERE holder = ?", (holder,)).rowcount
+
+    def expire_refs(self, max_age_days: float = ARTIFACT_REF_MAX_AGE_DAYS) -> int:
+        """max_age_days보다 오래된 참조 해제 → 해제한 개수"""
+        cutoff = time.time() - max_age_days * 86400
+        return self.conn.execute("DELETE FROM refs WHERE added_at < ?", (cutoff,)).rowcount
+
+    def publish(self, video_path, holder: str = None):
+        """게시한 영상 고정 + 에피소드 참조 해제 (중간 산출물은 GC 대상이 됨)"""
+        self.register_file(video_path, "video", pinned=True)
+        self.release(holder or episode_holder(video_path))
+
+    # ── 사용량 / GC ────────────────────────────────────────
+
+    def scan(self) -> int:
+        """
+        저장소 도입 전 에피소드 산출물 등록 (업로드 기록이 있으면 게시 영상으로 고정)
+        참조는 걸지 않음 (어느 실행이 쓰는지 알 수 없는 이전 파일이 GC에서 계속 빠지지 않도록)
+        """
+        known = {row[0] for row in self.conn.execute("SELECT path FROM artifacts")}
+        added = 0
+        for directory, pattern, kind in ((AUDIO_DIR, "*.mp3", "audio"),
+                                         (VIDEO_DIR, "*.mp4", "video"),
+                                         (VIDEO_DIR, "*_thumb.jpg", "thumbnail")):
+            for p in directory.glob(pattern):
+                if p.name.startswith(".") or str(p.resolve()) in known:
+                    continue
+                ep_id = p.stem.removesuffix("_thumb")
+                published = (VIDEO_DIR / f"{ep_id}.uploaded.json").exists()
+                self.register_file(p, kind, pinned=published and kind == "video")
+                added += 1
+        return added
+
+    def usage(self) -> dict:
+        """kind별 {"count", "bytes", "pinned_bytes", "referenced_bytes"}"""
+        rows = self.conn.execute("""
+            SELECT a.kind, COUNT(*), SUM(a.size),
+                   SUM(CASE WHEN a.pinned THEN a.size ELSE 0 END),
+                   SUM(CASE WHEN EXISTS (SELECT 1 FROM refs r WHERE r.key = a.key)
+                            THEN a.size ELSE 0 END)
+            FROM artifacts a GROUP BY a.kind
+        """).fetchall()
+        return {kind: {"count": n, "bytes": total or 0, "pinned_bytes": pinned or 0,
+                       "referenced_bytes": referenced or 0}
+                for kind, n, total, pinned, referenced in rows}
+
+    def total_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def _candidates(self) -> list:
+        """삭제 후보 (삭제 순서대로): 고정 제외, 참조 중인 에피소드 산출물 제외"""
+        rows = self.conn.execute("""
+            SELECT a.key, a.kind, a.path, a.size, a.last_used,
+                   EXISTS (SELECT 1 FROM refs r WHERE r.key = a.key) AS referenced
+            FROM artifacts a
+            WHERE a.pinned = 0 AND a.last_used < ?
+        """, (time.time() - ARTIFACT_GC_GRACE_SEC,)).fetchall()
+
+        def tier(row):
+            intermediate = row[1] in INTERMEDIATE_KINDS
+            if not row[5]:
+                return 0 if intermediate else 1
+            return 2 if intermediate else None
+
+        ranked = [(tier(r), r[4], r) for r in rows if tier(r) is not None]
+        return [r for _, _, r in sorted(ranked)]
+
+    def gc(self, budget: int = ARTIFACT_BUDGET_BYTES, dry_run: bool = False) -> dict:
+        """
+        전체 크기가 budget 이하가 될 때까지 삭제 (먼저 오래된 참조 해제)
+        Returns:
+            {"before", "after", "freed", "evicted": [{"kind", "path", "size"}], "expired_refs"}
+        """
+        with file_lock("artifact_gc"):
+            expired_refs = 0 if dry_run else self.expire_refs()
+            self.scan()
+            before = total = self.total_bytes()
+            evicted = []
+            for key, kind, path, size, _, _ in self._candidates():
+                if total <= budget:
+                    break
+                if not dry_run:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    self._forget(key)
+                evicted.append({"kind": kind, "path": path, "size": size})
+                total -= size
+        return {"before": before, "after": total, "freed": before - total, "evicted": evicted,
+                "expired_refs": expired_refs}
+
+
+_local = threading.local()
+
+
+def get_store() -> ArtifactStore:
+    """스레드별 저장소 연결 (SQLite 연결은 스레드 간 공유 불가)"""
+    store = getattr(_local, "store", None)
+    if store is None:
+        store = _local.store = ArtifactStore()
+    return store
+
+
+def _fmt_bytes(n: int) -> str:
+    return f"{n / 1024 ** 3:.2f} GB" if n >= 1024 ** 3 else f"{n / 1024 ** 2:.1f} MB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="산출물 저장소 사용량 / GC")
+    parser.add_argument("--gc", action="store_true", help="디스크 예산까지 정리")
+    parser.add_argument("--budget-gb", type=float, default=ARTIFACT_BUDGET_BYTES / 1024 ** 3)
+    parser.add_argument("--dry-run", action="store_true", help="삭제 대상만 출력")
+    args = parser.parse_args()
+
+    with ArtifactStore() as store:
+        if args.gc:
+            result = store.gc(int(args.budget_gb * 1024 ** 3), dry_run=args.dry_run)
+            for item in result["evicted"]:
+                print(f"  {'[DRY-RUN] ' if args.dry_run else ''}삭제 {item['kind']:<10} "
+                      f"{_fmt_bytes(item['size']):>10}  {item['path']}")
+            print(f"GC: {_fmt_bytes(result['before'])} → {_fmt_bytes(result['after'])} "
+                  f"(예산 {args.budget_gb:g} GB, {len(result['evicted'])}개 삭제, "
+                  f"오래된 참조 {result['expired_refs']}개 해제)")
+        else:
+            store.scan()
+        for kind, u in sorted(store.usage().items()):
+            print(f"  {kind:<10} {u['count']:>6}개 {_fmt_bytes(u['bytes']):>10}  "
+                  f"(고정 {_fmt_bytes(u['pinned_bytes'])}, 참조 중 {_fmt_bytes(u['referenced_bytes'])})")
+        print(f"합계 {_fmt_bytes(store.total_bytes())} / 예산 {_fmt_bytes(ARTIFACT_BUDGET_BYTES)}")
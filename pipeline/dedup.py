@@ -0,0 +1,121 @@
+"""
+추출된 지식 항목(문법/한자)의 정규화 + 유사 중복 제거 인덱스
+
+- NFKC 정규화 (전각/반각 통일)
+- 물결표 계열(〜 ～ ~ ∼ 〰) 통일
+- 공백 제거
+- 문자 n-gram Jaccard 유사도로 표기 흔들림 병합
+"""
+import re
+import unicodedata
+from collections import Counter
+
+# 물결표/파선 계열 → 〜 (U+301C) 로 통일
+_TILDE_CHARS = "〜～~∼〰"
+_TILDE_RE = re.compile(f"[{re.escape(_TILDE_CHARS)}]+")
+_SPACE_RE = re.compile(r"\s+")
+
+# 기본 유사도 임계값 (문자 bigram Jaccard)
+DEFAULT_THRESHOLD = 0.85
+
+
+def normalize_key(text: str) -> str:
+    """비교용 정규화 키 생성 (원문은 그대로 유지)"""
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = _TILDE_RE.sub("〜", text)
+    text = _SPACE_RE.sub("", text)
+    return text.strip("〜").lower()
+
+
+def _ngrams(text: str, n: int) -> set:
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _merge_fields(base: dict, dup: dict) -> None:
+    """base에 비어있는 필드를 dup 값으로 보충"""
+    for k, v in dup.items():
+        if v and not base.get(k):
+            base[k] = v
+
+
+class DedupIndex:
+    """
+    정규화 키 + n-gram 역색인 기반 유사 중복 인덱스
+    add()로 항목을 넣으면 중복일 경우 기존 항목에 병합하고 False 반환.
+
+    Args:
+        field: 중복 판정에 사용할 필드명 (예: "form", "kanji")
+        threshold: Jaccard 임계값. None이면 정규화 키 완전 일치만 병합
+        n: n-gram 크기
+    """
+
+    def __init__(self, field: str, threshold: float | None = DEFAULT_THRESHOLD,
+                 n: int = 2):
+        self.field = field
+        self.threshold = threshold
+        self.n = n
+        self.items: list[dict] = []
+        self.merged = 0
+        self._by_key: dict[str, int] = {}
+        self._grams: list[set] = []
+        self._inverted: dict[str, set] = {}
+
+    def _find_similar(self, grams: set) -> int | None:
+        """공유 n-gram이 있는 후보만 대상으로 Jaccard 계산"""
+        shared = Counter()
+        for g in grams:
+            for idx in self._inverted.get(g, ()):
+                shared[idx] += 1
+        best, best_score = None, 0.0
+        for idx, inter in shared.items():
+            union = len(grams) + len(self._grams[idx]) - inter
+            score = inter / union if union else 0.0
+            if score > best_score:
+                best, best_score = idx, score
+        if best is not None and best_score >= self.threshold:
+            return best
+        return None
+
+    def add(self, item: dict) -> bool:
+        """항목 추가. 새 항목이면 True, 중복으로 병합되면 False"""
+        key = normalize_key(item.get(self.field, ""))
+        if not key:
+            return False
+
+        idx = self._by_key.get(key)
+        grams = _ngrams(key, self.n)
+        if idx is None and self.threshold is not None:
+            idx = self._find_similar(grams)
+        if idx is not None:
+            _merge_fields(self.items[idx], item)
+            self._by_key.setdefault(key, idx)
+            self.merged += 1
+            return False
+
+        idx = len(self.items)
+        self.items.append(dict(item))
+        self._by_key[key] = idx
+        self._grams.append(grams)
+        for g in grams:
+            self._inverted.setdefault(g, set()).add(idx)
+        return True
+
+    def extend(self, items: list) -> None:
+        for item in items:
+            if isinstance(item, dict):
+                self.add(item)
+
+
+def dedup_items(items: list, field: str,
+                threshold: float | None = DEFAULT_THRESHOLD) -> tuple[list, int]:
+    """
+    리스트 중복 제거
+    반환: (중복 제거된 리스트, 병합된 항목 수)
+    """
+    index = DedupIndex(field, threshold=threshold)
+    index.extend(items)
+    return index.items, index.merged
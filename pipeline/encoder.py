@@ -0,0 +1,267 @@
+"""
+영상 인코더 선택 (호스트별 측정 → 프로필)
+
+후보 설정(libx264 프리셋, libx265, libsvtav1)으로 기준 대사 프레임 클립을 인코딩해
+  - 속도 (클립 길이 / 인코딩 시간)
+  - 파일 크기
+  - 화질 (기준 프레임 대비 SSIM)
+를 측정하고, ENCODER_MIN_SSIM 이상이면서 파일 크기가 기본 설정의 ENCODER_MAX_SIZE_RATIO배 이하인
+설정 중 가장 빠른 것을 ENCODER_PROFILE_FILE에 저장합니다. (빠르지만 업로드 용량이 크게 늘어나는 설정 제외)
+make_video는 video_codec_args()로 프로필의 인코더 옵션을 사용합니다.
+프로필이 없거나 다른 호스트/ffmpeg에서 만든 것이면 기본값(libx264 기본 프리셋)을 씁니다.
+측정은 렌더링 밖에서 실행: --calibrate 또는 scheduler.py 시작 시 ensure_profile()
+(ENCODER_AUTO_CALIBRATE=1이면 첫 렌더링 전에 측정 — 여러 인코더를 인코딩하므로 렌더링이 그만큼 늦어짐)
+
+사용법:
+  python -m pipeline.encoder --calibrate   # 측정 후 프로필 저장
+  python -m pipeline.encoder               # 현재 프로필 출력
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import (
+    ENCODER_PROFILE_FILE, ENCODER_AUTO_CALIBRATE, ENCODER_MIN_SSIM, ENCODER_MAX_SIZE_RATIO,
+    ENCODER_CALIBRATION_SEC, SCRIPTS_DIR, THUMBNAIL_SIZE,
+)
+from pipeline import ffmpeg_runner
+from pipeline.locks import atomic_write_json, file_lock
+
+PROFILE_VERSION = 2   # 2: 파일 크기 기준 추가 (이전 프로필은 다시 측정)
+
+# 기존 하드코딩 설정과 같은 결과 (libx264 기본 프리셋 medium, CRF 23)
+DEFAULT_PROFILE = {"name": "libx264-medium", "args": ["-c:v", "libx264"]}
+
+# (이름, 인코더, 옵션) — 화질 목표가 비슷하도록 인코더별 CRF 지정
+CANDIDATES = [
+    *[(f"libx264-{p}", "libx264", ["-preset", p, "-crf", "23"])
+      for p in ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium")],
+    ("libx264-veryfast-still", "libx264", ["-preset", "veryfast", "-tune", "stillimage", "-crf", "23"]),
+    ("libx265-fast", "libx265", ["-preset", "fast", "-crf", "28", "-tag:v", "hvc1"]),
+    ("libsvtav1-10", "libsvtav1", ["-preset", "10", "-crf", "35"]),
+    ("libsvtav1-8", "libsvtav1", ["-preset", "8", "-crf", "35"]),
+]
+
+_SSIM_RE = re.compile(r"All:([\d.]+)")
+
+_profile = None
+
+
+def available_encoders() -> set:
+    result = ffmpeg_runner.run(["ffmpeg", "-hide_banner", "-encoders"], "인코더 목록", check=False)
+    names = set()
+    for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            names.add(parts[1])
+    return names
+
+
+def ffmpeg_version() -> str:
+    result = ffmpeg_runner.run(["ffmpeg", "-hide_banner", "-version"], "버전", check=False)
+    first = result.stdout.decode("utf-8", errors="replace").splitlines()[:1]
+    return first[0] if first else ""
+
+
+def _reference_frame(path: str):
+    """가장 최근 스크립트의 첫 대사 프레임 (스크립트가 없으면 고정 예시)"""
+    from pipeline.make_video import make_dialogue_frame
+    from pipeline.voice_registry import assign_voices
+
+    script = None
+    scripts = sorted(SCRIPTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for p in scripts:
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and data.get("dialogue"):
+            script = data
+            break
+    if script is None:
+        script = {
+            "episode_title": "納期調整の電話",
+            "situation": {"type": "B2B", "situation": "取引先との納期調整", "difficulty": "N2"},
+            "dialogue": [{
+                "speaker": "田中", "role": "営業担当",
+                "text_jp": "お忙しいところ恐れ入ります。先日ご提案いただいた件でお電話いたしました。",
+                "text_ko": "바쁘신 중에 죄송합니다. 지난번에 제안해 주신 건으로 전화드렸습니다.",
+            }],
+        }
+    make_dialogue_frame(script["dialogue"][0], assign_voices(script), script, path)
+
+
+def _ssim(video_path: str, frame_path: str) -> float | None:
+    w, h = THUMBNAIL_SIZE
+    result = ffmpeg_runner.run([
+        "ffmpeg", "-i", video_path, "-loop", "1", "-i", frame_path,
+        "-lavfi", f"[1:v]scale={w}:{h},setsar=1,format=yuv420p[ref];[0:v][ref]ssim",
+        "-frames:v", "24", "-f", "null", "-",
+    ], "SSIM", check=False)
+    m = _SSIM_RE.search(result.stderr.decode("utf-8", errors="replace"))
+    return float(m[1]) if m else None
+
+
+def _encode_clip(frame_path: str, output_path: str, args: list):
+    w, h = THUMBNAIL_SIZE
+    ffmpeg_runner.run([
+        "ffmpeg", "-y",
+        "-loop", "1", "-i", frame_path,
+        "-t", str(ENCODER_CALIBRATION_SEC),
+        "-vf", f"scale={w}:{h},setsar=1",
+        *args, "-pix_fmt", "yuv420p", "-r", "24",
+        output_path,
+    ], "인코더 측정")
+
+
+def _size_cap(results: list) -> float:
+    """
+    허용 파일 크기 상한 (KB) = 기본 설정 크기 × ENCODER_MAX_SIZE_RATIO
+    기본 설정을 측정하지 못했으면 화질 기준을 넘은 설정 중 가장 작은 크기 기준
+    """
+    baseline = next((r["size_kb"] for r in results if r["name"] == DEFAULT_PROFILE["name"]), None)
+    if baseline is None:
+        baseline = min((r["size_kb"] for r in results if r["viable"]), default=0)
+    return baseline * ENCODER_MAX_SIZE_RATIO if baseline else float("inf")
+
+
+def calibrate(verbose: bool = True) -> dict:
+    """후보 설정 측정 → 프로필 (저장은 save_profile)"""
+    encoders = available_encoders()
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        frame = os.path.join(tmpdir, "frame.jpg")
+        _reference_frame(frame)
+        for name, encoder, options in CANDIDATES:
+            if encoder not in encoders:
+                continue
+            args = ["-c:v", encoder, *options]
+            out = os.path.join(tmpdir, f"{name}.mp4")
+            started = time.perf_counter()
+            try:
+                _encode_clip(frame, out, args)
+            except ffmpeg_runner.FfmpegError as e:
+                if verbose:
+                    print(f"  [인코더] {name}: 실패 ({e})")
+                continue
+            elapsed = time.perf_counter() - started
+            ssim = _ssim(out, frame)
+            row = {
+                "name": name, "args": args,
+                "encode_sec": round(elapsed, 3),
+                "speed": round(ENCODER_CALIBRATION_SEC / elapsed, 2),
+                "size_kb": round(os.path.getsize(out) / 1024, 1),
+                "ssim": ssim,
+                "viable": ssim is not None and ssim >= ENCODER_MIN_SSIM,
+            }
+            results.append(row)
+            if verbose:
+                print(f"  [인코더] {name:<24} {row['speed']:>6.2f}x  {row['size_kb']:>8} KB  "
+                      f"SSIM {ssim if ssim is not None else '-'}"
+                      f"{'' if row['viable'] else '  (화질 미달)'}")
+
+    max_size_kb = _size_cap(results)
+    for r in results:
+        if r["viable"] and r["size_kb"] > max_size_kb:
+            r["viable"] = False
+            if verbose:
+                print(f"  [인코더] {r['name']}: 크기 초과 ({r['size_kb']} KB > {max_size_kb:.1f} KB)")
+
+    viable = [r for r in results if r["viable"]]
+    best = min(viable, key=lambda r: r["encode_sec"]) if viable else None
+    chosen = {"name": best["name"], "args": best["args"]} if best else DEFAULT_PROFILE
+    return {
+        "version": PROFILE_VERSION,
+        "host": socket.gethostname(),
+        "ffmpeg": ffmpeg_version(),
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "min_ssim": ENCODER_MIN_SSIM,
+        "max_size_kb": round(max_size_kb, 1) if results and max_size_kb != float("inf") else None,
+        **chosen,
+        "results": results,
+    }
+
+
+def save_profile(profile: dict):
+    atomic_write_json(ENCODER_PROFILE_FILE, profile, indent=2)
+
+
+def _load_saved() -> dict | None:
+    """이 호스트 / 이 ffmpeg에서 측정한 프로필만 사용"""
+    if not ENCODER_PROFILE_FILE.exists():
+        return None
+    try:
+        with open(ENCODER_PROFILE_FILE, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (profile.get("version") != PROFILE_VERSION
+            or profile.get("host") != socket.gethostname()
+            or profile.get("ffmpeg") != ffmpeg_version()):
+        return None
+    return profile
+
+
+def ensure_profile() -> dict | None:
+    """
+    이 호스트의 프로필이 없으면 측정 후 저장 (렌더링 밖에서 호출: scheduler.py 시작 시)
+    Returns:
+        저장된 프로필 (측정 실패 시 None)
+    """
+    profile = _load_saved()
+    if profile is not None:
+        return profile
+    # 여러 프로세스가 동시에 측정하지 않도록 잠금 안에서 다시 확인
+    with file_lock("encoder_calibration"):
+        profile = _load_saved()
+        if profile is None:
+            print("  [인코더] 이 호스트의 인코더 프로필이 없어 측정합니다...")
+            try:
+                profile = calibrate()
+                save_profile(profile)
+                print(f"  [인코더] 선택: {profile['name']} → {ENCODER_PROFILE_FILE}")
+            except Exception as e:
+                print(f"  [경고] 인코더 측정 실패, 기본 설정 사용: {e}")
+    return profile
+
+
+def get_profile() -> dict:
+    """현재 호스트의 인코더 프로필 (프로세스당 1회 로드, 없으면 기본값)"""
+    global _profile
+    if _profile is not None:
+        return _profile
+    profile = ensure_profile() if ENCODER_AUTO_CALIBRATE else _load_saved()
+    _profile = profile or DEFAULT_PROFILE
+    return _profile
+
+
+def video_codec_args() -> list:
+    """make_video ffmpeg 명령에 넣을 영상 인코더 옵션 (예: ["-c:v", "libx264", "-preset", "veryfast", ...])"""
+    return list(get_profile()["args"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="영상 인코더 측정 / 프로필")
+    parser.add_argument("--calibrate", action="store_true", help="후보 인코더 측정 후 프로필 저장")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        profile = calibrate()
+        save_profile(profile)
+        print(f"선택: {profile['name']} {' '.join(profile['args'])} → {ENCODER_PROFILE_FILE}")
+    else:
+        saved = _load_saved()
+        if saved:
+            print(f"프로필: {saved['name']} {' '.join(saved['args'])} "
+                  f"(측정 {saved['calibrated_at']}, {saved['host']})")
+        else:
+            print(f"이 호스트의 프로필 없음 → 기본값 {DEFAULT_PROFILE['name']} "
+                  f"(python -m pipeline.encoder --calibrate)")
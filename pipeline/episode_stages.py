@@ -0,0 +1,146 @@
+"""
+에피소드 단계별 실행 함수 (작업 큐 워커용)
+
+각 단계는 ep_id + payload를 받아 산출물을 data/ 아래에 쓰고, 갱신된 payload를 반환
+  script: payload["situation"] → data/scripts/{ep_id}.json
+  tts:    스크립트 → data/audio/{ep_id}.mp3 + {ep_id}.timings.json
+  render: 스크립트 + 오디오 → data/video/{ep_id}.mp4
+  upload: 영상 → YouTube (결과 URL은 data/video/{ep_id}.uploaded.json)
+
+산출물이 이미 있으면 재사용하므로, 중간에 죽은 작업을 다시 실행해도 앞 단계를 반복하지 않음
+"""
+import os
+import sys
+import json
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import SCRIPTS_DIR, AUDIO_DIR, VIDEO_DIR, PUBLISH_TZ
+from pipeline.locks import atomic_write_json, episode_lock
+
+
+class StageError(Exception):
+    """단계 실행 실패 (작업 큐에서 재시도)"""
+
+
+def publish_date(publish_at: datetime = None) -> date:
+    """게시 날짜 (PUBLISH_TZ 기준). publish_at이 없으면 오늘"""
+    if publish_at is None:
+        return datetime.now(ZoneInfo(PUBLISH_TZ)).date()
+    return publish_at.astimezone(ZoneInfo(PUBLISH_TZ)).date()
+
+
+def episode_id(day: date, ep_type: str) -> str:
+    """ep_id = {게시 날짜 YYYYMMDD}_{유형} (main.py와 워커가 같은 규칙을 써야 큐/잠금이 맞물림)"""
+    return f"{day:%Y%m%d}_{ep_type}"
+
+
+def episode_paths(ep_id: str) -> dict:
+    """에피소드 산출물 경로 (main.py 수동 실행도 같은 파일을 써서 워커와 산출물을 공유)"""
+    return {
+        "script": SCRIPTS_DIR / f"{ep_id}.json",
+        "audio": AUDIO_DIR / f"{ep_id}.mp3",
+        "timings": AUDIO_DIR / f"{ep_id}.timings.json",
+        "video": VIDEO_DIR / f"{ep_id}.mp4",
+        "uploaded": VIDEO_DIR / f"{ep_id}.uploaded.json",
+    }
+
+
+def _load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_knowledge = None
+
+
+def _get_knowledge() -> dict:
+    """지식베이스는 워커 프로세스당 1회만 로드"""
+    global _knowledge
+    if _knowledge is None:
+        from pipeline.extract_knowledge import load_or_extract_all
+        _knowledge = load_or_extract_all()
+    return _knowledge
+
+
+def stage_script(ep_id: str, payload: dict) -> dict:
+    from pipeline.generate_script import generate_scripts
+
+    path = episode_paths(ep_id)["script"]
+    if not path.exists():
+        script = generate_scripts([payload["situation"]], _get_knowledge())[0]
+        if script is None:
+            raise StageError("스크립트 생성 실패")
+        atomic_write_json(path, script, indent=2)
+        print(f"  스크립트 저장: {path}")
+    return {**payload, "script_path": str(path)}
+
+
+def stage_tts(ep_id: str, payload: dict) -> dict:
+    from pipeline.merge_audio import export_episode
+    from pipeline.tts import check_tts
+
+    paths = episode_paths(ep_id)
+    if not (paths["audio"].exists() and paths["timings"].exists()):
+        # 준비 확인 결과는 TTS_HEALTH_TTL 동안 공유 → 작업마다 API를 부르지 않음
+        if not check_tts():
+            raise StageError("TTS 연결 실패 (GOOGLE_TTS_API_KEY 확인)")
+        script = _load_json(paths["script"])
+        _, timings = export_episode(script, str(paths["audio"]))
+        atomic_write_json(paths["timings"], timings)
+    return {**payload, "audio_path": str(paths["audio"])}
+
+
+def stage_render(ep_id: str, payload: dict) -> dict:
+    from pipeline.make_video import build_video
+
+    paths = episode_paths(ep_id)
+    if not paths["video"].exists():
+        build_video(_load_json(paths["script"]), str(paths["audio"]),
+                    str(VIDEO_DIR), timings=_load_json(paths["timings"]))
+    return {**payload, "video_path": str(paths["video"])}
+
+
+def stage_upload(ep_id: str, payload: dict) -> dict:
+    """
+    Raises:
+        QuotaExceeded: 쿼터 초과 (워커가 다음 쿼터 창까지 연기)
+        LockBusy: 업로드 슬롯이 모두 사용 중 (워커가 잠시 후 재시도)
+    """
+    from pipeline.upload_manager import upload_with_quota
+
+    paths = episode_paths(ep_id)
+    if payload.get("dry_run"):
+        from pipeline.artifact_store import episode_holder, get_store
+
+        print(f"  [DRY-RUN] 업로드 스킵: {paths['video']}")
+        get_store().release(episode_holder(paths["video"]))  # 업로드하지 않으므로 참조 해제
+        return {**payload, "url": f"[dry-run] {paths['video']}"}
+    if paths["uploaded"].exists():
+        # 업로드는 끝났지만 완료 기록 전에 죽은 경우 → 중복 업로드 방지
+        return {**payload, **_load_json(paths["uploaded"])}
+
+    url = upload_with_quota(ep_id, str(paths["video"]), _load_json(paths["script"]),
+                            privacy=payload.get("privacy", "public"),
+                            publish_at=payload.get("publish_at"), slot_timeout=0)
+    atomic_write_json(paths["uploaded"], {"url": url})
+    return {**payload, "url": url}
+
+
+STAGE_FUNCS = {
+    "script": stage_script,
+    "tts": stage_tts,
+    "render": stage_render,
+    "upload": stage_upload,
+}
+
+
+def run_stage(stage: str, ep_id: str, payload: dict) -> dict:
+    """
+    단계 실행 (에피소드 잠금 안에서)
+    Raises:
+        LockBusy: 같은 에피소드를 다른 프로세스(main.py 수동 실행 등)가 처리 중
+    """
+    with episode_lock(ep_id):
+        return STAGE_FUNCS[stage](ep_id, payload)
@@ -8,16 +8,15 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from google import genai
-from google.genai import types
 from config import (
-    GEMINI_API_KEY, GEMINI_MODEL,
+    GEMINI_MODEL, ensure_dirs,
     PDF_N1, PDF_N2, PDF_KANJI,
     CACHE_N1, CACHE_N2, CACHE_KANJI,
 )
 from pipeline.parse_pdf import parse_pdf
-
-_client = genai.Client(api_key=GEMINI_API_KEY)
+from pipeline.dedup import dedup_items, DEFAULT_THRESHOLD
+from pipeline.gemini import generate_json, json_config
+from pipeline.locks import atomic_write_json
 
 # ── 청크 크기 (Gemini 컨텍스트 및 출력 제한 고려) ─────────
 CHUNK_SIZE = 4000  # 8000에서 4000으로 축소 (출력 잘림 방지)
@@ -49,18 +48,7 @@ def _extract_grammar_from_chunk(chunk: str, level: str) -> list:
 JSON 배열만 반환하세요. 추출할 항목이 없으면 [] 반환."""
 
     try:
-        resp = _client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(response_mime_type="application/json")
-        )
-        # 텍스트 추출 시 점검
-        text_content = resp.text.strip()
-        if text_content.startswith("```"):
-            text_content = text_content.split("```")[1]
-            if text_content.startswith("json"):
-                text_content = text_content[4:]
-        return json.loads(text_content)
+        return generate_json(GEMINI_MODEL, prompt, json_config())
     except Exception as e:
         print(f"  [경고] 문법 추출 오류: {e}")
         return []
@@ -86,17 +74,7 @@ def _extract_kanji_from_chunk(chunk: str) -> list:
 JSON 배열만 반환하세요. 추출할 항목이 없으면 [] 반환."""
 
     try:
-        resp = _client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(response_mime_type="application/json")
-        )
-        text_content = resp.text.strip()
-        if text_content.startswith("```"):
-            text_content = text_content.split("```")[1]
-            if text_content.startswith("json"):
-                text_content = text_content[4:]
-        return json.loads(text_content)
+        return generate_json(GEMINI_MODEL, prompt, json_config())
     except Exception as e:
         print(f"  [경고] 한자 추출 오류: {e}")
         return []
@@ -118,16 +96,10 @@ def extract_grammar(pdf_path: str, level: str) -> list:
         all_grammar.extend(items)
         time.sleep(1)  # API 레이트 리밋 방지
 
-    # 중복 제거 (form 기준)
-    seen = set()
-    unique = []
-    for g in all_grammar:
-        key = g.get("form", "")
-        if key and key not in seen:
-            seen.add(key)
-            unique.append(g)
+    # 중복 제거 (정규화 form 기준 + 유사 표기 병합)
+    unique, merged = dedup_items(all_grammar, "form")
 
-    print(f"  {level} 문법 추출 완료: {len(unique)}개")
+    print(f"  {level} 문법 추출 완료: {len(unique)}개 (중복 병합 {merged}개)")
     return unique
 
 
@@ -147,16 +119,10 @@ def extract_kanji(pdf_path: str) -> list:
         all_kanji.extend(items)
         time.sleep(1)
 
-    # 중복 제거 (kanji 기준)
-    seen = set()
-    unique = []
-    for k in all_kanji:
-        key = k.get("kanji", "")
-        if key and key not in seen:
-            seen.add(key)
-            unique.append(k)
+    # 중복 제거 (정규화 kanji 기준, 한 글자 단위이므로 완전 일치만)
+    unique, merged = dedup_items(all_kanji, "kanji", threshold=None)
 
-    print(f"  한자 추출 완료: {len(unique)}개")
+    print(f"  한자 추출 완료: {len(unique)}개 (중복 병합 {merged}개)")
     return unique
 
 
@@ -166,6 +132,7 @@ def load_or_extract_all() -> dict:
     캐시가 있으면 즉시 반환, 없으면 추출 후 캐시 저장.
     반환: {"n1": {"grammar": [...]}, "n2": {"grammar": [...]}, "kanji": [...]}
     """
+    ensure_dirs()
     result = {}
 
     # ── N1 문법 ────────────────────────────────────────────
@@ -177,8 +144,7 @@ def load_or_extract_all() -> dict:
         print("[추출] N1 문법 PDF 처리 중...")
         grammar_n1 = extract_grammar(PDF_N1, "N1")
         data = {"grammar": grammar_n1}
-        with open(CACHE_N1, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(CACHE_N1, data, indent=2)
         result["n1"] = data
         print(f"[저장] {CACHE_N1}")
 
@@ -191,8 +157,7 @@ def load_or_extract_all() -> dict:
         print("[추출] N2 문법 PDF 처리 중...")
         grammar_n2 = extract_grammar(PDF_N2, "N2")
         data = {"grammar": grammar_n2}
-        with open(CACHE_N2, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(CACHE_N2, data, indent=2)
         result["n2"] = data
         print(f"[저장] {CACHE_N2}")
 
@@ -204,8 +169,7 @@ def load_or_extract_all() -> dict:
     else:
         print("[추출] 한자 PDF 처리 중...")
         kanji = extract_kanji(PDF_KANJI)
-        with open(CACHE_KANJI, "w", encoding="utf-8") as f:
-            json.dump(kanji, f, ensure_ascii=False, indent=2)
+        atomic_write_json(CACHE_KANJI, kanji, indent=2)
         result["kanji"] = kanji
         print(f"[저장] {CACHE_KANJI}")
 
@@ -213,9 +177,51 @@ def load_or_extract_all() -> dict:
     n2_cnt = len(result["n2"]["grammar"])
     kanji_cnt = len(result["kanji"]) if isinstance(result["kanji"], list) else 0
     print(f"\n[지식베이스] N1: {n1_cnt}개, N2: {n2_cnt}개, 한자: {kanji_cnt}개")
+
+    # 상황-지식 관련도 색인 (지식베이스/상황 목록 변경 시에만 재구축)
+    from pipeline.relevance_index import load_or_build
+    load_or_build(result)
     return result
 
 
+def compact_caches() -> dict:
+    """
+    기존 캐시 파일에 정규화/유사 중복 제거를 다시 적용 (Gemini 호출 없음)
+    반환: {캐시 파일명: 병합된 항목 수}
+    """
+    report = {}
+    targets = [
+        (CACHE_N1, "form", DEFAULT_THRESHOLD),
+        (CACHE_N2, "form", DEFAULT_THRESHOLD),
+        (CACHE_KANJI, "kanji", None),
+    ]
+    for cache, field, threshold in targets:
+        if not cache.exists():
+            continue
+        with open(cache, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # 문법 캐시는 {"grammar": [...]}, 한자 캐시는 [...] 형식
+        items = data.get("grammar", []) if isinstance(data, dict) else data
+        unique, merged = dedup_items(items, field, threshold=threshold)
+        report[cache.name] = merged
+        print(f"[압축] {cache.name}: {len(items)}개 → {len(unique)}개 (병합 {merged}개)")
+        if not merged:
+            continue
+
+        if isinstance(data, dict):
+            data["grammar"] = unique
+        else:
+            data = unique
+        atomic_write_json(cache, data, indent=2)
+
+    print(f"[압축] 총 {sum(report.values())}개 항목 병합")
+    return report
+
+
 if __name__ == "__main__":
-    knowledge = load_or_extract_all()
-    print("추출 완료!")
+    if "--compact" in sys.argv:
+        compact_caches()
+    else:
+        knowledge = load_or_extract_all()
+        print("추출 완료!")
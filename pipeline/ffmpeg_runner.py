@@ -0,0 +1,185 @@
+"""
+ffmpeg / ffprobe 실행 래퍼 (실행 기록 + 에피소드별 집계)
+
+run(cmd, label)
+  - ffmpeg에는 -nostats -benchmark -progress pipe:1 을 붙여 실행하고
+    progress(fps, speed, frame, out_time)와 benchmark(utime, stime, rtime, maxrss) 출력을 파싱
+  - 명령행, 종료 코드, 파싱 결과를 실행 span(pipeline.instrument)의 attrs로 기록
+    → 실행 로그 옆 *.spans.jsonl에 프로세스 1개 = 1줄
+  - 실패 시 FfmpegError (stderr 끝부분 포함)
+
+episode_summary() / format_episode_summary(ep_id)
+  상위 stage span의 ep_id 기준으로 묶어, 라벨별(예: "대사 클립") 횟수 / 시간 / 비중을 집계
+  → 렌더링 시간 대부분을 차지하는 프로세스를 확인
+"""
+import os
+import re
+import shlex
+import logging
+import subprocess
+
+from .instrument import ffmpeg_span, records
+
+logger = logging.getLogger(__name__)
+
+_BENCH_RE = re.compile(r"bench:\s+utime=([\d.]+)s\s+stime=([\d.]+)s\s+rtime=([\d.]+)s")
+_MAXRSS_RE = re.compile(r"bench:\s+maxrss=(\d+)\s*(KiB|kB)")
+_LABEL_INDEX_RE = re.compile(r"\s*\d+$")
+
+
+class FfmpegError(RuntimeError):
+    """ffmpeg / ffprobe 비정상 종료"""
+
+    def __init__(self, label: str, returncode: int, stderr: str):
+        super().__init__(f"ffmpeg 오류 [{label}] (exit {returncode}): {stderr[-500:]}")
+        self.label = label
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+def _startupinfo():
+    if os.name != "nt":
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def _with_stats_flags(cmd: list) -> list:
+    """ffmpeg 명령에 통계 출력 옵션 추가 (입력이 없는 조회 명령은 그대로, 출력이 stdout이면 progress 생략)"""
+    if "-i" not in cmd:
+        return cmd
+    flags = ["-hide_banner", "-nostats", "-benchmark"]
+    if "pipe:1" not in cmd and cmd[-1] != "-":
+        flags += ["-progress", "pipe:1"]
+    return [cmd[0], *flags, *cmd[1:]]
+
+
+def parse_progress(text: str) -> dict:
+    """-progress 출력의 마지막 값 (fps, speed, frame, out_time_sec)"""
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip()] = value.strip()
+    stats = {}
+    for key in ("fps", "frame"):
+        try:
+            stats[key] = float(values[key])
+        except (KeyError, ValueError):
+            pass
+    speed = values.get("speed", "").rstrip("x")
+    try:
+        stats["speed"] = float(speed)
+    except ValueError:
+        pass
+    try:
+        stats["out_time_sec"] = int(values["out_time_us"]) / 1_000_000
+    except (KeyError, ValueError):
+        pass
+    return stats
+
+
+def parse_benchmark(stderr: str) -> dict:
+    """-benchmark 출력 (utime, stime, rtime 초 / maxrss KB)"""
+    stats = {}
+    m = _BENCH_RE.search(stderr)
+    if m:
+        stats.update(utime=float(m[1]), stime=float(m[2]), rtime=float(m[3]))
+    m = _MAXRSS_RE.search(stderr)
+    if m:
+        stats["maxrss_kb"] = int(m[1])
+    return stats
+
+
+def run(cmd: list, label: str = "", check: bool = True) -> subprocess.CompletedProcess:
+    """
+    ffmpeg / ffprobe 실행 (stdout/stderr는 bytes로 반환)
+    Raises:
+        FfmpegError: check=True이고 종료 코드가 0이 아닐 때
+    """
+    tool = os.path.basename(cmd[0])
+    full_cmd = _with_stats_flags(cmd) if tool == "ffmpeg" else cmd
+    command_line = shlex.join(str(c) for c in cmd)
+    logger.debug(f"[{label}] {command_line}")
+
+    with ffmpeg_span(cmd, label) as sp:
+        result = subprocess.run(full_cmd, capture_output=True, startupinfo=_startupinfo())
+        stats = {}
+        if tool == "ffmpeg":
+            stderr_text = result.stderr.decode("utf-8", errors="replace")
+            stats.update(parse_benchmark(stderr_text))
+            if "-progress" in full_cmd:
+                stats.update(parse_progress(result.stdout.decode("utf-8", errors="replace")))
+        sp.set(cmd=command_line, returncode=result.returncode, **stats)
+        # span 단위 CPU / 메모리는 ffmpeg 자신이 보고한 값으로 (프로세스 누적값과 구분)
+        sp.add_child(stats.get("utime", 0.0) + stats.get("stime", 0.0), stats.get("maxrss_kb"))
+
+    if check and result.returncode != 0:
+        raise FfmpegError(label, result.returncode,
+                          result.stderr.decode("utf-8", errors="replace"))
+    return result
+
+
+def _episode_of(record: dict, by_id: dict) -> str | None:
+    while record is not None:
+        ep_id = record["attrs"].get("ep_id")
+        if ep_id:
+            return ep_id
+        record = by_id.get(record["parent"])
+    return None
+
+
+def episode_summary(recs: list = None) -> dict:
+    """
+    ep_id별 ffmpeg/ffprobe 실행 집계
+    Returns:
+        {ep_id: [{"label", "tool", "count", "wall_ms", "utime", "maxrss_kb", "speed"}, ...]}
+        (라벨 끝 번호는 묶음, wall_ms 내림차순)
+    """
+    recs = records() if recs is None else recs
+    by_id = {r["id"]: r for r in recs}
+    groups = {}
+    for r in recs:
+        if r["name"] not in ("ffmpeg", "ffprobe"):
+            continue
+        ep_id = _episode_of(r, by_id) or "-"
+        attrs = r["attrs"]
+        label = _LABEL_INDEX_RE.sub("", attrs.get("label") or "") or r["name"]
+        g = groups.setdefault(ep_id, {}).setdefault((r["name"], label), {
+            "label": label, "tool": r["name"], "count": 0, "wall_ms": 0.0,
+            "utime": 0.0, "maxrss_kb": 0, "speeds": [],
+        })
+        g["count"] += 1
+        g["wall_ms"] += r["wall_ms"]
+        g["utime"] += attrs.get("utime", 0.0)
+        g["maxrss_kb"] = max(g["maxrss_kb"], attrs.get("maxrss_kb", 0))
+        if "speed" in attrs:
+            g["speeds"].append(attrs["speed"])
+
+    summary = {}
+    for ep_id, rows in groups.items():
+        out = []
+        for g in rows.values():
+            speeds = g.pop("speeds")
+            g["speed"] = sum(speeds) / len(speeds) if speeds else None
+            out.append(g)
+        summary[ep_id] = sorted(out, key=lambda g: -g["wall_ms"])
+    return summary
+
+
+def format_episode_summary(ep_id: str, recs: list = None) -> str:
+    rows = episode_summary(recs).get(ep_id, [])
+    if not rows:
+        return f"[{ep_id}] ffmpeg 실행 기록 없음"
+    total = sum(g["wall_ms"] for g in rows) or 1.0
+    lines = [f"[{ep_id}] ffmpeg/ffprobe {sum(g['count'] for g in rows)}회, "
+             f"{total / 1000:.2f}초"]
+    for g in rows:
+        speed = f"{g['speed']:.1f}x" if g["speed"] is not None else "-"
+        lines.append(
+            f"  {g['tool']:<8} {g['label']:<14} {g['count']:>3}회 {g['wall_ms'] / 1000:>7.2f}초 "
+            f"({g['wall_ms'] / total:>4.0%})  utime {g['utime']:.2f}초  "
+            f"maxrss {g['maxrss_kb'] // 1024}MB  speed {speed}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+"""
+Gemini 호출 공통 헬퍼 + 디스크 응답 캐시
+generate_script / extract_knowledge 가 공유합니다.
+
+google.genai는 무겁기 때문에 실제 API 호출 직전에만 import 합니다.
+(CLI --help, 스케줄러 기동, 캐시 적중 시에는 SDK 초기화 없음)
+
+캐시 키: (model, prompt 해시, generation config)
+  - TTL(GEMINI_CACHE_TTL) 지난 항목은 무시 후 삭제
+  - 전체 크기가 GEMINI_CACHE_MAX_BYTES를 넘으면 오래 안 쓴 항목부터 삭제
+  - JSON 파싱에 성공한 응답만 저장 (잘못된 응답이 재사용되지 않도록)
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import (
+    GEMINI_API_KEY, GEMINI_CACHE_DIR, GEMINI_CACHE_ENABLED,
+    GEMINI_CACHE_TTL, GEMINI_CACHE_MAX_BYTES,
+)
+from pipeline.instrument import span
+from pipeline.locks import atomic_write_json
+
+_cache_enabled = GEMINI_CACHE_ENABLED
+_client = None
+
+
+def get_client():
+    """genai.Client 지연 생성 (프로세스당 1회)"""
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+
+def json_config(schema: dict = None):
+    """JSON 응답용 GenerateContentConfig (schema 지정 시 구조화 출력)"""
+    from google.genai import types
+    if schema is None:
+        return types.GenerateContentConfig(response_mime_type="application/json")
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=schema,
+    )
+
+
+def set_cache_enabled(enabled: bool):
+    """응답 캐시 사용 여부 설정 (운영 환경에서 항상 새 응답이 필요할 때 False)"""
+    global _cache_enabled
+    _cache_enabled = enabled
+
+
+def _config_to_dict(config) -> dict:
+    """GenerateContentConfig → 해시 가능한 dict"""
+    if config is None:
+        return {}
+    if hasattr(config, "model_dump"):
+        return config.model_dump(mode="json", exclude_none=True)
+    return dict(config)
+
+
+def _cache_key(model: str, contents: str, config) -> str:
+    prompt_hash = hashlib.sha256(contents.encode("utf-8")).hexdigest()
+    raw = json.dumps(
+        {"model": model, "prompt": prompt_hash, "config": _config_to_dict(config)},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str):
+    return GEMINI_CACHE_DIR / f"{key}.json"
+
+
+def cache_get(key: str) -> str | None:
+    """캐시 조회 (TTL 초과 시 삭제 후 None)"""
+    path = _cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        path.unlink(missing_ok=True)
+        return None
+    # TTL은 생성 시각 기준, mtime은 접근 시각으로 갱신해 LRU 축출에 사용
+    if time.time() - entry.get("created", 0) > GEMINI_CACHE_TTL:
+        path.unlink(missing_ok=True)
+        return None
+    os.utime(path, None)
+    return entry.get("text")
+
+
+def cache_put(key: str, text: str, model: str = ""):
+    """캐시 저장 후 용량 초과 시 축출"""
+    GEMINI_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = {"model": model, "created": time.time(), "text": text}
+    atomic_write_json(_cache_path(key), entry)
+    _evict()
+
+
+def _evict(max_bytes: int = GEMINI_CACHE_MAX_BYTES):
+    """최근 사용 시각(mtime) 오래된 순으로 삭제하여 max_bytes 이하 유지"""
+    files = []
+    total = 0
+    for p in GEMINI_CACHE_DIR.glob("[!.]*.json"):  # 쓰기 중인 임시 파일 제외
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    files.sort()
+    for _, size, p in files:
+        p.unlink(missing_ok=True)
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+def parse_json_text(text: str):
+    """응답 텍스트에서 ```json 펜스 제거 후 JSON 파싱"""
+    text_content = text.strip()
+    if text_content.startswith("```"):
+        text_content = text_content.split("```")[1]
+        if text_content.startswith("json"):
+            text_content = text_content[4:]
+    return json.loads(text_content)
+
+
+def generate_json(model: str, contents: str, config=None,
+                  use_cache: bool = True, cache_if=None, client=None):
+    """
+    Gemini 호출 → JSON 파싱 결과 반환 (응답 캐시 경유)
+    파싱 실패 시 예외를 그대로 올립니다.
+    cache_if: 파싱 결과를 받아 저장 여부를 판단하는 함수 (예: 스키마 검증)
+    client: 미지정 시 get_client() (캐시 적중 시에는 생성하지 않음)
+    """
+    with span("gemini.call", model=model) as sp:
+        sp.bytes_in = len(contents.encode("utf-8")) if isinstance(contents, str) else 0
+        cacheable = use_cache and _cache_enabled
+        key = _cache_key(model, contents, config)
+        if cacheable:
+            cached = cache_get(key)
+            if cached is not None:
+                try:
+                    result = parse_json_text(cached)
+                    sp.set(cache="hit")
+                    sp.bytes_out = len(cached.encode("utf-8"))
+                    return result
+                except ValueError:
+                    _cache_path(key).unlink(missing_ok=True)
+
+        sp.set(cache="miss" if cacheable else "off")
+        if client is None:
+            client = get_client()
+        resp = client.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        text = resp.text
+        sp.bytes_out = len(text.encode("utf-8")) if text else 0
+        result = parse_json_text(text)
+        if cacheable and (cache_if is None or cache_if(result)):
+            cache_put(key, text, model)
+        return result
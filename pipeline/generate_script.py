@@ -4,35 +4,60 @@ Gemini API로 여행업 비즈니스 일본어 대화 스크립트 생성
 import os
 import re
 import json
-import random
 import sys
+from collections import Counter
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from google import genai
-from google.genai import types
-from config import GEMINI_API_KEY, GEMINI_MODEL
+from config import GEMINI_MODEL, GEMINI_REPAIR_MODEL
+from pipeline.gemini import generate_json, json_config
+from pipeline.instrument import add_retry
+from pipeline.knowledge_sampler import get_sampler
+from pipeline.locks import file_lock
+from pipeline.relevance_index import load_or_build
+from pipeline.script_schema import SCRIPT_SCHEMA, schema_for_fields, validate_script
+from pipeline.voice_registry import assign_voices
 
-_client = genai.Client(api_key=GEMINI_API_KEY)
+# 손상 필드 보정 최대 시도 횟수
+MAX_REPAIR_ATTEMPTS = 2
 
+# 보정 지표 (프로세스 누적): scripts, valid_first_try, repaired, failed,
+# repair_calls, field:<필드명>
+REPAIR_METRICS = Counter()
 
-def _pick_knowledge(knowledge: dict, situation: dict) -> dict:
-    """상황에 맞는 문법/어휘를 지식베이스에서 랜덤 선택"""
-    level = situation.get("difficulty", "N2")
+# 배치 지표: batch_calls, batch_ok, per_item_fallback
+BATCH_METRICS = Counter()
 
-    # 레벨에 맞는 문법 선택
-    grammar_pool = knowledge.get(level.lower(), {}).get("grammar", [])
-    if not grammar_pool:
-        # 레벨 없으면 N2 폴백
-        grammar_pool = knowledge.get("n2", {}).get("grammar", [])
 
-    selected_grammar = random.sample(grammar_pool, min(3, len(grammar_pool)))
+class ScriptGenerationError(Exception):
+    """스크립트 생성 및 보정 실패 (해당 에피소드는 업로드하지 않음)"""
 
-    # 한자에서 여행 관련 단어 선택
-    kanji_pool = knowledge.get("kanji", [])
-    if isinstance(kanji_pool, list):
-        selected_kanji = random.sample(kanji_pool, min(5, len(kanji_pool)))
-    else:
-        selected_kanji = []
+
+def get_repair_metrics() -> dict:
+    return {**REPAIR_METRICS, **BATCH_METRICS}
+
+
+def _pick_knowledge(knowledge: dict, situation: dict) -> dict:
+    """
+    상황에 맞는 문법/어휘를 지식베이스에서 선택
+    관련도 색인의 후보 중 가장 오래 사용하지 않은 항목 우선, 부족분은 전체 풀에서 보충
+    """
+    level = situation.get("difficulty", "N2").lower()
+    situation_text = situation.get("situation", "")
+    sampler = get_sampler(knowledge)
+    index = load_or_build(knowledge)
+
+    # 사용 이력은 여러 프로세스가 공유 → 잠금 안에서 최신 상태로 선택/저장
+    with file_lock("knowledge_usage"):
+        sampler.reload_if_changed()
+        sampler.begin_episode()
+
+        # 레벨에 맞는 문법 선택 (레벨 없으면 N2 폴백)
+        if not sampler.pool_size(level):
+            level = "n2"
+        selected_grammar = sampler.pick(level, 3, index.lookup(situation_text, level))
+        # 상황 텍스트와 겹치는 한자 (예: 団体予約 → 団, 体, 予, 約)
+        selected_kanji = sampler.pick("kanji", 5, index.lookup(situation_text, "kanji"))
+        sampler.save()
 
     return {"grammar": selected_grammar, "kanji": selected_kanji}
 
@@ -63,18 +88,32 @@ def _clean_script(obj):
     return obj
 
 
-def generate_script(situation: dict, knowledge: dict) -> dict:
-    """
-    Gemini API로 대화 스크립트 생성
-    """
-    picked = _pick_knowledge(knowledge, situation)
+_PROMPT_HEADER = "당신은 여행업 비즈니스 일본어 교육 콘텐츠 전문가입니다."
+
+_REQUIREMENTS = """## 요구사항
+1. 전체 영상 길이는 3분(180초) 이내로 구성 (대사 5~8 라인 필수)
+2. 각 라인은 자연스럽고 매우 간결한 비즈니스 일본어
+3. 문법 포인트가 실제 대화에서 자연스럽게 사용될 것
+4. 여행업 실무 용어 포함
+5. 한국어 번역 포함
+6. 대화의 배경이 되는 국가는 한국과 일본으로 한정
+7. 대사 텍스트에 마크다운 문법(**bold**, *italic*, # 등)을 절대 사용하지 마세요. 순수 텍스트만 출력하세요."""
+
+
+def _situation_fields(situation: dict) -> tuple:
+    return (
+        situation.get("type", "B2B"),
+        situation.get("situation", ""),
+        situation.get("channel", "電話"),
+        situation.get("difficulty", "N2"),
+    )
+
+
+def _episode_block(situation: dict, picked: dict) -> str:
+    """에피소드별 조건 (상황 + 사용할 문법 + 참고 한자)"""
     grammar_info = json.dumps(picked["grammar"], ensure_ascii=False, indent=2)
     kanji_info = json.dumps(picked["kanji"][:5], ensure_ascii=False, indent=2)
-
-    ep_type = situation.get("type", "B2B")
-    situation_text = situation.get("situation", "")
-    channel = situation.get("channel", "電話")
-    difficulty = situation.get("difficulty", "N2")
+    ep_type, situation_text, channel, difficulty = _situation_fields(situation)
 
     if ep_type == "B2B":
         speakers = "旅行会社の担当者（田中）と ホテルの営業担当（山田）"
@@ -83,10 +122,7 @@ def generate_script(situation: dict, knowledge: dict) -> dict:
         speakers = "旅行会社のスタッフ（佐藤）と お客様（김민준）"
         context = "여행사 직원과 고객 간의 서비스 대화"
 
-    prompt = f"""당신은 여행업 비즈니스 일본어 교육 콘텐츠 전문가입니다.
-아래 조건에 맞는 학습용 대화 스크립트를 생성해주세요.
-
-## 상황
+    return f"""## 상황
 - 타입: {ep_type} ({context})
 - 상황: {situation_text}
 - 채널: {channel}
@@ -97,19 +133,18 @@ def generate_script(situation: dict, knowledge: dict) -> dict:
 {grammar_info}
 
 ## 참고 한자/어휘
-{kanji_info}
+{kanji_info}"""
 
-## 요구사항
-1. 전체 영상 길이는 3분(180초) 이내로 구성 (대사 5~8 라인 필수)
-2. 각 라인은 자연스럽고 매우 간결한 비즈니스 일본어
-3. 문법 포인트가 실제 대화에서 자연스럽게 사용될 것
-4. 여행업 실무 용어 포함
-5. 한국어 번역 포함
-6. 대화의 배경이 되는 국가는 한국과 일본으로 한정
-7. 대사 텍스트에 마크다운 문법(**bold**, *italic*, # 등)을 절대 사용하지 마세요. 순수 텍스트만 출력하세요.
 
-## 출력 형식 (JSON만 반환)
-{{
+def _output_format(situation: dict = None) -> str:
+    """출력 JSON 형식 예시 (situation이 없으면 배치용 일반 형식)"""
+    if situation is not None:
+        ep_type, situation_text, channel, difficulty = _situation_fields(situation)
+    else:
+        ep_type, situation_text, channel, difficulty = (
+            "해당 에피소드 타입", "해당 에피소드 상황 (조건의 상황 문구 그대로)", "해당 채널", "해당 난이도"
+        )
+    return f"""{{
   "episode_title": "에피소드 제목 (일본어, 20자 이내)",
   "situation": {{
     "type": "{ep_type}",
@@ -146,44 +181,215 @@ def generate_script(situation: dict, knowledge: dict) -> dict:
   "summary": "에피소드 요약 (한국어, 2~3문장)"
 }}"""
 
+
+def _build_prompt(situation: dict, picked: dict) -> str:
+    """상황 + 선택된 문법/한자로 스크립트 생성 프롬프트 구성"""
+    return f"""{_PROMPT_HEADER}
+아래 조건에 맞는 학습용 대화 스크립트를 생성해주세요.
+
+{_episode_block(situation, picked)}
+
+{_REQUIREMENTS}
+
+## 출력 형식 (JSON만 반환)
+{_output_format(situation)}"""
+
+
+def _build_batch_prompt(items: list) -> str:
+    """여러 에피소드를 한 번에 요청하는 프롬프트 (공통 지시문은 1회만 포함)"""
+    blocks = "\n\n".join(
+        f"# 에피소드 {i + 1}\n{_episode_block(situation, picked)}"
+        for i, (situation, picked) in enumerate(items)
+    )
+    return f"""{_PROMPT_HEADER}
+아래 {len(items)}개 에피소드 각각에 대해 조건에 맞는 학습용 대화 스크립트를 생성해주세요.
+모든 에피소드에 아래 요구사항과 출력 형식을 동일하게 적용합니다.
+
+{_REQUIREMENTS}
+
+## 출력 형식 (JSON만 반환)
+{{"scripts": [에피소드 1 스크립트, 에피소드 2 스크립트, ...]}}
+- scripts 배열은 에피소드 순서와 개수가 정확히 일치해야 합니다.
+- 각 스크립트 형식:
+{_output_format()}
+
+{blocks}"""
+
+
+def _repair_script(script: dict, broken: list, prompt: str) -> dict:
+    """손상된 필드만 저비용 모델로 다시 생성하여 병합"""
+    valid_part = {k: v for k, v in script.items() if k not in broken}
+    repair_prompt = f"""아래는 학습용 대화 스크립트 생성 요청과, 이미 생성된 스크립트 중 정상인 부분입니다.
+누락되었거나 형식이 잘못된 다음 필드만 생성하여 JSON으로 반환하세요: {", ".join(broken)}
+정상 부분의 내용(화자, 상황, 대사)과 일관되어야 합니다.
+
+## 원래 요청
+{prompt}
+
+## 정상 부분
+{json.dumps(valid_part, ensure_ascii=False, indent=2)}"""
+
+    patch = generate_json(
+        GEMINI_REPAIR_MODEL, repair_prompt,
+        json_config(schema_for_fields(broken)),
+        cache_if=lambda p: not [f for f in validate_script({**valid_part, **p}) if f in broken],
+    )
+    if not isinstance(patch, dict):
+        return script
+    return {**script, **{k: patch[k] for k in broken if k in patch}}
+
+
+def _finalize_script(script, prompt: str) -> dict:
+    """
+    스키마 검증 → 손상 필드만 보정 → 그래도 실패하면 ScriptGenerationError
+    (폴백 스크립트로 TTS/렌더/업로드를 낭비하지 않도록)
+    """
+    REPAIR_METRICS["scripts"] += 1
+    script = _clean_script(script) if isinstance(script, dict) else {}
+    broken = validate_script(script)
+    repaired = bool(broken)
+
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        if not broken:
+            break
+        print(f"  [보정] 손상 필드 재생성: {broken}")
+        for f in broken:
+            REPAIR_METRICS[f"field:{f}"] += 1
+        REPAIR_METRICS["repair_calls"] += 1
+        add_retry()
+        try:
+            script = _clean_script(_repair_script(script, broken, prompt))
+        except Exception as e:
+            print(f"  [경고] 보정 요청 실패: {e}")
+        broken = validate_script(script)
+
+    if broken:
+        REPAIR_METRICS["failed"] += 1
+        raise ScriptGenerationError(f"스크립트 보정 실패 (필드: {', '.join(broken)})")
+
+    REPAIR_METRICS["repaired" if repaired else "valid_first_try"] += 1
+    assign_voices(script)
+    return script
+
+
+def generate_script(situation: dict, knowledge: dict) -> dict:
+    """
+    Gemini API로 대화 스크립트 생성 (response_schema 구조화 출력)
+    검증 실패 필드는 보정 요청, 보정 불가 시 ScriptGenerationError
+    """
+    picked = _pick_knowledge(knowledge, situation)
+    return _generate_from_picked(situation, picked)
+
+
+def _generate_from_picked(situation: dict, picked: dict) -> dict:
+    prompt = _build_prompt(situation, picked)
+
     try:
-        resp = _client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(response_mime_type="application/json")
+        script = generate_json(
+            GEMINI_MODEL, prompt, json_config(SCRIPT_SCHEMA),
+            cache_if=lambda s: not validate_script(s),
         )
-        text_content = resp.text.strip()
-        if text_content.startswith("```"):
-            text_content = text_content.split("```")[1]
-            if text_content.startswith("json"):
-                text_content = text_content[4:]
-        script = json.loads(text_content)
-        # 마크다운 전처리 추가
-        script = _clean_script(script)
-        return script
     except Exception as e:
-        print(f"  [오류] 스크립트 생성 실패: {e}")
-        # 폴백 스크립트
-        return {
-            "episode_title": f"ビジネス日本語 {ep_type}",
-            "situation": situation,
-            "intro_narration": f"今日は{situation_text}についての会話를 배워봅시다.",
-            "intro_narration_ko": f"오늘은 {situation_text}에 대한 대화를 배워봅시다.",
-            "dialogue": [
-                {
-                    "speaker": "田中",
-                    "role": "旅行会社担当者",
-                    "text_jp": "お世話になっております。",
-                    "text_ko": "항상 신세 지고 있습니다.",
-                    "audio_note": "normal"
-                }
-            ],
-            "grammar_explanation": [],
-            "used_grammar": picked["grammar"][:2],
-            "used_vocab": [],
-            "key_sentences": [],
-            "summary": f"{situation_text} 상황의 비즈니스 일본어 대화입니다."
-        }
+        # 응답 전체가 깨진 경우 → 모든 필드를 보정 대상으로 처리
+        print(f"  [경고] 스크립트 응답 처리 실패: {e}")
+        script = {}
+    return _finalize_script(script, prompt)
+
+
+def _situation_key(situation) -> tuple:
+    """(타입, 공백 정리한 상황 문구) — 배치 응답을 에피소드에 대응시키는 기준"""
+    if not isinstance(situation, dict):
+        return (None, None)
+    text = " ".join(str(situation.get("situation", "")).split())
+    return (situation.get("type"), text)
+
+
+def _match_batch(items: list, batch_scripts: list) -> list:
+    """
+    배치 응답 스크립트를 items 순서로 대응 (위치가 아니라 situation 타입/문구로)
+    대응하는 스크립트가 없는 항목은 None → 개별 요청
+    """
+    unused = [s for s in batch_scripts if isinstance(s, dict)]
+    matched = []
+    for situation, _ in items:
+        key = _situation_key(situation)
+        script = next((s for s in unused if _situation_key(s.get("situation")) == key), None)
+        if script is not None:
+            unused.remove(script)
+        matched.append(script)
+    return matched
+
+
+def generate_scripts_batch(items: list) -> list:
+    """
+    여러 에피소드 스크립트를 한 번의 구조화 요청으로 생성
+    Args:
+        items: [(situation, picked), ...]  picked = {"grammar": [...], "kanji": [...]}
+    Returns:
+        items와 같은 순서의 스크립트 리스트. 생성 실패 항목은 None
+        (배치 응답에서 상황이 맞는 스크립트가 없거나 검증 실패한 항목은 개별 요청으로 재시도)
+    """
+    if not items:
+        return []
+    if len(items) == 1:
+        situation, picked = items[0]
+        try:
+            return [_generate_from_picked(situation, picked)]
+        except ScriptGenerationError as e:
+            print(f"  [오류] {e}")
+            return [None]
+
+    batch_schema = {
+        "type": "OBJECT",
+        "properties": {"scripts": {"type": "ARRAY", "items": SCRIPT_SCHEMA}},
+        "required": ["scripts"],
+    }
+    try:
+        resp = generate_json(
+            GEMINI_MODEL, _build_batch_prompt(items),
+            json_config(batch_schema),
+            # 형식이 어긋난 응답(리스트 등)은 캐시만 하지 않음 → 아래에서 항목별로 처리
+            cache_if=lambda r: isinstance(r, dict) and isinstance(r.get("scripts"), list)
+            and all(isinstance(s, dict) for s in r["scripts"])
+            and len(r["scripts"]) == len(items)
+            and not any(validate_script(s) for s in r["scripts"])
+            and None not in _match_batch(items, r["scripts"]),
+        )
+        batch_scripts = resp.get("scripts") if isinstance(resp, dict) else None
+        if not isinstance(batch_scripts, list):
+            batch_scripts = []
+    except Exception as e:
+        print(f"  [경고] 배치 스크립트 요청 실패, 개별 요청으로 전환: {e}")
+        batch_scripts = []
+    BATCH_METRICS["batch_calls"] += 1
+
+    results = []
+    for i, ((situation, picked), script) in enumerate(zip(items, _match_batch(items, batch_scripts))):
+        if isinstance(script, dict):
+            script = _clean_script(script)
+            if not validate_script(script):
+                REPAIR_METRICS["scripts"] += 1
+                REPAIR_METRICS["valid_first_try"] += 1
+                BATCH_METRICS["batch_ok"] += 1
+                assign_voices(script)
+                results.append(script)
+                continue
+
+        # 상황이 맞는 배치 결과가 없거나 검증 실패 → 개별 요청 (보정 포함)
+        BATCH_METRICS["per_item_fallback"] += 1
+        print(f"  [배치] 에피소드 {i + 1} 개별 재요청: {situation.get('situation', '')}")
+        try:
+            results.append(_generate_from_picked(situation, picked))
+        except ScriptGenerationError as e:
+            print(f"  [오류] {e}")
+            results.append(None)
+    return results
+
+
+def generate_scripts(situations: list, knowledge: dict) -> list:
+    """상황별 문법/한자 선택 후 generate_scripts_batch 호출"""
+    items = [(s, _pick_knowledge(knowledge, s)) for s in situations]
+    return generate_scripts_batch(items)
 
 
 if __name__ == "__main__":
@@ -202,3 +408,4 @@ if __name__ == "__main__":
     }
     script = generate_script(test_situation, test_knowledge)
     print(json.dumps(script, ensure_ascii=False, indent=2))
+    print(get_repair_metrics())
@@ -1,14 +1,15 @@
 """
 여행업 B2B/B2C 상황 생성 모듈
-중복 방지를 위해 히스토리 파일에 사용된 상황을 기록합니다.
+중복 방지를 위해 히스토리 저장소(SQLite)에 사용된 상황을 기록합니다.
 """
-import json
 import random
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from config import HISTORY_FILE
+from config import SITUATION_REUSE_DAYS
+from pipeline.history_store import HistoryStore
+from pipeline.situation_pool import load_pool, bucket_counts
 
 # ── 여행업 상황 풀 ─────────────────────────────────────────
 B2B_SITUATIONS = [
@@ -68,47 +69,42 @@ B2C_SITUATIONS = [
 ]
 
 
-def _load_history() -> list:
-    """사용된 상황 히스토리 로드"""
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
-
-
-def save_history(situations: list):
-    """사용된 상황을 히스토리에 추가"""
-    history = _load_history()
-    for s in situations:
-        key = f"{s['type']}:{s['situation']}"
-        if key not in history:
-            history.append(key)
-    # 히스토리가 너무 길면 오래된 것 제거 (전체 풀의 80% 이상이면 리셋)
-    max_history = int((len(B2B_SITUATIONS) + len(B2C_SITUATIONS)) * 0.8)
-    if len(history) > max_history:
-        history = history[len(history) - max_history // 2:]
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+def save_history(situations: list, episode_ids: list = None):
+    """사용된 상황을 히스토리에 추가 (append-only)"""
+    with HistoryStore() as store:
+        store.append(situations, episode_ids)
 
 
 def generate_situations() -> list:
     """
-    B2B 1개 + B2C 1개 상황 선택 (히스토리 기반 중복 방지)
+    B2B 1개 + B2C 1개 상황 선택 (최근 SITUATION_REUSE_DAYS일 내 사용한 상황 제외)
+    풀 확장은 `python -m pipeline.situation_pool --expand N` 으로 미리 수행
     반환: [{"type": "B2B", "situation": ..., "channel": ..., "difficulty": ...}, ...]
     """
-    history = _load_history()
-
-    def pick(pool, ep_type):
-        used_keys = {h.split(":", 1)[1] for h in history if h.startswith(f"{ep_type}:")}
-        available = [s for s in pool if s["situation"] not in used_keys]
-        if not available:
-            # 모두 사용했으면 전체에서 랜덤 선택
-            available = pool
-        chosen = random.choice(available)
-        return {**chosen, "type": ep_type}
+    with HistoryStore() as store:
+        def pick(ep_type):
+            # 기본 풀 + 확장 저장소 (LLM 호출 없음)
+            pool = load_pool(ep_type)
+            recent = store.used_within(ep_type, SITUATION_REUSE_DAYS)
+            available = [s for s in pool if s["situation"] not in recent]
+            if available:
+                # 최근 사용이 가장 적은 채널/난이도 버킷에서 선택
+                by_text = {s["situation"]: s for s in pool}
+                used_buckets = bucket_counts([by_text[t] for t in recent if t in by_text])
+                buckets = bucket_counts(available)
+                least = min(used_buckets[b] for b in buckets)
+                bucket = random.choice([b for b in buckets if used_buckets[b] == least])
+                chosen = random.choice(
+                    [s for s in available if (s.get("channel"), s.get("difficulty")) == bucket]
+                )
+            else:
+                # 모두 최근에 사용했으면 가장 오래전에 사용한 상황 선택
+                last_used = store.last_used(ep_type)
+                chosen = min(pool, key=lambda s: last_used.get(s["situation"], 0.0))
+            return {**chosen, "type": ep_type}
 
-    b2b = pick(B2B_SITUATIONS, "B2B")
-    b2c = pick(B2C_SITUATIONS, "B2C")
+        b2b = pick("B2B")
+        b2c = pick("B2C")
     return [b2b, b2c]
 
 
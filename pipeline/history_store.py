@@ -0,0 +1,111 @@
+"""
+상황 사용 히스토리 저장소 (SQLite, append-only)
+
+- 사용할 때마다 (ep_type, situation, episode_id, used_at) 행을 추가만 함 (덮어쓰기 없음)
+- "최근 N일 내 사용" 조회 결과를 set으로 반환 → 선택 시 O(1) 포함 검사
+- SQLite 잠금(WAL + busy timeout)으로 스케줄러/수동 실행이 동시에 기록해도 유실 없음
+- 기존 situation_history.json 은 최초 1회 자동 이관
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import HISTORY_DB, HISTORY_FILE, ensure_dirs
+from pipeline.locks import file_lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS situation_history (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ep_type    TEXT NOT NULL,
+    situation  TEXT NOT NULL,
+    episode_id TEXT,
+    used_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_type_time
+    ON situation_history (ep_type, used_at);
+"""
+
+
+def _connect(path=HISTORY_DB) -> sqlite3.Connection:
+    ensure_dirs()
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _migrate_legacy(conn: sqlite3.Connection):
+    """situation_history.json ("B2B:상황" 목록) → SQLite 이관 (순서 유지)"""
+    if not HISTORY_FILE.exists():
+        return
+    # 동시에 연 프로세스가 둘 다 이관하지 않도록 잠금 안에서 다시 확인
+    with file_lock("history_migrate"):
+        if HISTORY_FILE.exists():
+            _import_legacy(conn)
+
+
+def _import_legacy(conn: sqlite3.Connection):
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        legacy = json.load(f)
+    now = time.time()
+    rows = []
+    for i, key in enumerate(legacy):
+        if ":" not in key:
+            continue
+        ep_type, situation = key.split(":", 1)
+        # 원본에 시각 정보가 없으므로 이관 시각 기준으로 순서만 보존
+        rows.append((ep_type, situation, None, now - (len(legacy) - i)))
+    with conn:
+        conn.executemany(
+            "INSERT INTO situation_history (ep_type, situation, episode_id, used_at) "
+            "VALUES (?, ?, ?, ?)", rows,
+        )
+    HISTORY_FILE.rename(HISTORY_FILE.with_suffix(".json.migrated"))
+    print(f"[히스토리] JSON → SQLite 이관: {len(rows)}건")
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB):
+        self.conn = _connect(path)
+        _migrate_legacy(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, situations: list, episode_ids: list = None):
+        """사용한 상황 기록 (한 트랜잭션)"""
+        now = time.time()
+        episode_ids = episode_ids or [None] * len(situations)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO situation_history (ep_type, situation, episode_id, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(s["type"], s["situation"], ep_id, now)
+                 for s, ep_id in zip(situations, episode_ids)],
+            )
+
+    def used_within(self, ep_type: str, days: float) -> set:
+        """최근 days일 내 사용된 상황 텍스트 집합"""
+        since = time.time() - days * 86400
+        rows = self.conn.execute(
+            "SELECT DISTINCT situation FROM situation_history "
+            "WHERE ep_type = ? AND used_at >= ?", (ep_type, since),
+        )
+        return {r[0] for r in rows}
+
+    def last_used(self, ep_type: str) -> dict:
+        """상황 텍스트 → 마지막 사용 시각 (epoch 초)"""
+        rows = self.conn.execute(
+            "SELECT situation, MAX(used_at) FROM situation_history "
+            "WHERE ep_type = ? GROUP BY situation", (ep_type,),
+        )
+        return {r[0]: r[1] for r in rows}
@@ -0,0 +1,230 @@
+"""
+실행 계측 (span)
+
+    with span("tts.call", voice=voice) as sp:
+        ...
+        sp.bytes_in += len(text)      # 스텝이 소비한 입력 (요청 본문 / 입력 파일)
+        sp.bytes_out += len(audio)    # 스텝이 만든 출력 (응답 / 출력 파일)
+        sp.retries += 1
+
+span 1개 = JSON 1줄: name, parent, attrs, wall_ms, cpu_ms, peak_rss_kb,
+proc_cpu_ms, proc_peak_rss_kb, bytes_in, bytes_out, retries, error
+- configure(path): JSONL 출력 파일 지정 (실행 로그 옆 *.spans.jsonl). 미지정 시 메모리에만 기록
+- format_summary(): 이름별 집계 표 (main.run 종료 시 로그 출력)
+
+span 단위 값
+  - cpu_ms: span을 연 스레드의 CPU 시간(time.thread_time) + span 안에서 실행한 ffmpeg의 CPU 시간
+    (-benchmark utime+stime, add_child). span이 스레드 풀에 넘긴 작업의 CPU는 포함되지 않음
+  - peak_rss_kb: span 안에서 실행한 ffmpeg 중 최대 메모리 (-benchmark maxrss), 없으면 None
+프로세스 단위 값 (span끼리 겹치면 중복 집계되므로 참고용)
+  - proc_cpu_ms: span 동안 프로세스 전체(모든 스레드 + 종료된 자식 프로세스)의 CPU 시간 증가분.
+    자식 프로세스 분은 Unix에서만 집계 (Windows는 os.times 미지원)
+  - proc_peak_rss_kb: span 종료 시점의 프로세스 최대 메모리 (실행 시작 이후 누적 최고치)
+"""
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_current = contextvars.ContextVar("instrument_span", default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_sink_path = None
+_records: list[dict] = []
+
+
+class Span:
+    __slots__ = ("id", "name", "parent", "parent_span", "attrs", "bytes_in", "bytes_out",
+                 "retries", "child_cpu_sec", "child_rss_kb")
+
+    def __init__(self, name: str, parent_span, attrs: dict):
+        self.id = f"{os.getpid()}-{next(_ids)}"
+        self.name = name
+        self.parent_span = parent_span
+        self.parent = parent_span.id if parent_span else None
+        self.attrs = attrs
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.child_cpu_sec = 0.0
+        self.child_rss_kb = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_child(self, cpu_sec: float = 0.0, rss_kb: int | None = None):
+        """span 안에서 실행한 자식 프로세스(ffmpeg)의 CPU 시간 / 최대 메모리 기록"""
+        with _lock:
+            self.child_cpu_sec += cpu_sec
+            if rss_kb is not None:
+                self.child_rss_kb = max(self.child_rss_kb or 0, rss_kb)
+
+
+def configure(path):
+    """span 기록 파일(JSONL) 지정 (None이면 파일 기록 안 함)"""
+    global _sink_path
+    _sink_path = str(path) if path else None
+
+
+def reset():
+    """집계 대상 초기화 (실행 1회 단위 요약용)"""
+    with _lock:
+        _records.clear()
+
+
+def records() -> list[dict]:
+    with _lock:
+        return list(_records)
+
+
+def add_retry(n: int = 1):
+    """현재 span의 재시도 횟수 증가 (span 밖이면 무시)"""
+    sp = _current.get()
+    if sp is not None:
+        sp.retries += n
+
+
+def _process_cpu_seconds() -> float:
+    """프로세스 전체 CPU 시간 (모든 스레드 + 종료된 자식 프로세스)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _process_peak_rss_kb() -> int | None:
+    """프로세스(및 종료된 자식 프로세스) 시작 이후 최대 메모리 — span 단위 값이 아님"""
+    if resource is not None:
+        self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        child_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        peak = max(self_kb, child_kb)
+        return peak // 1024 if os.uname().sysname == "Darwin" else peak  # macOS는 bytes
+    if os.name == "nt":
+        return _peak_rss_kb_windows()
+    return None
+
+
+def _peak_rss_kb_windows() -> int | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize // 1024
+
+
+def _emit(record: dict):
+    with _lock:
+        _records.append(record)
+        if _sink_path:
+            with open(_sink_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    sp = Span(name, _current.get(), attrs)
+    token = _current.set(sp)
+    started_at = time.time()
+    wall0, thread0, proc0 = time.perf_counter(), time.thread_time(), _process_cpu_seconds()
+    error = None
+    try:
+        yield sp
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        _current.reset(token)
+        cpu_sec = time.thread_time() - thread0 + sp.child_cpu_sec
+        if sp.parent_span is not None:
+            # 자식 프로세스 값은 상위 span에도 누적 (스레드 CPU는 상위 span의 스레드가 같으면 이미 포함)
+            sp.parent_span.add_child(sp.child_cpu_sec, sp.child_rss_kb)
+        _emit({
+            "id": sp.id, "name": name, "parent": sp.parent, "attrs": sp.attrs,
+            "start": round(started_at, 3),
+            "wall_ms": round((time.perf_counter() - wall0) * 1000, 1),
+            "cpu_ms": round(cpu_sec * 1000, 1),
+            "peak_rss_kb": sp.child_rss_kb,
+            "proc_cpu_ms": round((_process_cpu_seconds() - proc0) * 1000, 1),
+            "proc_peak_rss_kb": _process_peak_rss_kb(),
+            "bytes_in": sp.bytes_in, "bytes_out": sp.bytes_out,
+            "retries": sp.retries, "error": error,
+        })
+
+
+def file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+@contextmanager
+def ffmpeg_span(cmd: list, label: str = ""):
+    """ffmpeg/ffprobe 실행 1회 (bytes_in: -i 입력 파일 합계, bytes_out: 마지막 인자 출력 파일)"""
+    tool = os.path.basename(cmd[0])
+    with span(tool, label=label) as sp:
+        sp.bytes_in = sum(
+            file_size(cmd[i + 1]) for i, arg in enumerate(cmd[:-1]) if arg == "-i"
+        )
+        yield sp
+        if tool == "ffmpeg":
+            sp.bytes_out = file_size(cmd[-1])
+
+
+def summarize(recs: list = None) -> list[dict]:
+    """이름별 집계 (총 wall 시간 내림차순)"""
+    groups = {}
+    for r in records() if recs is None else recs:
+        g = groups.setdefault(r["name"], {
+            "name": r["name"], "count": 0, "wall_ms": 0.0, "max_wall_ms": 0.0,
+            "cpu_ms": 0.0, "peak_rss_kb": 0, "proc_peak_rss_kb": 0, "bytes_in": 0, "bytes_out": 0,
+            "retries": 0, "errors": 0,
+        })
+        g["count"] += 1
+        g["wall_ms"] += r["wall_ms"]
+        g["max_wall_ms"] = max(g["max_wall_ms"], r["wall_ms"])
+        g["cpu_ms"] += r["cpu_ms"]
+        g["peak_rss_kb"] = max(g["peak_rss_kb"], r["peak_rss_kb"] or 0)
+        g["proc_peak_rss_kb"] = max(g["proc_peak_rss_kb"], r.get("proc_peak_rss_kb") or 0)
+        g["bytes_in"] += r["bytes_in"]
+        g["bytes_out"] += r["bytes_out"]
+        g["retries"] += r["retries"]
+        g["errors"] += 1 if r["error"] else 0
+    return sorted(groups.values(), key=lambda g: -g["wall_ms"])
+
+
+def format_summary(recs: list = None) -> str:
+    rows = summarize(recs)
+    header = (f"{'span':<20} {'횟수':>5} {'총 wall(s)':>10} {'평균(ms)':>9} {'최대(ms)':>9} "
+              f"{'CPU(s)':>8} {'ffmpeg RSS(MB)':>14} {'프로세스 RSS(MB)':>16} "
+              f"{'입력(KB)':>9} {'출력(KB)':>9} {'재시도':>5} {'오류':>4}")
+    lines = [header, "-" * len(header)]
+    for g in rows:
+        lines.append(
+            f"{g['name']:<20} {g['count']:>5} {g['wall_ms'] / 1000:>10.2f} "
+            f"{g['wall_ms'] / g['count']:>9.1f} {g['max_wall_ms']:>9.1f} "
+            f"{g['cpu_ms'] / 1000:>8.2f} {g['peak_rss_kb'] / 1024:>14.1f} "
+            f"{g['proc_peak_rss_kb'] / 1024:>16.1f} "
+            f"{g['bytes_in'] // 1024:>9} {g['bytes_out'] // 1024:>9} "
+            f"{g['retries']:>5} {g['errors']:>4}"
+        )
+    return "\n".join(lines)
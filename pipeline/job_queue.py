@@ -0,0 +1,203 @@
+"""
+로컬 영속 작업 큐 (SQLite)
+
+에피소드 1편 = 단계별 작업 4개 (script → tts → render → upload)
+  - 스케줄러가 script 작업을 넣으면, 워커가 단계를 완료할 때마다 다음 단계를 등록
+  - 워커는 lease(임대 시간)를 잡고 작업을 가져감. 워커가 죽어 lease가 만료되면 다른 워커가 재시도
+  - 실패 시 지수 백오프로 재시도, JOB_MAX_ATTEMPTS 초과 시 failed
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import JOB_DB, JOB_LEASE_SEC, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SEC, ensure_dirs
+
+STAGES = ["script", "tts", "render", "upload"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    ep_id        TEXT NOT NULL,
+    stage        TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',  -- pending / running / done / failed
+    payload      TEXT NOT NULL DEFAULT '{}',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until  REAL,
+    worker       TEXT,
+    error        TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    UNIQUE (ep_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, available_at);
+"""
+
+
+def next_stage(stage: str) -> str | None:
+    idx = STAGES.index(stage)
+    return STAGES[idx + 1] if idx + 1 < len(STAGES) else None
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+class JobQueue:
+    def __init__(self, path=JOB_DB):
+        ensure_dirs()
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def enqueue(self, ep_id: str, stage: str, payload: dict,
+                available_at: float = None) -> bool:
+        """작업 등록 (같은 ep_id/stage가 이미 있으면 무시). 등록되면 True"""
+        now = time.time()
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (ep_id, stage, payload, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (ep_id, stage, json.dumps(payload, ensure_ascii=False),
+             available_at or now, now, now),
+        )
+        return cur.rowcount == 1
+
+    def mark_done(self, ep_id: str, stages: list, payload: dict, worker: str = None):
+        """
+        큐 밖(main.py 수동 실행)에서 끝낸 단계를 done으로 기록
+        → 워커가 같은 단계를 다시 실행하거나 다음 단계를 등록하지 않음
+        """
+        now = time.time()
+        for stage in stages:
+            self.conn.execute(
+                "INSERT INTO jobs (ep_id, stage, status, payload, worker, available_at, "
+                "created_at, updated_at) VALUES (?, ?, 'done', ?, ?, ?, ?, ?) "
+                "ON CONFLICT (ep_id, stage) DO UPDATE SET status = 'done', "
+                "payload = excluded.payload, worker = excluded.worker, lease_until = NULL, "
+                "error = NULL, updated_at = excluded.updated_at",
+                (ep_id, stage, json.dumps(payload, ensure_ascii=False), worker, now, now, now),
+            )
+
+    def has_episode(self, ep_id: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM jobs WHERE ep_id = ? LIMIT 1", (ep_id,))
+        return row.fetchone() is not None
+
+    def claim(self, worker: str, stages: list = None,
+              lease_sec: float = JOB_LEASE_SEC) -> dict | None:
+        """
+        실행 가능한 작업 1개를 원자적으로 가져옴
+        (pending 이면서 available_at 도래, 또는 running 이지만 lease 만료)
+        lease가 만료된 작업이 이미 JOB_MAX_ATTEMPTS번 시도했으면 다시 가져오지 않고 failed 처리
+        (실행 중 워커가 죽는 작업이 무한히 재시도되지 않도록)
+        """
+        now = time.time()
+        stage_filter = ""
+        params = [now, now, JOB_MAX_ATTEMPTS]
+        if stages:
+            stage_filter = f" AND stage IN ({','.join('?' * len(stages))})"
+            params += list(stages)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_until = NULL, "
+                "error = 'lease 만료 (최대 시도 횟수 초과, 마지막 워커: ' || COALESCE(worker, '-') || ')', "
+                "updated_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, JOB_MAX_ATTEMPTS),
+            )
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE "
+                "((status = 'pending' AND available_at <= ?) "
+                " OR (status = 'running' AND lease_until < ? AND attempts < ?))"
+                f"{stage_filter} ORDER BY available_at, id LIMIT 1",
+                params,
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker, now + lease_sec, now, row["id"]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        job = _row_to_job(row)
+        job["attempts"] += 1
+        return job
+
+    def heartbeat(self, job_id: int, worker: str, lease_sec: float = JOB_LEASE_SEC) -> bool:
+        """lease 연장. 다른 워커가 가져간 경우 False"""
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + lease_sec, time.time(), job_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job: dict, payload: dict):
+        """단계 완료 → 다음 단계 작업 등록 (한 트랜잭션)"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL, error = NULL, "
+                "payload = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(payload, ensure_ascii=False), now, job["id"]),
+            )
+            following = next_stage(job["stage"])
+            if following:
+                self.enqueue(job["ep_id"], following, payload)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def fail(self, job: dict, error: str, retry_after: float = None):
+        """
+        실패 기록. 시도 횟수가 남았으면 백오프 후 재시도, 아니면 failed
+        retry_after를 지정하면 시도 횟수와 무관하게 그 시각 이후 재시도 (예: 쿼터 대기)
+        """
+        now = time.time()
+        if retry_after is not None:
+            status, available_at = "pending", retry_after
+            attempts_sql = "attempts = attempts - 1"  # 재시도 횟수로 세지 않음
+        elif job["attempts"] < JOB_MAX_ATTEMPTS:
+            status = "pending"
+            available_at = now + JOB_RETRY_BASE_SEC * (2 ** (job["attempts"] - 1))
+            attempts_sql = "attempts = attempts"
+        else:
+            status, available_at = "failed", now
+            attempts_sql = "attempts = attempts"
+        self.conn.execute(
+            f"UPDATE jobs SET status = ?, available_at = ?, lease_until = NULL, "
+            f"error = ?, {attempts_sql}, updated_at = ? WHERE id = ?",
+            (status, available_at, error[-2000:], now, job["id"]),
+        )
+
+    def stats(self) -> dict:
+        """단계/상태별 작업 수"""
+        rows = self.conn.execute(
+            "SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status"
+        )
+        result = {}
+        for stage, status, n in rows:
+            result.setdefault(stage, {})[status] = n
+        return result
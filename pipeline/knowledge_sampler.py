@@ -0,0 +1,171 @@
+"""
+사용 이력 기반 문법/한자 샘플러 (커버리지 우선)
+
+- 사용 이력 테이블(KNOWLEDGE_USAGE_FILE)에 항목별 마지막 사용 에피소드 번호와 횟수를 기록
+- 우선순위: 미사용 → 가장 오래전에 사용 → 사용 횟수 적은 순 (동률은 랜덤)
+- 풀마다 힙을 1회 구성(O(n))하고, 선택은 pop k회 + push k회 → O(k log n)
+- JLPT 레벨별 커버리지 통계 제공
+- 사용 이력은 여러 프로세스가 공유 → reload_if_changed / pick / save는 file_lock("knowledge_usage") 안에서 호출
+  (generate_script._pick_knowledge)
+"""
+import os
+import sys
+import json
+import heapq
+import random
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import KNOWLEDGE_USAGE_FILE
+from pipeline.dedup import normalize_key
+from pipeline.locks import atomic_write_json
+
+# 풀 이름 → (지식베이스 경로, 키 필드)
+POOLS = {
+    "n1": ("grammar", "form"),
+    "n2": ("grammar", "form"),
+    "kanji": ("kanji", "kanji"),
+}
+
+
+def pool_items(knowledge: dict, pool: str) -> list:
+    if pool == "kanji":
+        items = knowledge.get("kanji", [])
+        return items if isinstance(items, list) else []
+    return knowledge.get(pool, {}).get("grammar", [])
+
+
+def item_key(pool: str, item: dict) -> str:
+    """사용 이력 테이블의 항목 키 (예: "n1:〜にもかかわらず")"""
+    field = POOLS[pool][1]
+    return f"{pool}:{normalize_key(item.get(field, ''))}"
+
+
+def _usage_mtime() -> float:
+    try:
+        return KNOWLEDGE_USAGE_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def _load_usage() -> dict:
+    if KNOWLEDGE_USAGE_FILE.exists():
+        with open(KNOWLEDGE_USAGE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"episode": 0, "items": {}}
+
+
+class KnowledgeSampler:
+    """
+    풀별 최소 힙 (last_used, count, tiebreak, key)
+    힙 항목은 선택 시 최신 사용 정보로 다시 push (지연 무효화로 오래된 항목은 건너뜀)
+    """
+
+    def __init__(self, knowledge: dict, usage: dict = None):
+        self._knowledge = knowledge
+        self._loaded_mtime = _usage_mtime()
+        self.usage = usage if usage is not None else _load_usage()
+        self.usage.setdefault("episode", 0)
+        self.usage.setdefault("items", {})
+        self._items: dict[str, dict[str, dict]] = {}
+        self._heaps: dict[str, list] = {}
+        for pool in POOLS:
+            by_key = {}
+            for item in pool_items(knowledge, pool):
+                if isinstance(item, dict):
+                    key = item_key(pool, item)
+                    if not key.endswith(":"):
+                        by_key[key] = item
+            self._items[pool] = by_key
+            heap = [self._entry(key) for key in by_key]
+            heapq.heapify(heap)
+            self._heaps[pool] = heap
+
+    def _entry(self, key: str) -> tuple:
+        rec = self.usage["items"].get(key, {})
+        return (rec.get("last", -1), rec.get("count", 0), random.random(), key)
+
+    def _is_current(self, entry: tuple) -> bool:
+        rec = self.usage["items"].get(entry[3], {})
+        return (rec.get("last", -1), rec.get("count", 0)) == entry[:2]
+
+    def reload_if_changed(self):
+        """다른 프로세스가 사용 이력을 갱신했으면 다시 로드 (file_lock("knowledge_usage") 안에서 호출)"""
+        if _usage_mtime() != self._loaded_mtime:
+            self.__init__(self._knowledge)
+
+    def pool_size(self, pool: str) -> int:
+        return len(self._items.get(pool, {}))
+
+    def begin_episode(self) -> int:
+        """에피소드 번호 증가 (같은 에피소드 내 선택은 동일 번호로 기록)"""
+        self.usage["episode"] += 1
+        return self.usage["episode"]
+
+    def pick(self, pool: str, k: int, candidates: list = None) -> list:
+        """
+        가장 오래 사용하지 않은 항목 k개 선택 후 사용 기록
+        candidates(항목 키 목록)가 있으면 그 안에서 먼저 고르고 부족분은 전체 풀에서 채움
+        file_lock("knowledge_usage") 안에서 reload_if_changed 후 호출하고 save까지 마칠 것
+        """
+        heap = self._heaps.get(pool, [])
+        by_key = self._items.get(pool, {})
+        episode = self.usage["episode"]
+        chosen = []
+        if candidates:
+            entries = [self._entry(key) for key in dict.fromkeys(candidates) if key in by_key]
+            chosen = [e[3] for e in heapq.nsmallest(k, entries)]
+
+        taken = set(chosen)
+        while heap and len(chosen) < k:
+            entry = heapq.heappop(heap)
+            if not self._is_current(entry):
+                continue  # 오래된 힙 항목
+            if entry[3] in taken:
+                continue  # 후보에서 이미 선택 (아래에서 새 항목으로 push)
+            chosen.append(entry[3])
+
+        for key in chosen:
+            rec = self.usage["items"].setdefault(key, {"last": -1, "count": 0})
+            rec["last"] = episode
+            rec["count"] += 1
+            heapq.heappush(heap, self._entry(key))
+        return [by_key[key] for key in chosen]
+
+    def coverage(self) -> dict:
+        """레벨별 커버리지 {"N1": {"total", "used", "coverage"}, ...}"""
+        stats = {}
+        for pool, by_key in self._items.items():
+            total = len(by_key)
+            used = sum(1 for key in by_key if key in self.usage["items"])
+            stats[pool.upper() if pool != "kanji" else "kanji"] = {
+                "total": total,
+                "used": used,
+                "coverage": round(used / total, 3) if total else 0.0,
+            }
+        return stats
+
+    def save(self):
+        atomic_write_json(KNOWLEDGE_USAGE_FILE, self.usage, indent=1)
+        self._loaded_mtime = KNOWLEDGE_USAGE_FILE.stat().st_mtime
+
+
+# 프로세스당 1회 구성 (지식베이스 객체 기준)
+_sampler = None
+_sampler_source = None
+
+
+def get_sampler(knowledge: dict) -> KnowledgeSampler:
+    global _sampler, _sampler_source
+    if _sampler is None or _sampler_source is not knowledge:
+        _sampler = KnowledgeSampler(knowledge)
+        _sampler_source = knowledge
+    return _sampler
+
+
+if __name__ == "__main__":
+    from pipeline.extract_knowledge import load_or_extract_all
+
+    sampler = KnowledgeSampler(load_or_extract_all())
+    print(f"에피소드 수: {sampler.usage['episode']}")
+    for level, s in sampler.coverage().items():
+        print(f"  {level}: {s['used']}/{s['total']} ({s['coverage'] * 100:.1f}%)")
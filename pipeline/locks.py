@@ -0,0 +1,122 @@
+"""
+프로세스 간 잠금 + 원자적 파일 쓰기
+
+- file_lock(name): data/locks/{name}.lock 에 대한 OS 파일 잠금 (Windows: msvcrt, 그 외: fcntl)
+  프로세스가 죽으면 OS가 잠금을 해제하므로 stale lock 정리가 필요 없음
+- run_lock(): 상황 선택/히스토리/지식 사용 이력 등 공유 상태 구간
+- episode_lock(ep_id): 에피소드 산출물(script/audio/video) 구간
+- atomic_output(path): 같은 디렉토리의 임시 파일에 쓴 뒤 os.replace (읽는 쪽이 반쯤 쓴 파일을 보지 않음)
+"""
+import os
+import sys
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import LOCK_DIR
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+_POLL_INTERVAL = 0.2
+
+
+class LockBusy(Exception):
+    """다른 프로세스가 잠금을 보유 중 (timeout 내 획득 실패)"""
+
+
+def _try_lock(fd) -> bool:
+    try:
+        if os.name == "nt":
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(name: str, timeout: float = None):
+    """
+    이름 단위 배타 잠금
+    Args:
+        timeout: None이면 무한 대기, 0이면 즉시 실패, 그 외 초 단위 대기
+    Raises:
+        LockBusy: timeout 내에 잠금을 얻지 못한 경우
+    """
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    path = LOCK_DIR / f"{name}.lock"
+    fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockBusy(f"잠금 사용 중: {name}")
+            time.sleep(_POLL_INTERVAL)
+        try:
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()}\n".encode())
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def run_lock(timeout: float = None):
+    """공유 상태(상황 선택, 히스토리, 지식 사용 이력) 구간 잠금"""
+    return file_lock("run", timeout)
+
+
+def episode_lock(ep_id: str, timeout: float = 0):
+    """에피소드 산출물 잠금 (기본: 다른 워커가 처리 중이면 즉시 LockBusy)"""
+    return file_lock(f"episode_{ep_id}", timeout)
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    원자적 출력 경로
+    with atomic_output(p) as tmp: ... tmp에 쓰기 ... → 성공 시 p로 교체, 실패 시 tmp 삭제
+    임시 파일은 같은 디렉토리 + 같은 확장자 (ffmpeg 포맷 추정 유지)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex[:8]}.tmp{path.suffix}")
+    try:
+        yield str(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def atomic_write_bytes(path, data: bytes):
+    with atomic_output(path) as tmp:
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+
+def atomic_write_text(path, text: str):
+    with atomic_output(path) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def atomic_write_json(path, obj, **dump_kwargs):
+    dump_kwargs.setdefault("ensure_ascii", False)
+    atomic_write_text(path, json.dumps(obj, **dump_kwargs))
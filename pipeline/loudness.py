@@ -0,0 +1,134 @@
+"""
+음량 정규화 (음성 · 읽기 속도별 게인 프로필)
+
+Neural2 음성마다, speakingRate마다 출력 음량이 달라 대사 사이 볼륨이 들쭉날쭉합니다.
+완성된 에피소드 전체에 2-pass loudnorm을 돌리면 ffmpeg 디코드/인코드가 한 번 더 들어가므로,
+  - (음성, 속도) 조합마다 기준 문장을 한 번 합성해 EBU R128 integrated loudness(ebur128 필터)를 측정하고
+  - 목표(LOUDNESS_TARGET_LUFS)와의 차이를 LOUDNESS_PROFILE_FILE에 저장한 뒤
+  - 이후 합성 요청의 audioConfig.volumeGainDb로 보정합니다.
+TTS가 보정된 음량으로 MP3를 돌려주므로 merge_audio의 병합(-c copy)은 그대로 1회로 끝납니다.
+
+사용법:
+  python -m pipeline.loudness                    # 저장된 프로필 출력
+  python -m pipeline.loudness --measure a.mp3    # 파일 라운드니스 측정
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import LOUDNESS_PROFILE_FILE, LOUDNESS_NORMALIZE, LOUDNESS_TARGET_LUFS
+from pipeline import ffmpeg_runner
+from pipeline.locks import atomic_write_json, file_lock
+
+# 측정용 기준 문장 (ebur128 게이팅이 안정되도록 4~5초 길이)
+REFERENCE_TEXT = "お忙しいところ恐れ入ります。先日ご提案いただいた件について、納期のご相談でお電話いたしました。"
+
+# Cloud TTS volumeGainDb 허용 범위는 -96~16dB, +10dB 초과는 권장하지 않음
+MIN_GAIN_DB = -20.0
+MAX_GAIN_DB = 10.0
+
+_INTEGRATED_RE = re.compile(r"I:\s+(-?[\d.]+|-inf) LUFS")
+
+_profile = None
+
+
+def measure_lufs(path: str) -> float | None:
+    """파일의 integrated loudness (LUFS, 무음이면 None)"""
+    result = ffmpeg_runner.run([
+        "ffmpeg", "-i", path, "-af", "ebur128=framelog=quiet", "-f", "null", "-",
+    ], "라운드니스 측정", check=False)
+    matches = _INTEGRATED_RE.findall(result.stderr.decode("utf-8", errors="replace"))
+    if not matches or matches[-1] == "-inf":
+        return None
+    lufs = float(matches[-1])
+    return lufs if lufs > -70 else None
+
+
+def _entry_key(voice: str, rate: float) -> str:
+    return f"{voice}@{rate:g}"
+
+
+def _load() -> dict:
+    global _profile
+    if _profile is None:
+        try:
+            with open(LOUDNESS_PROFILE_FILE, "r", encoding="utf-8") as f:
+                _profile = json.load(f)
+        except (OSError, ValueError):
+            _profile = {}
+    return _profile
+
+
+def _calibrate(voice: str, rate: float) -> dict:
+    """기준 문장을 게인 0으로 합성해 측정"""
+    from pipeline.tts import synthesize_line
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "reference.mp3")
+        synthesize_line(REFERENCE_TEXT, "", path, speaking_rate=rate, voice=voice)
+        lufs = measure_lufs(path)
+    return {
+        "voice": voice, "rate": rate, "lufs": lufs,
+        "measured_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _entry_gain(entry: dict) -> float:
+    if entry.get("lufs") is None:
+        return 0.0
+    gain = LOUDNESS_TARGET_LUFS - entry["lufs"]
+    return round(min(MAX_GAIN_DB, max(MIN_GAIN_DB, gain)), 1)
+
+
+def gain_db(voice: str, rate: float = 1.0) -> float:
+    """
+    TTS 음성 + 읽기 속도에 적용할 volumeGainDb
+    프로필에 없는 조합이면 한 번 측정해 저장 (측정 실패 시 0.0)
+    """
+    global _profile
+    if not LOUDNESS_NORMALIZE:
+        return 0.0
+    key = _entry_key(voice, rate)
+    entry = _load().get(key)
+    if entry is None:
+        # 여러 워커가 같은 조합을 동시에 측정하지 않도록 잠금 안에서 다시 확인
+        with file_lock("loudness_profile"):
+            _profile = None
+            entry = _load().get(key)
+            if entry is None:
+                try:
+                    entry = _calibrate(voice, rate)
+                except Exception as e:
+                    print(f"  [경고] 음량 측정 실패 ({key}), 보정 없이 진행: {e}")
+                    # 이 프로세스에서는 다시 측정하지 않음 (저장은 안 함 → 다음 실행에서 재시도)
+                    _profile[key] = {"voice": voice, "rate": rate, "lufs": None}
+                    return 0.0
+                _profile[key] = entry
+                atomic_write_json(LOUDNESS_PROFILE_FILE, _profile, indent=2)
+                print(f"  [음량] {key}: {entry['lufs']} LUFS → 게인 {_entry_gain(entry):+.1f} dB")
+    return _entry_gain(entry)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="음성별 음량 프로필")
+    parser.add_argument("--measure", metavar="FILE", help="오디오 파일 라운드니스 측정")
+    args = parser.parse_args()
+
+    if args.measure:
+        lufs = measure_lufs(args.measure)
+        print(f"{args.measure}: {lufs if lufs is not None else '무음'} LUFS "
+              f"(목표 {LOUDNESS_TARGET_LUFS})")
+    else:
+        profile = _load()
+        if not profile:
+            print(f"음량 프로필 없음 → 첫 합성 때 음성/속도별로 측정 ({LOUDNESS_PROFILE_FILE})")
+        for key, entry in sorted(profile.items()):
+            lufs = entry.get("lufs")
+            print(f"{key:<28} {lufs if lufs is not None else '-':>7} LUFS  "
+                  f"게인 {_entry_gain(entry):+.1f} dB  "
+                  f"(측정 {entry.get('measured_at', '-')})")
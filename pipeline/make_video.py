@@ -5,16 +5,19 @@ MP3 + 썸네일 이미지 → MP4 변환 (ffmpeg 사용)
   - 이후: 각 대사를 화자명 / 일본어 / 한국어 번역으로 표시
   - 세로형 숏츠 (1080x1920) 지원
 """
-import subprocess
 import os
 import sys
 import shutil
-import requests
 import tempfile
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from PIL import Image, ImageDraw, ImageFont
+# PIL / requests 는 렌더링 시점에만 import (CLI·스케줄러 기동 시간 단축)
 from config import THUMBNAIL_SIZE, VIDEO_DIR, DATA_DIR
+from pipeline.locks import atomic_output
+from pipeline import ffmpeg_runner
+from pipeline.encoder import video_codec_args
+from pipeline.artifact_store import episode_holder, file_digest, get_store
+from pipeline.voice_registry import assign_voices
 
 W, H = THUMBNAIL_SIZE # 1080, 1920
 BG_COLOR = (12, 16, 38)         # 딥 네이비
@@ -39,6 +42,8 @@ FONT_URL_KR = "https://cdn.jsdelivr.net/gh/googlefonts/noto-cjk@main/Sans/OTF/Ko
 
 def _ensure_fonts():
     """Noto Sans JP/KR 폰트 자동 다운로드"""
+    import requests
+
     FONT_DIR.mkdir(parents=True, exist_ok=True)
     
     font_jp = FONT_DIR / "NotoSansCJKjp-Bold.otf"
@@ -72,6 +77,8 @@ def _get_font(size: int, lang: str = "JP"):
     폰트 로드 (JP 또는 KR)
     다운로드 실패 시 시스템 기본 폰트로 폴백
     """
+    from PIL import ImageFont
+
     path_jp, path_kr = _ensure_fonts()
     font_path = path_jp if lang == "JP" else path_kr
 
@@ -134,6 +141,8 @@ def _draw_badge(draw, font, text, x, y, h=55,
 
 def make_thumbnail(script: dict, output_path: str) -> str:
     """에피소드 썸네일 이미지 생성 (1080x1920)"""
+    from PIL import Image, ImageDraw
+
     img = Image.new("RGB", THUMBNAIL_SIZE, BG_COLOR)
     draw = ImageDraw.Draw(img)
 
@@ -199,15 +208,19 @@ def make_thumbnail(script: dict, output_path: str) -> str:
     return output_path
 
 
-def _speaker_color(speaker: str, speakers: list[str]) -> tuple:
-    unique = list(dict.fromkeys(speakers))
-    idx = unique.index(speaker) if speaker in unique else 0
+def _speaker_color(speaker: str, voice_map: dict) -> tuple:
+    """화자 이름 색 (voice_registry 배정 음성 순서 기준 → 같은 음성이면 같은 색)"""
+    voices = list(dict.fromkeys(voice_map.values()))
+    voice = voice_map.get(speaker)
+    idx = voices.index(voice) if voice in voices else 0
     colors = [SPEAKER_A_COLOR, SPEAKER_B_COLOR, GOLD_COLOR, SUBTEXT_COLOR]
     return colors[idx % len(colors)]
 
 
-def make_dialogue_frame(line: dict, speakers: list[str],
+def make_dialogue_frame(line: dict, voice_map: dict,
                         script: dict, output_path: str) -> str:
+    from PIL import Image, ImageDraw
+
     img = Image.new("RGB", (W, H), BG_COLOR)
     draw = ImageDraw.Draw(img)
 
@@ -226,7 +239,7 @@ def make_dialogue_frame(line: dict, speakers: list[str],
     role       = line.get("role", "")
     text_jp    = line.get("text_jp", "")
     text_ko    = line.get("text_ko", "")
-    sp_color   = _speaker_color(speaker, speakers)
+    sp_color   = _speaker_color(speaker, voice_map)
 
     font_speaker = _get_font(52, "JP")
     font_role    = _get_font(30, "KR")
@@ -278,22 +291,35 @@ def get_audio_duration(mp3_path: str) -> float:
         "-of", "default=noprint_wrappers=1:nokey=1",
         mp3_path
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd, "길이 측정", check=False)
     try:
-        return float(result.stdout.strip())
+        return float(result.stdout.decode("utf-8", errors="replace").strip())
     except ValueError:
         return 0.0
 
 
 def _run_ffmpeg(cmd: list, label: str = ""):
-    startupinfo = None
-    if os.name == 'nt':
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    result = subprocess.run(cmd, capture_output=True, text=False, startupinfo=startupinfo)
-    stderr = result.stderr.decode('utf-8', errors='replace')
-    if result.returncode != 0:
-        raise RuntimeError(f"ffmpeg 오류 [{label}]: {stderr[-500:]}")
+    """ffmpeg 실행 (실패 시 ffmpeg_runner.FfmpegError)"""
+    ffmpeg_runner.run(cmd, label)
+
+
+def _still_clip(image_path: str, duration: float, vcodec: list,
+                label: str, holder: str) -> str:
+    """정지 이미지 → 영상 클립 (이미지 내용 / 길이 / 인코더 옵션이 같으면 저장소의 클립 재사용)"""
+    inputs = {"image": file_digest(image_path), "duration": duration,
+              "codec": vcodec, "size": [W, H], "fps": 24}
+
+    def build(path):
+        _run_ffmpeg([
+            "ffmpeg", "-y",
+            "-loop", "1", "-i", image_path,
+            "-t", str(duration),
+            "-vf", f"scale={W}:{H},setsar=1",
+            *vcodec, "-pix_fmt", "yuv420p", "-r", "24",
+            path
+        ], label)
+
+    return get_store().get_or_build("clip", inputs, build, ext=".mp4", holder=holder)["path"]
 
 
 def make_video(mp3_path: str, thumbnail_path: str,
@@ -307,7 +333,8 @@ def make_video(mp3_path: str, thumbnail_path: str,
     if total_duration <= 0 or not dialogue:
         return _make_video_simple(mp3_path, thumbnail_path, output_path)
 
-    speakers = [d.get("speaker", "") for d in dialogue]
+    voice_map = assign_voices(script)  # TTS 단계와 같은 화자 배정
+    vcodec = video_codec_args()  # 호스트별 인코더 프로필 (pipeline/encoder.py)
 
     # ── 타이밍 계산 ──────────────────────────────────────
     if timings:
@@ -326,29 +353,12 @@ def make_video(mp3_path: str, thumbnail_path: str,
 
     tmpdir = tempfile.mkdtemp(prefix="bjp_video_")
     try:
-        segment_paths = []
-        thumb_vid = os.path.join(tmpdir, "seg_thumb.mp4")
-        _run_ffmpeg([
-            "ffmpeg", "-y",
-            "-loop", "1", "-i", thumbnail_path,
-            "-t", str(thumb_dur),
-            "-vf", f"scale={W}:{H},setsar=1",
-            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "24",
-            thumb_vid
-        ], "썸네일 클립")
-        segment_paths.append(thumb_vid)
+        holder = episode_holder(mp3_path)
+        segment_paths = [_still_clip(thumbnail_path, thumb_dur, vcodec, "썸네일 클립", holder)]
 
         if narration_dur > 0:
-            narr_vid = os.path.join(tmpdir, "seg_narr.mp4")
-            _run_ffmpeg([
-                "ffmpeg", "-y",
-                "-loop", "1", "-i", thumbnail_path,
-                "-t", str(narration_dur),
-                "-vf", f"scale={W}:{H},setsar=1",
-                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "24",
-                narr_vid
-            ], "나레이션 클립")
-            segment_paths.append(narr_vid)
+            segment_paths.append(
+                _still_clip(thumbnail_path, narration_dur, vcodec, "나레이션 클립", holder))
 
         for i, line in enumerate(dialogue):
             dur = dialogue_timings.get(i)
@@ -356,17 +366,8 @@ def make_video(mp3_path: str, thumbnail_path: str,
                 continue
 
             frame_path = os.path.join(tmpdir, f"frame_{i:03d}.jpg")
-            make_dialogue_frame(line, speakers, script, frame_path)
-            seg_path = os.path.join(tmpdir, f"seg_{i:03d}.mp4")
-            _run_ffmpeg([
-                "ffmpeg", "-y",
-                "-loop", "1", "-i", frame_path,
-                "-t", str(dur),
-                "-vf", f"scale={W}:{H},setsar=1",
-                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "24",
-                seg_path
-            ], f"대사 클립 {i}")
-            segment_paths.append(seg_path)
+            make_dialogue_frame(line, voice_map, script, frame_path)
+            segment_paths.append(_still_clip(frame_path, dur, vcodec, f"대사 클립 {i}", holder))
 
         print(f"  [DEBUG] segment_paths ({len(segment_paths)}개): {segment_paths}")
         concat_txt = os.path.join(tmpdir, "concat.txt")
@@ -403,7 +404,7 @@ def _make_video_simple(mp3_path: str, thumbnail_path: str,
         "ffmpeg", "-y",
         "-loop", "1", "-i", thumbnail_path,
         "-i", mp3_path,
-        "-c:v", "libx264", "-tune", "stillimage",
+        *video_codec_args(),
         "-c:a", "aac", "-b:a", "192k",
         "-pix_fmt", "yuv420p", "-shortest",
         "-vf", f"scale={W}:{H}:force_original_aspect_ratio=disable,setsar=1",
@@ -423,7 +424,14 @@ def build_video(script: dict, mp3_path: str, video_dir: str = None,
     video_path     = os.path.join(video_dir, f"{base}.mp4")
 
     print(f"  썸네일 생성: {thumbnail_path}")
-    make_thumbnail(script, thumbnail_path)
+    with atomic_output(thumbnail_path) as tmp_thumb:
+        make_thumbnail(script, tmp_thumb)
     print(f"  MP4 변환: {video_path}")
-    make_video(mp3_path, thumbnail_path, video_path, script=script, timings=timings)
+    with atomic_output(video_path) as tmp_video:
+        make_video(mp3_path, thumbnail_path, tmp_video, script=script, timings=timings)
+
+    store = get_store()
+    holder = episode_holder(mp3_path)
+    store.register_file(thumbnail_path, "thumbnail", holder=holder)
+    store.register_file(video_path, "video", holder=holder)
     return video_path
\ No newline at end of file
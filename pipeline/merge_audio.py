@@ -11,21 +11,42 @@ timings: 각 세그먼트의 실제 오디오 길이 정보
     ...
     {"type": "review",    "duration": 5.1},   # 핵심문장 복습
   ]
+
+SSML 모드 (TTS_SSML_MODE / set_ssml_enabled)
+  같은 음성이 이어지는 대사를 <mark> + <break>로 이은 SSML 한 요청으로 합성하고,
+  v1beta1 타임포인트로 대사별 timings를 계산 (대사 사이 무음도 SSML <break>로 처리)
 """
 import os
 import sys
-import subprocess
 import tempfile
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from .make_video import get_audio_duration, THUMBNAIL_DURATION
-from .tts import check_tts, synthesize_line
-from config import AUDIO_DIR
+from .tts import check_tts, synthesize_line, synthesize_ssml, _clean_text
+from config import AUDIO_DIR, TTS_SSML_MODE, TTS_SSML_MAX_BYTES
+from .locks import atomic_output
+from . import ffmpeg_runner
+from .artifact_store import episode_holder, get_store
+from .loudness import gain_db
+from .voice_registry import voice_for
 
 # 화자 전환 간격 (초)
 PAUSE_BETWEEN_LINES    = 0.6
 PAUSE_AFTER_NARRATION  = 1.0
 PAUSE_BETWEEN_SECTIONS = 1.5
+INTRO_SILENCE          = 0.5
+OUTRO_SILENCE          = 0.5
+
+NARRATOR = "ナレーター"
+NARRATION_RATE = 0.95
+
+_ssml_enabled = TTS_SSML_MODE
+
+
+def set_ssml_enabled(enabled: bool):
+    """SSML 모드 설정 (같은 음성 연속 대사를 한 요청으로 합성, main.py --ssml)"""
+    global _ssml_enabled
+    _ssml_enabled = enabled
 
 
 def _audio_note_to_rate(note: str) -> float:
@@ -43,11 +64,7 @@ def _make_silence(duration_sec: float, output_path: str):
         "-acodec", "libmp3lame",
         output_path
     ]
-    startupinfo = None
-    if os.name == 'nt':
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    subprocess.run(cmd, capture_output=True, check=True, startupinfo=startupinfo)
+    ffmpeg_runner.run(cmd, "무음 생성")
 
 
 def _concat_mp3s(file_list: list, output_path: str):
@@ -66,22 +83,197 @@ def _concat_mp3s(file_list: list, output_path: str):
         "-c", "copy",
         output_path
     ]
-    startupinfo = None
-    if os.name == 'nt':
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    result = subprocess.run(cmd, capture_output=True, text=False, startupinfo=startupinfo)
-    os.unlink(list_path)
+    try:
+        ffmpeg_runner.run(cmd, "오디오 병합")
+    finally:
+        os.unlink(list_path)
+
+
+def _seg_duration(store, seg) -> float:
+    """세그먼트 길이 (저장소 메타에 캐시 → 재사용 세그먼트는 ffprobe 생략)"""
+    if "duration" not in seg["meta"]:
+        seg["meta"]["duration"] = get_audio_duration(seg["path"])
+        store.set_meta(seg["key"], duration=seg["meta"]["duration"])
+    return seg["meta"]["duration"]
+
+
+def _line_segments(script: dict, store, holder: str) -> tuple[list[dict], list[dict]]:
+    """대사마다 TTS 1회 + ffmpeg 무음 세그먼트 → (segments, timings)"""
+    # timings: make_video에서 화면 전환 타이밍에 사용
+    # thumbnail 구간은 고정값, 나머지는 실제 오디오 길이 측정
+    timings = [{"type": "thumbnail", "duration": THUMBNAIL_DURATION}]
+    segments = []
+
+    # ── 세그먼트 누적용 버퍼 ─────────────────────────
+    # 나레이션/복습은 하나의 타이밍 블록으로 묶음
+    # 대사는 각각 개별 타이밍으로 측정
+
+    def add_silence(duration):
+        art = store.get_or_build(
+            "silence", {"duration": duration},
+            lambda p: _make_silence(duration, p), ext=".mp3", holder=holder,
+        )
+        segments.append({**art, "tag": "silence"})
+
+    def add_tts(text, speaker, rate=1.0, tag="misc"):
+        # 에피소드 화자 배정 음성 + 음성/속도별 게인 (병합(-c copy) 전에 음량을 맞춤)
+        voice = voice_for(script, speaker)
+        gain = gain_db(voice, rate)
+        inputs = {"text": text, "voice": voice, "rate": rate, "gain_db": gain}
+        art = store.get_or_build(
+            "tts", inputs,
+            lambda p: synthesize_line(text, speaker, p, speaking_rate=rate,
+                                      volume_gain_db=gain, voice=voice),
+            ext=".mp3", holder=holder,
+        )
+        segments.append({**art, "tag": tag})
+
+    # ── 1. 인트로 무음 ──────────────────────────────────
+    add_silence(INTRO_SILENCE)
+
+    # ── 2. 인트로 나레이션 ──────────────────────────────
+    narration_start_idx = len(segments)
+    intro_jp = script.get("intro_narration", "")
+    if intro_jp:
+        add_tts(intro_jp, NARRATOR, rate=NARRATION_RATE, tag="narration")
+        add_silence(PAUSE_AFTER_NARRATION)
+
+    # 나레이션 구간 길이 측정
+    narration_segs = segments[narration_start_idx:]
+    if narration_segs:
+        narration_dur = sum(_seg_duration(store, s) for s in narration_segs)
+        timings.append({"type": "narration", "duration": narration_dur})
+
+    # ── 3. 대화 라인 (각각 개별 타이밍 측정) ────────────
+    dialogue = script.get("dialogue", [])
+    for i, line in enumerate(dialogue):
+        speaker = line.get("speaker", "田中")
+        text_jp = line.get("text_jp", "")
+        rate = _audio_note_to_rate(line.get("audio_note", "normal"))
+        if not text_jp:
+            continue
+
+        seg_start_idx = len(segments)
+        add_tts(text_jp, speaker, rate=rate, tag=f"dialogue_{i}")
+        add_silence(PAUSE_BETWEEN_LINES)
 
-    stderr_text = result.stderr.decode('utf-8', errors='replace')
-    if result.returncode != 0:
-        raise RuntimeError(f"ffmpeg concat 오류: {stderr_text[-300:]}")
+        # 이 대사 + 뒤 무음까지의 실제 길이
+        line_segs = segments[seg_start_idx:]
+        line_dur = sum(_seg_duration(store, s) for s in line_segs)
+        timings.append({
+            "type": "dialogue",
+            "index": i,
+            "duration": line_dur,
+            "speaker": speaker,
+        })
+
+    # ── 4. 아웃트로 무음 ───────────────────────────────
+    add_silence(OUTRO_SILENCE)
+    return segments, timings
+
+
+def _ssml_escape(text: str) -> str:
+    # xml.sax.saxutils.escape는 urllib까지 import하므로 직접 처리 (기동 시간)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _ssml_break(seconds: float) -> str:
+    return f'<break time="{round(seconds * 1000)}ms"/>'
+
+
+def _ssml_runs(items: list[dict]) -> list[list[dict]]:
+    """같은 음성이 이어지는 항목끼리 묶음 (SSML 크기 상한 초과 시 분할)"""
+    runs = []
+    size = 0
+    for item in items:
+        item_size = len(item["ssml"].encode("utf-8"))
+        if runs and runs[-1][-1]["voice"] == item["voice"] and size + item_size <= TTS_SSML_MAX_BYTES:
+            runs[-1].append(item)
+            size += item_size
+        else:
+            runs.append([item])
+            size = item_size
+    return runs
+
+
+def _ssml_segments(script: dict, store, holder: str) -> tuple[list[dict], list[dict]]:
+    """
+    같은 음성의 연속 대사(+ 뒤 무음)를 SSML 한 요청으로 합성 → (segments, timings)
+    대사 앞에 <mark>를 넣고 v1beta1 타임포인트로 대사별 길이를 계산 (ffmpeg 무음 세그먼트 없음)
+    """
+    # 항목: 나레이션 + 대사 (mark 이름, 음성, SSML 조각, 타이밍 정보)
+    items = []
+    intro_jp = script.get("intro_narration", "")
+    if intro_jp:
+        items.append({"mark": "narration", "voice": voice_for(script, NARRATOR),
+                      "text": intro_jp, "rate": NARRATION_RATE, "pause": PAUSE_AFTER_NARRATION,
+                      "timing": {"type": "narration"}})
+    for i, line in enumerate(script.get("dialogue", [])):
+        speaker = line.get("speaker", "田中")
+        text_jp = line.get("text_jp", "")
+        if not text_jp:
+            continue
+        items.append({"mark": f"line{i}", "voice": voice_for(script, speaker),
+                      "text": text_jp, "rate": _audio_note_to_rate(line.get("audio_note", "normal")),
+                      "pause": PAUSE_BETWEEN_LINES,
+                      "timing": {"type": "dialogue", "index": i, "speaker": speaker}})
+    for item in items:
+        body = _ssml_escape(_clean_text(item["text"]))
+        if item["rate"] != 1.0:
+            body = f'<prosody rate="{round(item["rate"] * 100)}%">{body}</prosody>'
+        item["ssml"] = f'<mark name="{item["mark"]}"/>{body}{_ssml_break(item["pause"])}'
+
+    runs = _ssml_runs(items)
+    segments = []
+    positions = {}  # mark 이름 → 에피소드 오디오 기준 시각 (초)
+    offset = 0.0
+    for n, run in enumerate(runs):
+        parts = [item["ssml"] for item in run]
+        if n == 0:
+            parts.insert(0, _ssml_break(INTRO_SILENCE))
+        if n == len(runs) - 1:
+            parts += ['<mark name="end"/>', _ssml_break(OUTRO_SILENCE)]
+        ssml = f"<speak>{''.join(parts)}</speak>"
+        voice = run[0]["voice"]
+        # 속도는 <prosody>로 대사별 지정 → 게인은 음성의 기본 속도 기준
+        gain = gain_db(voice)
+        built = {}
+
+        def build(p):
+            built["timepoints"] = synthesize_ssml(ssml, voice, p, volume_gain_db=gain)
+
+        seg = store.get_or_build("tts", {"ssml": ssml, "voice": voice, "gain_db": gain},
+                                 build, ext=".mp3", holder=holder)
+        if "timepoints" not in seg["meta"]:
+            if "timepoints" not in built:
+                # 타임포인트 메타 없이 남은 산출물 (저장 직후 중단 등) → 다시 합성
+                build(seg["path"])
+            seg["meta"]["timepoints"] = built["timepoints"]
+            store.set_meta(seg["key"], timepoints=built["timepoints"])
+        for tp in seg["meta"].get("timepoints", []):
+            positions[tp["markName"]] = offset + float(tp.get("timeSeconds", 0.0))
+        offset += _seg_duration(store, seg)
+        segments.append({**seg, "tag": f"ssml_{n}"})
+
+    missing = [item["mark"] for item in items if item["mark"] not in positions]
+    if missing:
+        raise RuntimeError(f"SSML 타임포인트 누락: {', '.join(missing)}")
+
+    # 각 항목 = 자기 mark부터 다음 mark까지 (첫 항목은 썸네일 구간 뒤부터)
+    timings = [{"type": "thumbnail", "duration": THUMBNAIL_DURATION}]
+    start = THUMBNAIL_DURATION
+    ends = [positions[item["mark"]] for item in items[1:]] + [positions.get("end", offset)]
+    for item, end in zip(items, ends):
+        timings.append({**item["timing"], "duration": max(end - start, 0.0)})
+        start = end
+    return segments, timings
 
 
 def export_episode(script: dict, output_path: str) -> tuple[str, list[dict]]:
     """
     스크립트 전체를 MP3로 합성
     구성: 나레이션 → 대화 → 핵심 문장 복습
+    (SSML 모드면 같은 음성이 이어지는 구간을 한 요청으로 합성)
 
     Returns:
         (output_path, timings)
@@ -89,79 +281,19 @@ def export_episode(script: dict, output_path: str) -> tuple[str, list[dict]]:
     """
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    # timings: make_video에서 화면 전환 타이밍에 사용
-    # thumbnail 구간은 고정값, 나머지는 실제 오디오 길이 측정
-    timings = [{"type": "thumbnail", "duration": THUMBNAIL_DURATION}]
+    # 세그먼트는 산출물 저장소에 입력 해시로 저장 → 같은 대사/무음은 이전 실행 것을 재사용
+    store = get_store()
+    holder = episode_holder(output_path)
+    if _ssml_enabled:
+        segments, timings = _ssml_segments(script, store, holder)
+    else:
+        segments, timings = _line_segments(script, store, holder)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        segments = []
-        idx = 0
-
-        # ── 세그먼트 누적용 버퍼 ─────────────────────────
-        # 나레이션/복습은 하나의 타이밍 블록으로 묶음
-        # 대사는 각각 개별 타이밍으로 측정
-
-        def add_silence(duration):
-            nonlocal idx
-            p = os.path.join(tmpdir, f"sil_{idx:04d}.mp3")
-            _make_silence(duration, p)
-            segments.append({"path": p, "tag": "silence"})
-            idx += 1
-
-        def add_tts(text, speaker, rate=1.0, tag="misc"):
-            nonlocal idx
-            p = os.path.join(tmpdir, f"seg_{idx:04d}.mp3")
-            synthesize_line(text, speaker, p, speaking_rate=rate)
-            segments.append({"path": p, "tag": tag})
-            idx += 1
-
-        # ── 1. 인트로 무음 ──────────────────────────────────
-        add_silence(0.5)
-
-        # ── 2. 인트로 나레이션 ──────────────────────────────
-        narration_start_idx = len(segments)
-        intro_jp = script.get("intro_narration", "")
-        if intro_jp:
-            add_tts(intro_jp, "ナレーター", rate=0.95, tag="narration")
-            add_silence(PAUSE_AFTER_NARRATION)
-
-        # 나레이션 구간 길이 측정
-        narration_segs = segments[narration_start_idx:]
-        if narration_segs:
-            narration_dur = sum(
-                get_audio_duration(s["path"]) for s in narration_segs
-            )
-            timings.append({"type": "narration", "duration": narration_dur})
-
-        # ── 3. 대화 라인 (각각 개별 타이밍 측정) ────────────
-        dialogue = script.get("dialogue", [])
-        for i, line in enumerate(dialogue):
-            speaker = line.get("speaker", "田中")
-            text_jp = line.get("text_jp", "")
-            rate = _audio_note_to_rate(line.get("audio_note", "normal"))
-            if not text_jp:
-                continue
-
-            seg_start_idx = len(segments)
-            add_tts(text_jp, speaker, rate=rate, tag=f"dialogue_{i}")
-            add_silence(PAUSE_BETWEEN_LINES)
-
-            # 이 대사 + 뒤 무음까지의 실제 길이
-            line_segs = segments[seg_start_idx:]
-            line_dur = sum(get_audio_duration(s["path"]) for s in line_segs)
-            timings.append({
-                "type": "dialogue",
-                "index": i,
-                "duration": line_dur,
-                "speaker": speaker,
-            })
-
-        # ── 4. 아웃트로 무음 ───────────────────────────────
-        add_silence(0.5)
-
-        # ── 6. 전체 병합 ───────────────────────────────────
-        all_paths = [s["path"] for s in segments]
-        _concat_mp3s(all_paths, output_path)
+    # ── 전체 병합 ───────────────────────────────────
+    all_paths = [s["path"] for s in segments]
+    with atomic_output(output_path) as tmp_output:
+        _concat_mp3s(all_paths, tmp_output)
+    store.register_file(output_path, "audio", holder=holder)
 
     # 3분(180초) 길이 제한 체크
     try:
@@ -173,4 +305,4 @@ def export_episode(script: dict, output_path: str) -> tuple[str, list[dict]]:
 
     size_kb = os.path.getsize(output_path) // 1024
     print(f"  오디오 생성 완료: {output_path} ({size_kb} KB)")
-    return output_path, timings
\ No newline at end of file
+    return output_path, timings
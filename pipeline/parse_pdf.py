@@ -1,9 +1,10 @@
 """PDF 텍스트 추출 모듈 (pdfplumber 사용)"""
-import pdfplumber
 
 
 def parse_pdf(pdf_path: str) -> str:
     """PDF 파일에서 전체 텍스트를 추출합니다."""
+    import pdfplumber  # 캐시 미스 시에만 필요하므로 지연 import
+
     texts = []
     with pdfplumber.open(pdf_path) as pdf:
         total = len(pdf.pages)
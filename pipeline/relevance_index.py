@@ -0,0 +1,150 @@
+"""
+상황 ↔ 문법/한자 관련도 역색인
+
+태그: 텍스트에 포함된 한자 1글자 + 가타카나 단어(2자 이상)
+  - 한자 항목: kanji + example_word 의 태그
+  - 문법 항목: form + example_jp 의 태그
+  - 상황: situation 텍스트의 태그
+
+추출(load_or_extract_all) 시 1회 구축하여 RELEVANCE_INDEX_FILE에 저장.
+  tags:       풀별 태그 → 항목 키 목록 (역색인)
+  situations: B2B/B2C 상황(확장 풀 포함) 텍스트 → 풀별 관련 항목 키 (점수순, 사전 계산)
+선택 시에는 dict 조회 한 번으로 후보를 얻습니다.
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import RELEVANCE_INDEX_FILE
+from pipeline.knowledge_sampler import POOLS, item_key, pool_items
+from pipeline.locks import atomic_write_json
+
+INDEX_VERSION = 1
+
+# 상황당 풀별 최대 후보 수 (이 안에서 사용 이력 기반으로 선택)
+MAX_CANDIDATES = 30
+
+_KANJI_RE = re.compile(r"[一-鿿]")
+_KATAKANA_RE = re.compile(r"[ァ-ヺー]{2,}")
+
+# 항목 종류별 태그 추출 필드
+_TAG_FIELDS = {
+    "grammar": ("form", "example_jp"),
+    "kanji": ("kanji", "example_word"),
+}
+
+
+def extract_tags(text: str) -> set:
+    if not isinstance(text, str):
+        return set()
+    return set(_KANJI_RE.findall(text)) | set(_KATAKANA_RE.findall(text))
+
+
+def _item_tags(pool: str, item: dict) -> set:
+    tags = set()
+    for field in _TAG_FIELDS[POOLS[pool][0]]:
+        tags |= extract_tags(item.get(field, ""))
+    return tags
+
+
+def _fingerprint(knowledge: dict, situations: list) -> str:
+    """지식베이스/상황 목록이 바뀌면 재구축하기 위한 지문"""
+    h = hashlib.sha256(str(INDEX_VERSION).encode())
+    for pool in POOLS:
+        for item in pool_items(knowledge, pool):
+            if isinstance(item, dict):
+                h.update(item_key(pool, item).encode("utf-8"))
+    for text in situations:
+        h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class RelevanceIndex:
+    def __init__(self, data: dict):
+        self.fingerprint = data.get("fingerprint", "")
+        self.tags: dict[str, dict[str, list]] = data.get("tags", {})
+        self.situations: dict[str, dict[str, list]] = data.get("situations", {})
+
+    @classmethod
+    def build(cls, knowledge: dict, situations: list) -> "RelevanceIndex":
+        tags = {}
+        for pool in POOLS:
+            inverted = {}
+            for item in pool_items(knowledge, pool):
+                if not isinstance(item, dict):
+                    continue
+                key = item_key(pool, item)
+                for tag in _item_tags(pool, item):
+                    inverted.setdefault(tag, []).append(key)
+            tags[pool] = inverted
+
+        index = cls({"fingerprint": _fingerprint(knowledge, situations), "tags": tags})
+        index.situations = {text: index._score(text) for text in situations}
+        return index
+
+    def _score(self, situation_text: str) -> dict:
+        """상황 태그와 겹치는 항목을 겹친 태그 수 순으로 정렬"""
+        result = {}
+        situation_tags = extract_tags(situation_text)
+        for pool, inverted in self.tags.items():
+            scores = Counter()
+            for tag in situation_tags:
+                for key in inverted.get(tag, ()):
+                    scores[key] += 1
+            result[pool] = [key for key, _ in scores.most_common(MAX_CANDIDATES)]
+        return result
+
+    def lookup(self, situation_text: str, pool: str) -> list:
+        """상황에 관련된 항목 키 목록 (사전 계산된 상황은 O(1), 그 외는 역색인으로 계산)"""
+        entry = self.situations.get(situation_text)
+        if entry is None:
+            entry = self._score(situation_text)
+            self.situations[situation_text] = entry
+        return entry.get(pool, [])
+
+    def to_dict(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "tags": self.tags,
+            "situations": self.situations,
+        }
+
+
+def _all_situation_texts() -> list:
+    """기본 풀 + 확장 저장소의 모든 상황 (저장소가 바뀌면 지문이 달라져 재구축)"""
+    from pipeline.situation_pool import load_pool
+    return [s["situation"] for s in load_pool("B2B") + load_pool("B2C")]
+
+
+_index = None
+_index_source = None
+
+
+def load_or_build(knowledge: dict) -> RelevanceIndex:
+    """저장된 색인이 최신이면 로드, 아니면 재구축 후 저장"""
+    global _index, _index_source
+    if _index is not None and _index_source is knowledge:
+        return _index
+
+    situations = _all_situation_texts()
+    fingerprint = _fingerprint(knowledge, situations)
+    index = None
+    if RELEVANCE_INDEX_FILE.exists():
+        with open(RELEVANCE_INDEX_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("fingerprint") == fingerprint:
+            index = RelevanceIndex(data)
+
+    if index is None:
+        print("[색인] 상황-지식 관련도 색인 구축 중...")
+        index = RelevanceIndex.build(knowledge, situations)
+        atomic_write_json(RELEVANCE_INDEX_FILE, index.to_dict())
+        print(f"[저장] {RELEVANCE_INDEX_FILE}")
+
+    _index, _index_source = index, knowledge
+    return index
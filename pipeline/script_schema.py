@@ -0,0 +1,88 @@
+"""
+대화 스크립트 JSON 구조 정의 및 검증
+- SCRIPT_SCHEMA: Gemini response_schema 로 전달 (구조화 출력)
+- validate_script(): 누락/손상된 최상위 필드 목록 반환 → 해당 필드만 보정 요청
+"""
+
+MIN_DIALOGUE_LINES = 5
+
+_STR = {"type": "STRING"}
+
+
+def _obj(props: dict, required: list = None) -> dict:
+    return {
+        "type": "OBJECT",
+        "properties": props,
+        "required": required if required is not None else list(props),
+    }
+
+
+def _arr(items: dict) -> dict:
+    return {"type": "ARRAY", "items": items}
+
+
+FIELD_SCHEMAS = {
+    "episode_title": _STR,
+    "situation": _obj({
+        "type": _STR, "situation": _STR, "channel": _STR, "difficulty": _STR,
+    }),
+    "intro_narration": _STR,
+    "intro_narration_ko": _STR,
+    "dialogue": _arr(_obj({
+        "speaker": _STR, "role": _STR, "text_jp": _STR, "text_ko": _STR,
+        "audio_note": {"type": "STRING", "enum": ["normal", "slow", "emphasis"]},
+    })),
+    "grammar_explanation": _arr(_obj({
+        "form": _STR, "meaning_ko": _STR, "example_jp": _STR,
+        "example_ko": _STR, "usage_note": _STR,
+    })),
+    "used_grammar": _arr(_obj({
+        "form": _STR, "meaning_ko": _STR, "example_jp": _STR, "example_ko": _STR,
+    })),
+    "used_vocab": _arr(_obj({
+        "word": _STR, "reading": _STR, "meaning_ko": _STR,
+    })),
+    "summary": _STR,
+}
+
+SCRIPT_SCHEMA = _obj(FIELD_SCHEMAS)
+
+
+def schema_for_fields(fields: list) -> dict:
+    """일부 필드만 포함하는 보정용 스키마"""
+    return _obj({f: FIELD_SCHEMAS[f] for f in fields if f in FIELD_SCHEMAS})
+
+
+def _non_empty_str(v) -> bool:
+    return isinstance(v, str) and bool(v.strip())
+
+
+def _objects_with(v, keys: tuple, min_len: int = 1) -> bool:
+    """keys가 모두 비어있지 않은 dict 목록인지 확인"""
+    if not isinstance(v, list) or len(v) < min_len:
+        return False
+    return all(
+        isinstance(item, dict) and all(_non_empty_str(item.get(k)) for k in keys)
+        for item in v
+    )
+
+
+_VALIDATORS = {
+    "episode_title": _non_empty_str,
+    "situation": lambda v: isinstance(v, dict) and _non_empty_str(v.get("situation")),
+    "intro_narration": _non_empty_str,
+    "intro_narration_ko": _non_empty_str,
+    "dialogue": lambda v: _objects_with(v, ("speaker", "text_jp", "text_ko"),
+                                        MIN_DIALOGUE_LINES),
+    "grammar_explanation": lambda v: _objects_with(v, ("form", "meaning_ko")),
+    "used_grammar": lambda v: _objects_with(v, ("form", "meaning_ko")),
+    "used_vocab": lambda v: _objects_with(v, ("word", "meaning_ko")),
+    "summary": _non_empty_str,
+}
+
+
+def validate_script(script) -> list[str]:
+    """검증 실패한 최상위 필드명 목록 (빈 리스트면 정상)"""
+    if not isinstance(script, dict):
+        return list(_VALIDATORS)
+    return [f for f, ok in _VALIDATORS.items() if not ok(script.get(f))]
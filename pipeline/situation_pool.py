@@ -0,0 +1,191 @@
+"""
+상황 풀 확장 및 저장소
+
+- 기본 풀(B2B_SITUATIONS / B2C_SITUATIONS) + Gemini로 대량 생성한 상황을 SITUATION_POOL_FILE에 저장
+- 확장 시 채널/난이도 버킷별 목표 개수를 맞추도록 요청하고, 유사 상황은 병합(dedup)
+- 일일 실행 경로는 load_pool()로 저장소만 읽음 (LLM 호출 없음)
+
+사용법:
+  python -m pipeline.situation_pool --expand 200            # B2B/B2C 각각 200개 확장
+  python -m pipeline.situation_pool --expand 100 --type B2C
+  python -m pipeline.situation_pool                          # 현황 출력
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import GEMINI_MODEL, SITUATION_POOL_FILE
+from pipeline.dedup import DedupIndex
+from pipeline.gemini import generate_json, json_config
+from pipeline.locks import atomic_write_json, file_lock
+
+# 상황 문장 유사도 임계값 (표현만 조금 다른 상황 병합)
+SITUATION_DEDUP_THRESHOLD = 0.7
+
+# 요청 1회당 생성 개수
+EXPAND_BATCH_SIZE = 50
+
+CHANNELS = {
+    "B2B": ["電話", "対面会議", "プレゼン", "メール", "対面"],
+    "B2C": ["対面", "電話", "メール"],
+}
+DIFFICULTIES = ["N1", "N2"]
+
+_SITUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "situations": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "situation": {"type": "STRING"},
+                    "channel": {"type": "STRING"},
+                    "difficulty": {"type": "STRING", "enum": DIFFICULTIES},
+                },
+                "required": ["situation", "channel", "difficulty"],
+            },
+        },
+    },
+    "required": ["situations"],
+}
+
+
+def _base_pool(ep_type: str) -> list:
+    from pipeline.generate_situation import B2B_SITUATIONS, B2C_SITUATIONS
+    return B2B_SITUATIONS if ep_type == "B2B" else B2C_SITUATIONS
+
+
+def _load_store() -> dict:
+    if SITUATION_POOL_FILE.exists():
+        with open(SITUATION_POOL_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"B2B": [], "B2C": []}
+
+
+def _save_store(store: dict):
+    atomic_write_json(SITUATION_POOL_FILE, store, indent=1)
+
+
+def load_pool(ep_type: str) -> list:
+    """기본 풀 + 저장소의 생성 상황 (LLM 호출 없음)"""
+    return _base_pool(ep_type) + _load_store().get(ep_type, [])
+
+
+def bucket_counts(pool: list) -> Counter:
+    return Counter((s.get("channel"), s.get("difficulty")) for s in pool)
+
+
+def _quotas(ep_type: str, pool: list, count: int) -> dict:
+    """버킷별 부족분이 큰 순으로 count개를 배분 (전체가 균등해지도록)"""
+    buckets = [(c, d) for c in CHANNELS[ep_type] for d in DIFFICULTIES]
+    counts = bucket_counts(pool)
+    quotas = Counter()
+    for _ in range(count):
+        b = min(buckets, key=lambda b: counts[b] + quotas[b])
+        quotas[b] += 1
+    return dict(quotas)
+
+
+def _build_prompt(ep_type: str, quotas: dict, examples: list) -> str:
+    context = ("여행사와 호텔·항공사·버스회사·현지 업체 등 거래처 간의 비즈니스 상황"
+               if ep_type == "B2B" else "여행사 직원과 고객 간의 서비스 상황")
+    quota_lines = "\n".join(
+        f"- 채널 {c} / 난이도 {d}: {n}개" for (c, d), n in sorted(quotas.items())
+    )
+    example_lines = "\n".join(f"- {s['situation']}" for s in examples)
+    return f"""당신은 여행업 비즈니스 일본어 교육 콘텐츠 기획자입니다.
+학습용 대화 상황을 새로 만들어 주세요.
+
+## 유형
+{ep_type}: {context}
+
+## 생성 개수 (채널/난이도별)
+{quota_lines}
+
+## 요구사항
+1. 상황은 일본어 한 문장 (30자 이내), 예시와 같은 형식
+2. 대화의 배경이 되는 국가는 한국과 일본으로 한정
+3. 아래 기존 상황과 겹치지 않는 새로운 상황
+4. channel 값은 위 채널 이름을 그대로 사용
+
+## 기존 상황 (중복 금지)
+{example_lines}
+
+JSON만 반환하세요: {{"situations": [{{"situation": "...", "channel": "...", "difficulty": "N1"}}]}}"""
+
+
+def expand_pool(ep_type: str, count: int = 200) -> int:
+    """
+    Gemini로 상황 count개를 추가 생성하여 저장소에 병합
+    반환: 실제 추가된 개수 (중복/버킷 초과분 제외)
+    """
+    with file_lock("situation_pool"):
+        return _expand_pool(ep_type, count)
+
+
+def _expand_pool(ep_type: str, count: int) -> int:
+    store = _load_store()
+    base = _base_pool(ep_type)
+    index = DedupIndex("situation", threshold=SITUATION_DEDUP_THRESHOLD)
+    index.extend(base + store.get(ep_type, []))
+    existing = len(index.items)
+
+    remaining = count
+    while remaining > 0:
+        n = min(EXPAND_BATCH_SIZE, remaining)
+        quotas = _quotas(ep_type, index.items, n)
+        examples = random.sample(index.items, min(40, len(index.items)))
+        print(f"  [{ep_type}] 상황 {n}개 생성 요청...")
+        try:
+            resp = generate_json(
+                GEMINI_MODEL, _build_prompt(ep_type, quotas, examples),
+                json_config(_SITUATION_SCHEMA), use_cache=False,
+            )
+        except Exception as e:
+            print(f"  [경고] 상황 생성 실패: {e}")
+            break
+
+        accepted = Counter()
+        for s in resp.get("situations", []):
+            bucket = (s.get("channel"), s.get("difficulty"))
+            if accepted[bucket] >= quotas.get(bucket, 0):
+                continue  # 버킷 초과분은 버려서 채널/난이도 균형 유지
+            item = {k: s.get(k, "") for k in ("situation", "channel", "difficulty")}
+            if index.add(item):
+                accepted[bucket] += 1
+        added = sum(accepted.values())
+        print(f"  [{ep_type}] {added}개 추가 (중복 {index.merged}개 누적 병합)")
+        if added == 0:
+            break
+        remaining -= added
+
+    new_items = index.items[existing:]
+    store[ep_type] = store.get(ep_type, []) + new_items
+    _save_store(store)
+    return len(new_items)
+
+
+def print_stats():
+    for ep_type in ("B2B", "B2C"):
+        pool = load_pool(ep_type)
+        print(f"[{ep_type}] 총 {len(pool)}개 (기본 {len(_base_pool(ep_type))}개)")
+        for (c, d), n in sorted(bucket_counts(pool).items()):
+            print(f"  {c} / {d}: {n}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="상황 풀 확장")
+    parser.add_argument("--expand", type=int, default=0, help="유형별 추가 생성 개수")
+    parser.add_argument("--type", choices=["B2B", "B2C"], help="확장할 유형 (기본: 둘 다)")
+    args = parser.parse_args()
+
+    if args.expand:
+        for ep_type in ([args.type] if args.type else ["B2B", "B2C"]):
+            added = expand_pool(ep_type, args.expand)
+            print(f"[{ep_type}] 저장소에 {added}개 추가")
+    print_stats()
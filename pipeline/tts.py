@@ -4,40 +4,22 @@ Google Cloud TTS API (REST API Key 방식)로 일본어 음성 합성
 import os
 import sys
 import json
+import time
 import base64
-import requests
 import re
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from config import GOOGLE_TTS_API_KEY, TTS_VOICE_MALE, TTS_VOICE_FEMALE, TTS_VOICE_NARRATOR
+from config import (
+    GOOGLE_TTS_API_KEY, TTS_HEALTH_FILE, TTS_HEALTH_TTL, TTS_VOICE_NARRATOR, TTS_VOICE_POOL,
+)
+from pipeline.instrument import span
+from pipeline.locks import atomic_write_bytes, atomic_write_json
+from pipeline.voice_registry import default_voice
 
 TTS_ENDPOINT = "https://texttospeech.googleapis.com/v1/text:synthesize"
-
-# 화자 역할별 음성 매핑
-VOICE_MAP = {
-    "male": TTS_VOICE_MALE,
-    "female": TTS_VOICE_FEMALE,
-    "narrator": TTS_VOICE_NARRATOR,
-}
-
-# 화자 이름별 성별 매핑 (일반적인 일본 이름 기준)
-NAME_GENDER = {
-    "田中": "male",
-    "山田": "male",
-    "佐藤": "female",
-    "鈴木": "male",
-    "高橋": "female",
-    "伊藤": "male",
-    "渡辺": "female",
-    "ナレーター": "narrator",
-    "narrator": "narrator",
-}
-
-
-def _get_voice_for_speaker(speaker: str) -> str:
-    """화자 이름으로 음성 결정"""
-    gender = NAME_GENDER.get(speaker, "male")
-    return VOICE_MAP.get(gender, TTS_VOICE_MALE)
+TTS_VOICES_ENDPOINT = "https://texttospeech.googleapis.com/v1/voices"
+# SSML <mark> 타임포인트(enableTimePointing)는 v1beta1에서만 제공
+TTS_BETA_ENDPOINT = "https://texttospeech.googleapis.com/v1beta1/text:synthesize"
 
 
 def _clean_text(text: str) -> str:
@@ -51,18 +33,23 @@ def _clean_text(text: str) -> str:
 
 
 def synthesize_line(text: str, speaker: str, output_path: str,
-                    speaking_rate: float = 1.0) -> str:
+                    speaking_rate: float = 1.0, volume_gain_db: float = 0.0,
+                    voice: str = None) -> str:
     """
     단일 텍스트 라인을 MP3로 합성
     Args:
         text: 일본어 텍스트
-        speaker: 화자 이름 (음성 선택에 사용)
+        speaker: 화자 이름 (voice가 없을 때 음성 선택에 사용)
         output_path: 출력 MP3 경로
         speaking_rate: 읽기 속도 (0.25~4.0, 기본 1.0)
+        volume_gain_db: 음량 보정 (pipeline.loudness.gain_db, 기본 0.0)
+        voice: TTS 음성 이름 (pipeline.voice_registry 배정, 없으면 화자 이름 기준 기본 음성)
     Returns:
         output_path
     """
-    voice_name = _get_voice_for_speaker(speaker)
+    import requests  # 지연 import (CLI 기동 시간 단축)
+
+    voice_name = voice or default_voice(speaker)
     text = _clean_text(text)
 
     payload = {
@@ -75,42 +62,124 @@ def synthesize_line(text: str, speaker: str, output_path: str,
             "audioEncoding": "MP3",
             "speakingRate": speaking_rate,
             "pitch": 0.0,
+            "volumeGainDb": volume_gain_db,
         }
     }
 
-    resp = requests.post(
-        TTS_ENDPOINT,
-        params={"key": GOOGLE_TTS_API_KEY},
-        json=payload,
-        timeout=30
-    )
-    resp.raise_for_status()
+    with span("tts.call", voice=voice_name, rate=speaking_rate, gain_db=volume_gain_db) as sp:
+        sp.bytes_in = len(text.encode("utf-8"))
+        resp = requests.post(
+            TTS_ENDPOINT,
+            params={"key": GOOGLE_TTS_API_KEY},
+            json=payload,
+            timeout=30
+        )
+        resp.raise_for_status()
 
-    audio_content = resp.json().get("audioContent", "")
-    audio_bytes = base64.b64decode(audio_content)
+        audio_content = resp.json().get("audioContent", "")
+        audio_bytes = base64.b64decode(audio_content)
+        sp.bytes_out = len(audio_bytes)
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "wb") as f:
-        f.write(audio_bytes)
+    atomic_write_bytes(output_path, audio_bytes)
 
     return output_path
 
 
-def check_tts() -> bool:
-    """TTS API 연결 확인"""
+def synthesize_ssml(ssml: str, voice: str, output_path: str,
+                    volume_gain_db: float = 0.0) -> list[dict]:
+    """
+    SSML(<break>, <mark>, <prosody>) 한 번에 합성 → MP3
+    Args:
+        ssml: <speak>...</speak> (텍스트는 호출 측에서 _clean_text + XML 이스케이프)
+        voice: TTS 음성 이름
+        output_path: 출력 MP3 경로
+        volume_gain_db: 음량 보정 (pipeline.loudness.gain_db)
+    Returns:
+        <mark> 타임포인트 [{"markName": str, "timeSeconds": float}, ...]
+    """
+    import requests  # 지연 import (CLI 기동 시간 단축)
+
+    payload = {
+        "input": {"ssml": ssml},
+        "voice": {
+            "languageCode": "ja-JP",
+            "name": voice,
+        },
+        "audioConfig": {
+            "audioEncoding": "MP3",
+            "speakingRate": 1.0,
+            "pitch": 0.0,
+            "volumeGainDb": volume_gain_db,
+        },
+        "enableTimePointing": ["SSML_MARK"],
+    }
+
+    with span("tts.call", voice=voice, ssml=True, gain_db=volume_gain_db) as sp:
+        sp.bytes_in = len(ssml.encode("utf-8"))
+        resp = requests.post(
+            TTS_BETA_ENDPOINT,
+            params={"key": GOOGLE_TTS_API_KEY},
+            json=payload,
+            timeout=60
+        )
+        resp.raise_for_status()
+
+        body = resp.json()
+        audio_bytes = base64.b64decode(body.get("audioContent", ""))
+        sp.bytes_out = len(audio_bytes)
+
+    atomic_write_bytes(output_path, audio_bytes)
+
+    return body.get("timepoints", [])
+
+
+def _recent_health(max_age: float) -> dict | None:
     try:
-        import tempfile
-        tmp = tempfile.mktemp(suffix=".mp3")
-        synthesize_line("テスト", "ナレーター", tmp)
-        if os.path.exists(tmp):
-            os.remove(tmp)
+        with open(TTS_HEALTH_FILE, "r", encoding="utf-8") as f:
+            health = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - health.get("checked_at", 0) >= max_age:
+        return None
+    return health
+
+
+def check_tts(max_age: float = TTS_HEALTH_TTL) -> bool:
+    """
+    TTS API 준비 확인 (ja-JP voices 목록 조회 → 합성 과금 없음)
+    성공 결과는 TTS_HEALTH_FILE에 저장해 max_age초 동안 재사용 (실패는 저장하지 않음)
+    설정한 음성(나레이터 + TTS_VOICE_POOL)이 목록에 없으면 경고
+    """
+    if _recent_health(max_age):
         return True
+
+    import requests  # 지연 import (CLI 기동 시간 단축)
+
+    try:
+        with span("tts.probe") as sp:
+            resp = requests.get(
+                TTS_VOICES_ENDPOINT,
+                params={"key": GOOGLE_TTS_API_KEY, "languageCode": "ja-JP"},
+                timeout=10,
+            )
+            resp.raise_for_status()
+            voices = {v.get("name") for v in resp.json().get("voices", [])}
+            sp.set(voices=len(voices))
     except Exception as e:
         print(f"TTS 연결 오류: {e}")
         return False
 
+    configured = {TTS_VOICE_NARRATOR, *(v for pool in TTS_VOICE_POOL.values() for v in pool)}
+    missing = sorted(configured - voices)
+    if missing:
+        print(f"  [경고] TTS 음성 목록에 없는 설정 음성: {', '.join(missing)}")
+    atomic_write_json(TTS_HEALTH_FILE, {
+        "checked_at": time.time(), "voices": len(voices), "missing": missing,
+    })
+    return True
+
 
 if __name__ == "__main__":
     print("TTS 연결 테스트...")
-    ok = check_tts()
+    ok = check_tts(max_age=0)
     print("TTS OK" if ok else "TTS FAIL")
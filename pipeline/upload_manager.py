@@ -0,0 +1,216 @@
+"""
+YouTube 업로드 관리 (동시 업로드 + 일일 쿼터 장부)
+
+- QuotaLedger: 쿼터 창(태평양 시간 기준 날짜)별 사용량을 SQLite에 기록
+  새 업로드 세션(videos.insert)을 시작할 때마다 UPLOAD_QUOTA_COST를 예약하고,
+  예산을 넘으면 QuotaExceeded(retry_at=다음 창 시작)
+  저장된 세션 URI로 이어서 올릴 때는 차감하지 않음 (YouTube도 insert 1회에만 과금)
+  실패/중단 후 새 세션으로 다시 올리면 YouTube가 다시 과금하므로 장부에도 다시 기록
+- upload_slot(): 동시 업로드 수 제한 (파일 잠금 슬롯 → 여러 워커 프로세스 합계로 제한)
+- UploadManager: 여러 업로드를 스레드로 동시에 실행, 쿼터 초과분은 deferred로 반환
+
+사용법:
+  python -m pipeline.upload_manager     # 현재 쿼터 창 사용량 출력
+"""
+import os
+import sys
+import time
+import sqlite3
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import (
+    QUOTA_DB, QUOTA_TZ, YOUTUBE_DAILY_QUOTA, UPLOAD_QUOTA_COST,
+    UPLOAD_CONCURRENCY, ensure_dirs,
+)
+from pipeline.artifact_store import get_store
+from pipeline.locks import LockBusy, file_lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    quota_day  TEXT NOT NULL,      -- 쿼터 창 (태평양 시간 날짜, YYYY-MM-DD)
+    key        TEXT NOT NULL,      -- 업로드 키 (ep_id#세션 순번, 이전 기록은 ep_id)
+    units      INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (quota_day, key)
+);
+"""
+
+_SLOT_POLL_SEC = 1.0
+
+
+class QuotaExceeded(Exception):
+    """이번 쿼터 창의 예산 초과 → retry_at(epoch 초) 이후 재시도"""
+
+    def __init__(self, message: str, retry_at: float):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+def quota_window(now: datetime = None) -> str:
+    now = now or datetime.now(ZoneInfo(QUOTA_TZ))
+    return now.astimezone(ZoneInfo(QUOTA_TZ)).strftime("%Y-%m-%d")
+
+
+def next_window_start(now: datetime = None) -> float:
+    """다음 쿼터 창 시작 (태평양 시간 자정) epoch 초"""
+    now = (now or datetime.now(ZoneInfo(QUOTA_TZ))).astimezone(ZoneInfo(QUOTA_TZ))
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(),
+                                tzinfo=ZoneInfo(QUOTA_TZ))
+    return midnight.timestamp()
+
+
+class QuotaLedger:
+    def __init__(self, path=QUOTA_DB, budget: int = YOUTUBE_DAILY_QUOTA):
+        ensure_dirs()
+        self.budget = budget
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def used(self, window: str = None) -> int:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(units), 0) FROM quota_usage WHERE quota_day = ?",
+            (window or quota_window(),),
+        ).fetchone()
+        return row[0]
+
+    def reserve(self, key: str, units: int = UPLOAD_QUOTA_COST):
+        """
+        이번 창에서 units 예약 (업로드 세션 1개 = 1회, 같은 key라도 호출마다 차감)
+        Raises:
+            QuotaExceeded: 예산 초과 (retry_at = 다음 창 시작)
+        """
+        window = quota_window()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            used = self.used(window)
+            if used + units > self.budget:
+                self.conn.execute("ROLLBACK")
+                raise QuotaExceeded(
+                    f"YouTube 쿼터 부족 ({window}: {used}/{self.budget}, 필요 {units})",
+                    next_window_start(),
+                )
+            sessions = self.conn.execute(
+                "SELECT COUNT(*) FROM quota_usage WHERE quota_day = ? AND (key = ? OR key GLOB ?)",
+                (window, key, f"{key}#*"),
+            ).fetchone()[0]
+            self.conn.execute(
+                "INSERT INTO quota_usage (quota_day, key, units, created_at) VALUES (?, ?, ?, ?)",
+                (window, f"{key}#{sessions + 1}", units, time.time()),
+            )
+            self.conn.execute("COMMIT")
+        except QuotaExceeded:
+            raise
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+@contextmanager
+def upload_slot(timeout: float = None):
+    """
+    동시 업로드 슬롯 (UPLOAD_CONCURRENCY개 중 하나를 잡음, 프로세스 간 공유)
+    Args:
+        timeout: None이면 빈 슬롯이 날 때까지 대기, 0이면 즉시 LockBusy
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with ExitStack() as stack:
+        slot = None
+        while slot is None:
+            for i in range(UPLOAD_CONCURRENCY):
+                try:
+                    stack.enter_context(file_lock(f"upload_slot_{i}", timeout=0))
+                    slot = i
+                    break
+                except LockBusy:
+                    continue
+            if slot is None:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise LockBusy("업로드 슬롯이 모두 사용 중")
+                time.sleep(_SLOT_POLL_SEC)
+        yield slot
+
+
+def upload_with_quota(key: str, video_path: str, script: dict,
+                      privacy: str = "public", publish_at=None,
+                      slot_timeout: float = None) -> str:
+    """
+    쿼터 예약 + 슬롯 확보 후 업로드 → 영상 URL
+    Raises:
+        QuotaExceeded: 이번 창 예산 초과
+        LockBusy: slot_timeout 내 슬롯 확보 실패
+    """
+    from pipeline.youtube_upload import upload_video
+
+    def charge_session():
+        # 새 insert 세션을 열 때만 호출됨 (저장된 세션으로 재개하면 차감 없음)
+        with QuotaLedger() as ledger:
+            ledger.reserve(key)
+
+    with upload_slot(slot_timeout):
+        url = upload_video(video_path, script, privacy=privacy, publish_at=publish_at,
+                           on_new_session=charge_session)
+    try:
+        # 게시한 영상은 GC에서 보존, 에피소드 중간 산출물은 정리 대상으로
+        get_store().publish(video_path, holder=f"ep:{key}")
+    except Exception as e:
+        print(f"  [경고] 산출물 저장소 기록 실패: {e}")
+    return url
+
+
+class UploadManager:
+    """여러 에피소드를 동시에 업로드 (최대 UPLOAD_CONCURRENCY)"""
+
+    def __init__(self, max_workers: int = UPLOAD_CONCURRENCY):
+        self.max_workers = max_workers
+
+    def _upload_one(self, item: dict) -> dict:
+        try:
+            url = upload_with_quota(
+                item["ep_id"], item["video_path"], item["script"],
+                privacy=item.get("privacy", "public"), publish_at=item.get("publish_at"),
+            )
+            return {"ep_id": item["ep_id"], "url": url}
+        except QuotaExceeded as e:
+            print(f"  [{item['ep_id']}] {e} → 다음 쿼터 창으로 연기")
+            return {"ep_id": item["ep_id"], "deferred_until": e.retry_at}
+        except Exception as e:
+            print(f"  [{item['ep_id']}] 업로드 실패: {e}")
+            return {"ep_id": item["ep_id"], "error": str(e)}
+
+    def run(self, items: list) -> list[dict]:
+        """
+        Args:
+            items: [{"ep_id", "video_path", "script", "privacy", "publish_at"}]
+        Returns:
+            항목별 {"ep_id", "url"} | {"ep_id", "deferred_until"} | {"ep_id", "error"} (입력 순서)
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(self._upload_one, items))
+
+
+if __name__ == "__main__":
+    with QuotaLedger() as ledger:
+        window = quota_window()
+        used = ledger.used(window)
+        print(f"쿼터 창 {window} ({QUOTA_TZ}): {used}/{ledger.budget} units "
+              f"(업로드 {(ledger.budget - used) // UPLOAD_QUOTA_COST}회 가능)")
+        reset = datetime.fromtimestamp(next_window_start())
+        print(f"다음 초기화: {reset.strftime('%Y-%m-%d %H:%M')} (로컬 시각)")
@@ -0,0 +1,136 @@
+"""
+화자 → TTS 음성 배정 (에피소드별)
+
+스크립트의 화자 목록(등장 순서)과 역할로 TTS_VOICE_POOL에서 서로 다른 음성을 배정하고
+script["voice_map"]에 저장합니다. 스크립트 JSON과 함께 저장되므로 TTS 단계와 렌더링 단계
+(make_video의 화자 색상)가 같은 배정을 사용합니다.
+
+배정 규칙
+  - 성별: 알려진 이름(NAME_GENDER) → 역할 키워드 → 모르면 남은 음성이 많은 쪽
+    (같으면 직전 화자와 다른 쪽)
+  - 화자마다 풀에서 아직 쓰지 않은 음성을 순서대로 배정
+  - 풀이 모자라면 이 화자와 연달아 말하는 횟수가 가장 적은 화자의 음성을 재사용
+    → 인접한 대사끼리는 가능한 한 다른 음성
+  - 나레이터는 TTS_VOICE_NARRATOR (대사 화자에게는 배정하지 않음)
+배정은 스크립트 내용만으로 정해지므로 voice_map이 없는 이전 스크립트도 다시 계산하면 같은 결과입니다.
+"""
+import os
+import sys
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import TTS_VOICE_MALE, TTS_VOICE_FEMALE, TTS_VOICE_NARRATOR, TTS_VOICE_POOL
+
+# 이름으로 성별을 알 수 있는 화자 (프롬프트 예시에 쓰는 이름)
+NAME_GENDER = {
+    "田中": "male",
+    "山田": "male",
+    "佐藤": "female",
+    "鈴木": "male",
+    "高橋": "female",
+    "伊藤": "male",
+    "渡辺": "female",
+    "ナレーター": "narrator",
+    "narrator": "narrator",
+}
+
+# 역할(role) 문자열로 성별 추정 ("female"이 "male"을 포함하므로 여성 먼저 확인)
+ROLE_HINTS = (
+    ("narrator", ("ナレーター", "narrator", "나레이터")),
+    ("female", ("女性", "女将", "여성", "female")),
+    ("male", ("男性", "남성", "male")),
+)
+
+DEFAULT_VOICES = {
+    "male": TTS_VOICE_MALE,
+    "female": TTS_VOICE_FEMALE,
+    "narrator": TTS_VOICE_NARRATOR,
+}
+
+
+def speaker_gender(speaker: str, role: str = "") -> str | None:
+    """"male" / "female" / "narrator", 알 수 없으면 None"""
+    if speaker in NAME_GENDER:
+        return NAME_GENDER[speaker]
+    text = f"{speaker} {role or ''}".lower()
+    for gender, hints in ROLE_HINTS:
+        if any(h in text for h in hints):
+            return gender
+    return None
+
+
+def default_voice(speaker: str) -> str:
+    """스크립트 없이 화자 이름만 있을 때의 음성 (알 수 없으면 남성)"""
+    return DEFAULT_VOICES[speaker_gender(speaker) or "male"]
+
+
+def _speakers(script: dict) -> list[tuple[str, str]]:
+    """대사 화자 (이름, 역할) — 등장 순서, 중복 제거"""
+    seen = {}
+    for line in script.get("dialogue", []):
+        speaker = line.get("speaker", "")
+        if speaker and speaker not in seen:
+            seen[speaker] = line.get("role", "")
+    return list(seen.items())
+
+
+def _adjacency(script: dict) -> Counter:
+    """연달아 말하는 화자 쌍별 횟수"""
+    names = [line.get("speaker", "") for line in script.get("dialogue", [])]
+    return Counter(frozenset(pair) for pair in zip(names, names[1:]) if pair[0] != pair[1])
+
+
+def _pool(gender: str) -> list[str]:
+    """대사 화자용 음성 풀 (풀 설정에 나레이터 음성이 들어 있어도 제외)"""
+    return [v for v in TTS_VOICE_POOL[gender] if v != TTS_VOICE_NARRATOR]
+
+
+def allocate(script: dict) -> dict:
+    """스크립트 화자별 음성 배정 {화자: 음성}"""
+    adjacency = _adjacency(script)
+    voice_map = {}
+    holders = {}  # 음성 → 배정된 화자 목록
+    prev_gender = None
+
+    def free(gender):
+        return [v for v in _pool(gender) if v not in holders]
+
+    for speaker, role in _speakers(script):
+        gender = speaker_gender(speaker, role)
+        if gender == "narrator":
+            voice_map[speaker] = TTS_VOICE_NARRATOR
+            continue
+        if gender is None:
+            gender = max(TTS_VOICE_POOL, key=lambda g: (len(free(g)), g != prev_gender))
+
+        candidates = free(gender)
+        if candidates:
+            voice = candidates[0]
+        else:
+            # 풀 소진 → 이 화자와 인접 대사가 가장 적은 화자들의 음성 재사용
+            voice = min(_pool(gender), key=lambda v: (
+                sum(adjacency[frozenset((speaker, other))] for other in holders[v]),
+                len(holders[v]),
+            ))
+        voice_map[speaker] = voice
+        holders.setdefault(voice, []).append(speaker)
+        prev_gender = gender
+    return voice_map
+
+
+def assign_voices(script: dict) -> dict:
+    """
+    script["voice_map"]이 모든 화자를 포함하면 그대로, 아니면 배정 후 저장
+    Returns:
+        {화자: 음성} (대사 등장 순서)
+    """
+    cached = script.get("voice_map")
+    if isinstance(cached, dict) and all(s in cached for s, _ in _speakers(script)):
+        return cached
+    script["voice_map"] = allocate(script)
+    return script["voice_map"]
+
+
+def voice_for(script: dict, speaker: str) -> str:
+    """스크립트의 배정 음성 (대사 화자가 아니면 이름 기준 기본 음성, 예: 나레이터)"""
+    return assign_voices(script).get(speaker) or default_voice(speaker)
@@ -3,50 +3,124 @@ YouTube Data API v3로 MP4 자동 업로드
 08_youtube_upload.py 기반으로 pipeline 패키지로 이동
 
 YouTube 업로드는 OAuth 2.0 필수.
-최초 1회 브라우저 인증 후 토큰 재사용.
+최초 1회 브라우저 인증 후 토큰 재사용 (data/youtube_token.json, google-auth authorized user 형식).
+인증 정보와 API 클라이언트는 프로세스 안에서 재사용.
+
+업로드는 resumable 방식 (UPLOAD_CHUNK_SIZE 단위 전송)
+  - 5xx / 네트워크 오류는 지수 백오프로 재시도 (서버에 받은 위치를 조회한 뒤 이어서 전송)
+  - 세션 URI를 {영상}.upload_session.json 에 저장 → 프로세스가 죽어도 다음 실행에서 이어서 업로드
 """
 import os
 import sys
 import json
+import time
 import pickle
+import random
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from config import BASE_DIR, DATA_DIR
+# google-auth / googleapiclient 는 업로드 시점에만 import (CLI·스케줄러 기동 시간 단축)
+from config import (
+    BASE_DIR, DATA_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_MAX_RETRIES,
+    UPLOAD_RETRY_BASE_SEC, UPLOAD_RETRY_MAX_SEC, UPLOAD_SESSION_MAX_AGE,
+)
+from pipeline.instrument import add_retry, file_size, span
+from pipeline.locks import atomic_write_json, atomic_write_text, file_lock
 
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
-TOKEN_FILE = str(DATA_DIR / "youtube_token.pickle")
+TOKEN_FILE = str(DATA_DIR / "youtube_token.json")
+LEGACY_TOKEN_FILE = str(DATA_DIR / "youtube_token.pickle")  # 구버전 (JSON으로 자동 이관)
 CLIENT_SECRET_FILE = str(BASE_DIR / "youtube_client_secret.json")
 
+# 만료 N초 전이면 업로드 시작 전에 미리 토큰 갱신
+TOKEN_REFRESH_MARGIN = 300
+
+_creds = None
+_creds_lock = threading.Lock()
+_local = threading.local()
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
 
-def get_youtube_client():
-    """OAuth 인증 (최초 1회 브라우저 인증, 이후 토큰 재사용)"""
-    creds = None
+
+def _load_credentials():
+    """저장된 토큰 로드 (구버전 pickle 토큰은 JSON으로 1회 이관)"""
+    from google.oauth2.credentials import Credentials
 
     if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, "rb") as f:
+        return Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    if os.path.exists(LEGACY_TOKEN_FILE):
+        with open(LEGACY_TOKEN_FILE, "rb") as f:
             creds = pickle.load(f)
+        _save_credentials(creds)
+        os.replace(LEGACY_TOKEN_FILE, LEGACY_TOKEN_FILE + ".migrated")
+        print(f"  토큰 이관: {LEGACY_TOKEN_FILE} → {TOKEN_FILE}")
+        return creds
+    return None
+
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(CLIENT_SECRET_FILE):
-                raise FileNotFoundError(
-                    f"YouTube OAuth 클라이언트 시크릿 파일이 없습니다: {CLIENT_SECRET_FILE}\n"
-                    "GCP 콘솔 → API 및 서비스 → 사용자 인증 정보 → OAuth 2.0 클라이언트 ID → JSON 다운로드"
-                )
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "wb") as f:
-            pickle.dump(creds, f)
-        print(f"  토큰 저장: {TOKEN_FILE}")
+def _save_credentials(creds):
+    atomic_write_text(TOKEN_FILE, creds.to_json())
+    print(f"  토큰 저장: {TOKEN_FILE}")
 
-    return build("youtube", "v3", credentials=creds)
+
+def _expires_soon(creds) -> bool:
+    """만료됐거나 TOKEN_REFRESH_MARGIN초 안에 만료 (google-auth expiry는 naive UTC)"""
+    if not creds.valid:
+        return True
+    if creds.expiry is None:
+        return False
+    remaining = creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None)
+    return remaining.total_seconds() < TOKEN_REFRESH_MARGIN
+
+
+def get_credentials():
+    """
+    OAuth 인증 정보 (최초 1회 브라우저 인증, 이후 토큰 재사용)
+    프로세스 내에서 재사용하며, 만료 직전이면 미리 갱신 (업로드 도중 만료 방지)
+    여러 워커 프로세스가 같은 토큰 파일을 갱신하므로 파일 잠금 안에서 읽고 씀
+    """
+    global _creds
+    from google.auth.transport.requests import Request
+
+    with _creds_lock:
+        if _creds is not None and not _expires_soon(_creds):
+            return _creds
+        with file_lock("youtube_token"):
+            creds = _load_credentials()  # 다른 프로세스가 먼저 갱신했을 수 있음
+            if creds and creds.refresh_token and _expires_soon(creds):
+                creds.refresh(Request())
+                _save_credentials(creds)
+            elif not creds or not creds.valid:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                if not os.path.exists(CLIENT_SECRET_FILE):
+                    raise FileNotFoundError(
+                        f"YouTube OAuth 클라이언트 시크릿 파일이 없습니다: {CLIENT_SECRET_FILE}\n"
+                        "GCP 콘솔 → API 및 서비스 → 사용자 인증 정보 → OAuth 2.0 클라이언트 ID → JSON 다운로드"
+                    )
+                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
+                creds = flow.run_local_server(port=0)
+                _save_credentials(creds)
+        _creds = creds
+        return creds
+
+
+def get_youtube_client():
+    """
+    YouTube API 클라이언트 (스레드별 캐시)
+    - discovery 문서는 googleapiclient 내장본 사용 (static_discovery, 네트워크 조회 없음)
+    - httplib2 연결은 스레드 간 공유할 수 없으므로 스레드마다 1개씩 생성
+    - 인증 정보가 새로 발급되면(재인증) 클라이언트도 다시 생성
+    """
+    from googleapiclient.discovery import build
+
+    creds = get_credentials()
+    if getattr(_local, "client", None) is None or _local.creds is not creds:
+        _local.client = build("youtube", "v3", credentials=creds,
+                              static_discovery=True, cache_discovery=False)
+        _local.creds = creds
+    return _local.client
 
 
 def build_metadata(script: dict) -> dict:
@@ -103,15 +177,176 @@ def build_metadata(script: dict) -> dict:
     return {"title": title, "description": description, "tags": tags}
 
 
+def format_publish_at(publish_at) -> str | None:
+    """
+    게시 예약 시각 → RFC3339 UTC 문자열 (YouTube status.publishAt 형식)
+    Args:
+        publish_at: timezone 포함 datetime 또는 ISO 8601 문자열
+    Returns:
+        이미 지난 시각이면 None (예약 없이 바로 게시)
+    """
+    if publish_at is None:
+        return None
+    if isinstance(publish_at, str):
+        publish_at = datetime.fromisoformat(publish_at)
+    if publish_at.tzinfo is None:
+        raise ValueError(f"publish_at에 시간대 정보가 없습니다: {publish_at}")
+    utc = publish_at.astimezone(timezone.utc)
+    if utc <= datetime.now(timezone.utc):
+        return None
+    return utc.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _session_path(video_path: str) -> Path:
+    return Path(video_path).with_suffix(".upload_session.json")
+
+
+def _load_session(video_path: str) -> dict | None:
+    """같은 파일(크기/수정 시각)에 대한 유효 기간 내 세션만 반환"""
+    path = _session_path(video_path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        session = json.load(f)
+    st = os.stat(video_path)
+    if (session.get("size") != st.st_size or session.get("mtime") != st.st_mtime
+            or time.time() - session.get("created", 0) > UPLOAD_SESSION_MAX_AGE):
+        path.unlink()
+        return None
+    return session
+
+
+def _save_session(video_path: str, uri: str):
+    st = os.stat(video_path)
+    atomic_write_json(_session_path(video_path), {
+        "uri": uri, "size": st.st_size, "mtime": st.st_mtime, "created": time.time(),
+    })
+
+
+def _clear_session(video_path: str):
+    path = _session_path(video_path)
+    if path.exists():
+        path.unlink()
+
+
+def _retry_delay(retries: int) -> float:
+    return min(UPLOAD_RETRY_MAX_SEC, UPLOAD_RETRY_BASE_SEC * 2 ** (retries - 1)) * random.uniform(0.5, 1.0)
+
+
+def _resume_session(request, uri: str, size: int):
+    """
+    저장된 세션의 수신 위치 조회 (빈 PUT, Content-Range: bytes */N) → request를 그 위치로 맞춤
+    Returns:
+        업로드가 이미 끝났으면 영상 리소스, 아니면 None (이후 next_chunk로 이어서 전송)
+    Raises:
+        HttpError: 2xx / 308 이외 응답 (404/410이면 세션 만료)
+    """
+    from googleapiclient.errors import HttpError
+
+    resp, content = request.http.request(
+        uri, method="PUT", body=b"",
+        headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"},
+    )
+    if resp.status in (200, 201):
+        return request.postproc(resp, content)
+    if resp.status != 308:
+        raise HttpError(resp, content, uri=uri)
+    request.resumable_uri = uri
+    request.resumable_progress = int(resp["range"].rsplit("-", 1)[1]) + 1 if "range" in resp else 0
+    return None
+
+
+def _execute_resumable(make_request, video_path: str, on_new_session=None) -> dict:
+    """
+    next_chunk 반복 (재시도 + 세션 저장/재개)
+    make_request: 새 videos.insert 요청 생성 (세션이 만료되면 새 요청으로 처음부터)
+    on_new_session: 새 세션을 여는 요청(videos.insert) 직전에 호출 — 세션마다 1회
+                    (시작 요청 재시도는 같은 세션으로 봄, 저장된 세션으로 재개하면 호출 안 함)
+    Raises:
+        HttpError: 재시도 불가 오류 또는 UPLOAD_MAX_RETRIES 연속 실패
+    """
+    import httplib2
+    from http.client import HTTPException
+    from googleapiclient.errors import HttpError
+
+    request = make_request()
+    session = _load_session(video_path)
+    resuming = session is not None
+    if resuming:
+        print("  이전 업로드 세션에서 이어서 전송")
+
+    new_session = not resuming
+    retries = 0
+    response = None
+    while response is None:
+        if new_session and request.resumable_uri is None and on_new_session:
+            on_new_session()
+            new_session = False
+        status = None
+        try:
+            if resuming:
+                # 서버에 받은 위치를 먼저 조회(빈 PUT)한 뒤 이어서 전송
+                response = _resume_session(request, session["uri"], os.path.getsize(video_path))
+                resuming = False
+            else:
+                status, response = request.next_chunk()
+            error = None
+        except HttpError as e:
+            if e.resp.status in (404, 410) and session:
+                # 세션 만료 → 새 요청으로 처음부터 (오류 상태인 기존 요청은 버림)
+                print("  업로드 세션 만료, 처음부터 다시 업로드")
+                _clear_session(video_path)
+                session = None
+                resuming = False
+                new_session = True
+                request = make_request()
+                continue
+            if e.resp.status not in RETRYABLE_STATUS:
+                raise
+            error = e
+        except (httplib2.HttpLib2Error, HTTPException, OSError) as e:
+            error = e
+
+        # 세션 URI가 새로 발급되면 즉시 저장 (첫 청크 전송이 실패해도 재개 가능)
+        if request.resumable_uri and (session is None or session["uri"] != request.resumable_uri):
+            _save_session(video_path, request.resumable_uri)
+            session = {"uri": request.resumable_uri}
+
+        if error is None:
+            retries = 0
+            if status:
+                print(f"  업로드 진행: {int(status.progress() * 100)}%")
+            continue
+
+        retries += 1
+        add_retry()
+        if retries > UPLOAD_MAX_RETRIES:
+            raise error
+        delay = _retry_delay(retries)
+        print(f"  [재시도 {retries}/{UPLOAD_MAX_RETRIES}] {type(error).__name__}: {error} - {delay:.1f}초 후")
+        time.sleep(delay)
+
+    _clear_session(video_path)
+    return response
+
+
 def upload_video(video_path: str, script: dict,
-                 privacy: str = "public") -> str:
+                 privacy: str = "public", publish_at=None, youtube=None,
+                 on_new_session=None) -> str:
     """
     YouTube 업로드 → 영상 URL 반환
     Args:
         privacy: "public" | "unlisted" | "private"
+        publish_at: 게시 예약 시각 (datetime/ISO 문자열). 지정 시 비공개로 올리고
+                    해당 시각에 YouTube가 자동 공개 (지난 시각이면 privacy로 즉시 게시)
+        youtube: 사용할 API 클라이언트 (기본: get_youtube_client(), 벤치마크에서 가짜 서버 연결용)
+        on_new_session: 새 업로드 세션을 열기 직전에 호출 (쿼터 차감, 예외를 던지면 업로드 중단)
     """
-    youtube = get_youtube_client()
+    from googleapiclient.http import MediaFileUpload
+
+    youtube = youtube or get_youtube_client()
     metadata = build_metadata(script)
+    publish_at_utc = format_publish_at(publish_at)
 
     body = {
         "snippet": {
@@ -126,20 +361,23 @@ def upload_video(video_path: str, script: dict,
             "selfDeclaredMadeForKids": False,
         }
     }
+    if publish_at_utc:
+        # publishAt은 private 상태에서만 유효
+        body["status"]["privacyStatus"] = "private"
+        body["status"]["publishAt"] = publish_at_utc
+        print(f"  게시 예약: {publish_at_utc}")
 
-    media = MediaFileUpload(video_path, mimetype="video/mp4", resumable=True)
+    def make_request():
+        media = MediaFileUpload(video_path, mimetype="video/mp4",
+                                chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
+        return youtube.videos().insert(
+            part="snippet,status", body=body, media_body=media
+        )
 
     print(f"  YouTube 업로드 중: {metadata['title']}")
-    request = youtube.videos().insert(
-        part="snippet,status", body=body, media_body=media
-    )
-
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            print(f"  업로드 진행: {int(status.progress() * 100)}%")
-
+    with span("youtube.upload", privacy=body["status"]["privacyStatus"]) as sp:
+        sp.bytes_in = file_size(video_path)
+        response = _execute_resumable(make_request, video_path, on_new_session)
     video_id = response["id"]
     url = f"https://youtu.be/{video_id}"
     print(f"  업로드 완료: {url}")
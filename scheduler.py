@@ -1,51 +1,75 @@
 """
-APScheduler 기반 매일 오전 7시 자동 실행 스케줄러
-실행: python scheduler.py
+APScheduler 기반 자동 제작 스케줄러 (게시: 매일 오전 7시 KST)
+실행: python scheduler.py [--workers N]
+
+스케줄러는 에피소드 작업을 작업 큐(data/jobs.sqlite3)에 등록만 하고,
+실제 생성(script → tts → render → upload)은 워커 프로세스가 처리합니다.
+  - 제작과 게시 분리: PRODUCE_AHEAD_DAYS일 뒤 게시분까지 미리 제작하여
+    비공개 예약(publishAt) 업로드 → 게시 시각에 YouTube가 자동 공개
+  - PRODUCE_INTERVAL_MIN분마다 빠진 에피소드를 채우므로, 워커는 여유 있을 때 제작
+  - 워커가 죽어도 작업은 큐에 남아 재시작 후 이어서 처리
+  - 워커 수만큼 에피소드 단계를 병렬 처리 (별도 실행: python worker.py --workers N)
 """
+import argparse
 import logging
 import sys
 from datetime import datetime
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
 
-import main
+import worker
+from pipeline.artifact_store import ArtifactStore
+from config import JOB_WORKERS, PUBLISH_HOUR, PRODUCE_AHEAD_DAYS, PRODUCE_INTERVAL_MIN
 
-# ── 로깅 ──────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
 
-def daily_job():
-    """매일 오전 7시 실행되는 작업"""
+def produce_job():
+    """미리 제작할 에피소드 작업 등록 (PRODUCE_INTERVAL_MIN분마다)"""
     logger.info(f"\n{'#'*60}")
     logger.info(f"# 스케줄 작업 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info(f"{'#'*60}")
     try:
-        main.run(dry_run=False, privacy="public")
-        logger.info("스케줄 작업 완료!")
+        enqueued = worker.enqueue_ahead(PRODUCE_AHEAD_DAYS, dry_run=False, privacy="public")
+        logger.info(f"스케줄 작업 등록 완료: {enqueued or '추가 없음'}")
+        with ArtifactStore() as store:
+            gc = store.gc()
+        if gc["evicted"]:
+            logger.info(f"산출물 GC: {len(gc['evicted'])}개, {gc['freed'] / 1024 ** 2:.0f} MB 정리")
     except Exception as e:
         logger.error(f"스케줄 작업 오류: {e}", exc_info=True)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="에피소드 사전 제작 스케줄러")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS,
+                        help=f"함께 실행할 워커 프로세스 수 (0이면 등록만, 기본: {JOB_WORKERS})")
+    args = parser.parse_args()
+
+    # ── 로깅 (import 시점이 아니라 실행 시에만 설정 → 워커 프로세스는 자기 로그 파일로) ──
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+
     scheduler = BlockingScheduler(timezone="Asia/Seoul")
 
-    # 매일 오전 7시 실행
+    # 시작 즉시 1회 + 이후 주기적으로 빠진 에피소드 등록
     scheduler.add_job(
-        daily_job,
-        trigger=CronTrigger(hour=7, minute=0, timezone="Asia/Seoul"),
+        produce_job,
+        trigger=IntervalTrigger(minutes=PRODUCE_INTERVAL_MIN, timezone="Asia/Seoul"),
         id="daily_upload",
         name="비즈니스 일본어 YouTube 업로드",
         replace_existing=True,
+        next_run_time=datetime.now(),
+        coalesce=True,
     )
 
     logger.info("=" * 60)
     logger.info("비즈니스 일본어 YouTube 자동 업로드 스케줄러 시작")
-    logger.info("실행 시간: 매일 오전 07:00 (KST)")
+    logger.info(f"게시 시간: 매일 오전 {PUBLISH_HOUR:02d}:00 (KST), {PRODUCE_AHEAD_DAYS}일 앞서 제작")
     logger.info("종료: Ctrl+C")
     logger.info("=" * 60)
 
@@ -54,6 +78,14 @@ if __name__ == "__main__":
     if job:
         logger.info(f"다음 실행: {job.next_run_time}")
 
+    # 인코더 측정은 렌더링 전에 여기서 한 번 (렌더링 중 측정하면 예약 에피소드가 늦어짐)
+    if args.workers:
+        from pipeline.encoder import ensure_profile
+        ensure_profile()
+
+    workers = worker.start_workers(args.workers)
+    logger.info(f"워커 {len(workers)}개 실행 중")
+
     try:
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,219 @@
+"""
+작업 큐 워커 (에피소드 단계: script → tts → render → upload)
+
+사용법:
+  python worker.py                  # JOB_WORKERS개 워커 프로세스 실행 (Ctrl+C 종료)
+  python worker.py --workers 4      # 워커 4개
+  python worker.py --enqueue        # 오늘~PRODUCE_AHEAD_DAYS일 뒤 게시분 작업 등록 (스케줄러와 동일)
+  python worker.py --enqueue --dry-run --once   # 등록 후 대기 작업을 모두 처리하고 종료
+  python worker.py --stats          # 단계/상태별 작업 수
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import traceback
+import multiprocessing
+from datetime import date, datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+from config import (
+    JOB_WORKERS, JOB_LEASE_SEC, JOB_POLL_SEC, LOG_DIR,
+    PUBLISH_TZ, PUBLISH_HOUR, PRODUCE_AHEAD_DAYS, ensure_dirs,
+)
+from pipeline import instrument
+from pipeline.instrument import span
+from pipeline.job_queue import JobQueue
+from pipeline.episode_stages import episode_id, publish_date
+
+EPISODE_TYPES = ("B2B", "B2C")
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(name: str = "worker"):
+    ensure_dirs()
+    log_file = LOG_DIR / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
+    instrument.configure(log_file.with_suffix(".spans.jsonl"))
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] [%(processName)s] %(message)s",
+        handlers=[
+            logging.FileHandler(log_file, encoding="utf-8"),
+            logging.StreamHandler(sys.stdout),
+        ],
+        force=True,  # 부모 프로세스(scheduler.py)에서 물려받은 로깅 설정 교체 → 워커 로그 파일에도 기록
+    )
+
+
+def publish_time(day: date):
+    """게시 날짜 → 게시 예약 시각 (PUBLISH_TZ 기준 PUBLISH_HOUR시)"""
+    return datetime.combine(day, dt_time(PUBLISH_HOUR), tzinfo=ZoneInfo(PUBLISH_TZ))
+
+
+def enqueue_episodes(day: date, dry_run: bool = False, privacy: str = "public") -> list[str]:
+    """
+    게시 날짜 day의 상황을 선택하고 에피소드별 script 작업을 등록
+    이미 등록된 에피소드는 건너뜀 (재실행해도 상황을 새로 소비하지 않음)
+    ep_id는 게시 날짜 기준 ({YYYYMMDD}_{유형})
+    """
+    from pipeline.generate_situation import generate_situations, save_history
+    from pipeline.locks import run_lock
+
+    enqueued = []
+    with JobQueue() as queue, run_lock():
+        pending_types = [t for t in EPISODE_TYPES if not queue.has_episode(episode_id(day, t))]
+        if not pending_types:
+            return enqueued
+        situations = [s for s in generate_situations() if s["type"] in pending_types]
+        ep_ids = [episode_id(day, s["type"]) for s in situations]
+        save_history(situations, ep_ids)
+        for situation, ep_id in zip(situations, ep_ids):
+            payload = {
+                "situation": situation, "privacy": privacy, "dry_run": dry_run,
+                "publish_at": publish_time(day).isoformat(),
+            }
+            if queue.enqueue(ep_id, "script", payload):
+                enqueued.append(ep_id)
+                logger.info(f"  작업 등록: {ep_id} ({situation['situation']})")
+    return enqueued
+
+
+def enqueue_ahead(days: int = PRODUCE_AHEAD_DAYS, dry_run: bool = False,
+                  privacy: str = "public") -> list[str]:
+    """
+    오늘부터 days일 뒤 게시분까지 빠진 에피소드를 등록
+    워커가 여유 있을 때 미리 제작해 비공개 예약 업로드 → 게시 시각에 YouTube가 공개
+    (게시 시각이 이미 지난 날짜분은 업로드 즉시 게시)
+    """
+    today = publish_date()
+    enqueued = []
+    for offset in range(days + 1):
+        enqueued += enqueue_episodes(today + timedelta(days=offset), dry_run, privacy)
+    return enqueued
+
+
+class _Heartbeat(threading.Thread):
+    """실행 중인 작업의 lease를 주기적으로 연장 (별도 SQLite 연결)"""
+
+    def __init__(self, job_id: int, worker: str):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker = worker
+        self.stopped = threading.Event()
+
+    def run(self):
+        with JobQueue() as queue:
+            while not self.stopped.wait(JOB_LEASE_SEC / 3):
+                if not queue.heartbeat(self.job_id, self.worker):
+                    logger.warning(f"  작업 {self.job_id} lease 상실")
+                    return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(queue: JobQueue, job: dict, worker: str):
+    from pipeline.episode_stages import run_stage
+    from pipeline.ffmpeg_runner import format_episode_summary
+    from pipeline.locks import LockBusy
+    from pipeline.upload_manager import QuotaExceeded
+
+    label = f"{job['ep_id']}/{job['stage']} (시도 {job['attempts']})"
+    logger.info(f"[{worker}] 시작: {label}")
+    heartbeat = _Heartbeat(job["id"], worker)
+    heartbeat.start()
+    started = time.monotonic()
+    instrument.reset()  # 작업 1건 단위로 집계 (장기 실행 워커의 기록 누적 방지)
+    try:
+        with span(f"stage.{job['stage']}", ep_id=job["ep_id"], attempt=job["attempts"]):
+            payload = run_stage(job["stage"], job["ep_id"], job["payload"])
+    except QuotaExceeded as e:
+        logger.warning(f"[{worker}] {label}: {e} - "
+                       f"{datetime.fromtimestamp(e.retry_at):%m-%d %H:%M} 이후 재시도")
+        queue.fail(job, str(e), retry_after=e.retry_at)
+        return
+    except LockBusy as e:
+        logger.warning(f"[{worker}] {label}: {e} - 잠시 후 재시도")
+        queue.fail(job, str(e), retry_after=time.time() + JOB_POLL_SEC * 6)
+        return
+    except Exception:
+        logger.error(f"[{worker}] 실패: {label}", exc_info=True)
+        queue.fail(job, traceback.format_exc())
+        return
+    finally:
+        heartbeat.stop()
+    queue.complete(job, payload)
+    logger.info(f"[{worker}] 완료: {label} ({time.monotonic() - started:.1f}초)")
+    if job["stage"] in ("tts", "render"):
+        logger.info(format_episode_summary(job["ep_id"]))
+    if payload.get("url"):
+        logger.info(f"  [{job['ep_id']}] {payload['url']}")
+
+
+def work_loop(worker: str = None, stages: list = None, once: bool = False):
+    """작업을 가져와 실행 (once=True면 대기 작업이 없을 때 종료)"""
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    with JobQueue() as queue:
+        while True:
+            job = queue.claim(worker, stages)
+            if job is None:
+                if once:
+                    return
+                time.sleep(JOB_POLL_SEC)
+                continue
+            run_job(queue, job, worker)
+
+
+def _worker_main(index: int, stages: list, once: bool):
+    setup_logging()
+    work_loop(f"worker{index}-{os.getpid()}", stages, once)
+
+
+def start_workers(count: int = JOB_WORKERS, stages: list = None,
+                  once: bool = False) -> list:
+    """워커 프로세스 count개 시작"""
+    procs = []
+    for i in range(count):
+        p = multiprocessing.Process(
+            target=_worker_main, args=(i, stages, once), name=f"worker{i}", daemon=True,
+        )
+        p.start()
+        procs.append(p)
+    return procs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="에피소드 작업 큐 워커")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS,
+                        help=f"워커 프로세스 수 (기본: {JOB_WORKERS})")
+    parser.add_argument("--stage", action="append", choices=["script", "tts", "render", "upload"],
+                        help="처리할 단계만 지정 (여러 번 사용 가능)")
+    parser.add_argument("--enqueue", action="store_true", help="미리 제작할 에피소드 작업 등록")
+    parser.add_argument("--ahead-days", type=int, default=PRODUCE_AHEAD_DAYS,
+                        help=f"며칠 뒤 게시분까지 등록할지 (기본: {PRODUCE_AHEAD_DAYS})")
+    parser.add_argument("--dry-run", action="store_true", help="업로드 없이 처리 (--enqueue와 함께)")
+    parser.add_argument("--privacy", choices=["public", "unlisted", "private"], default="public")
+    parser.add_argument("--once", action="store_true", help="대기 작업을 모두 처리하면 종료")
+    parser.add_argument("--stats", action="store_true", help="작업 현황 출력")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.stats:
+        with JobQueue() as q:
+            for stage, counts in q.stats().items():
+                print(f"{stage:8s} {counts}")
+        sys.exit(0)
+    if args.enqueue:
+        enqueue_ahead(args.ahead_days, dry_run=args.dry_run, privacy=args.privacy)
+
+    procs = start_workers(args.workers, args.stage, args.once)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        logger.info("워커 종료")